@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        (
+            "authentication",
+            "0002_alter_user_birth_date_alter_user_can_be_contacted_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["date_joined", "id"], name="user_joined_keyset_idx"
+            ),
+        ),
+    ]
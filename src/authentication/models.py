@@ -11,3 +11,8 @@ class User(AbstractUser):
     can_data_be_shared = models.BooleanField(_("Accept to share data"))
 
     REQUIRED_FIELDS = []
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['date_joined', 'id'], name='user_joined_keyset_idx'),
+        ]
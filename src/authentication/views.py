@@ -5,12 +5,15 @@ from rest_framework.viewsets import ReadOnlyModelViewSet, ModelViewSet
 
 from authentication.serializers import UserSerializer
 from authentication.permissions import UserPermission
+from config.instrumentation import InstrumentedViewMixin
+from projects.mixins import FieldSelectionMixin, ReplicaReadMixin, WriteRetryMixin
 User = get_user_model()
 
 # Create your views here.
 
 
-class UserViewSet(ModelViewSet):
+class UserViewSet(FieldSelectionMixin, ReplicaReadMixin, WriteRetryMixin, InstrumentedViewMixin, ModelViewSet):
     serializer_class = UserSerializer
     queryset = User.objects.all()
     permission_classes = [UserPermission]
+    cursor_ordering = ('date_joined', 'id')
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_KEY = 'replica:sticky:{}'
+
+
+def get_replica_alias():
+    """Alias de la réplique en lecture, ou None si elle n'est pas configurée dans DATABASES"""
+    alias = getattr(settings, 'REPLICA_DATABASE_ALIAS', 'replica')
+    return alias if alias in connections.databases else None
+
+
+def get_cache():
+    return caches[getattr(settings, 'REPLICA_STICKY_CACHE_ALIAS', 'default')]
+
+
+def stick_to_primary(user):
+    """Les lectures de l'utilisateur restent sur la base principale pendant REPLICA_STICKY_SECONDS"""
+    timeout = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+    if user.is_authenticated and timeout and get_replica_alias():
+        get_cache().set(STICKY_KEY.format(user.pk), True, timeout)
+
+
+def get_read_alias(user):
+    """Base des lectures de l'utilisateur : la réplique, sauf juste après l'une de ses écritures"""
+    replica = get_replica_alias()
+    if replica is None or (user.is_authenticated and get_cache().get(STICKY_KEY.format(user.pk))):
+        return DEFAULT_DB_ALIAS
+    return replica
+
+
+class PrimaryReplicaRouter:
+    """
+    Routeur base principale / réplique en lecture : les écritures vont toujours sur la base principale,
+    y compris celles d'objets lus sur la réplique. Les lectures n'utilisent la réplique que si le queryset
+    le demande (voir projects.mixins.ReplicaReadMixin) ; les relations d'un objet lu sur la réplique y sont
+    lues aussi. La réplique n'est pas migrée : son schéma vient de la réplication.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != get_replica_alias()
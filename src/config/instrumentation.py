@@ -0,0 +1,163 @@
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTimings:
+    """Mesures d'une requête : nombre et durée des requêtes SQL, durée des étapes (sérialisation, permissions)"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.spans = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        """Wrapper d'exécution SQL (voir connection.execute_wrapper)"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+    def add(self, name, duration):
+        self.spans[name] = self.spans.get(name, 0.0) + duration
+
+
+@contextmanager
+def span(request, name):
+    """Ajoute la durée du bloc à l'étape `name` de la requête, si elle est instrumentée"""
+    timings = getattr(request, 'timings', None)
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+class InstrumentedViewMixin:
+    """
+    Mesure les étapes `permission` et `serializer` (validation et représentation) des vues DRF pour
+    RequestInstrumentationMiddleware. Reprend les actions de ModelViewSet : à placer juste avant lui,
+    après les mixins qui redéfinissent ces actions. Les mixins qui sérialisent eux-mêmes (liste
+    conditionnelle, création en lot) mesurent leur étape `serializer` avec span.
+    """
+
+    def check_permissions(self, request):
+        with span(request, 'permission'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with span(request, 'permission'):
+            super().check_object_permissions(request, obj)
+
+    def serializer_data(self, serializer):
+        """Représentation produite par le serializer, mesurée"""
+        with span(self.request, 'serializer'):
+            return serializer.data
+
+    def validate_serializer(self, serializer):
+        with span(self.request, 'serializer'):
+            serializer.is_valid(raise_exception=True)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.serializer_data(self.get_serializer(page, many=True)))
+        return Response(self.serializer_data(self.get_serializer(queryset, many=True)))
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.serializer_data(self.get_serializer(self.get_object())))
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        self.validate_serializer(serializer)
+        self.perform_create(serializer)
+        data = self.serializer_data(serializer)
+        return Response(data, status=status.HTTP_201_CREATED, headers=self.get_success_headers(data))
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        self.validate_serializer(serializer)
+        self.perform_update(serializer)
+        if getattr(instance, '_prefetched_objects_cache', None):
+            # Comme UpdateModelMixin : le préchargement ne reflète plus l'objet modifié
+            instance._prefetched_objects_cache = {}
+        return Response(self.serializer_data(serializer))
+
+
+def get_action(match, method):
+    """Action du viewset (list, add_contributor...) appelée par la route résolue, y compris via AsyncReadView"""
+    sync_view = getattr(match.func, 'view_initkwargs', {}).get('sync_view')
+    actions = getattr(sync_view or match.func, 'actions', None) or {}
+    return actions.get(method.lower())
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Instrumentation des requêtes, activée par REQUEST_INSTRUMENTATION : nombre et durée des requêtes SQL
+    sur toutes les bases, durée de sérialisation et des permissions (vues utilisant InstrumentedViewMixin).
+
+    Les mesures sont envoyées dans l'en-tête Server-Timing et les requêtes plus lentes que
+    SLOW_REQUEST_THRESHOLD_MS sont journalisées (logger config.instrumentation) sous forme d'un objet JSON
+    portant la route résolue (`issue-list`, `project-add-contributor`...) et l'action du viewset.
+    Le contenu des réponses en flux (export) est produit après la mesure.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 500)
+
+    def __call__(self, request):
+        request.timings = timings = RequestTimings()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        metrics = [('total', total, None), ('db', timings.db_time, f'{timings.queries} queries')]
+        metrics += [(name, duration, None) for name, duration in sorted(timings.spans.items())]
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration * 1000:.1f}' + (f';desc="{description}"' if description else '')
+            for name, duration, description in metrics
+        )
+        if total * 1000 >= self.threshold:
+            self.log_slow_request(request, response, timings, total)
+        return response
+
+    @staticmethod
+    def log_slow_request(request, response, timings, total):
+        match = request.resolver_match
+        record = {
+            'event': 'slow_request',
+            'method': request.method,
+            'path': request.get_full_path(),
+            'route': match.view_name if match else None,
+            'action': get_action(match, request.method) if match else None,
+            'status': response.status_code,
+            'user_id': getattr(getattr(request, 'user', None), 'pk', None),
+            'total_ms': round(total * 1000, 1),
+            'db_ms': round(timings.db_time * 1000, 1),
+            'queries': timings.queries,
+            **{f'{name}_ms': round(duration * 1000, 1) for name, duration in timings.spans.items()},
+        }
+        logger.warning(json.dumps(record), extra={'request_timing': record})
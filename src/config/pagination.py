@@ -0,0 +1,220 @@
+import base64
+import binascii
+import heapq
+import json
+from functools import reduce
+from operator import attrgetter, or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.template import loader
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(LimitOffsetPagination):
+    """
+    Pagination limit/offset par défaut, et pagination par curseur (keyset) dès que le paramètre
+    `cursor` est présent dans la requête (`?cursor=` pour la première page).
+
+    Le curseur est opaque et encode la position du dernier élément sur les champs d'ordre de la vue
+    (`cursor_ordering`, `('created_time', 'id')` par défaut) : le coût d'une page ne dépend donc pas de
+    sa profondeur. Le total (`COUNT(*)`) n'est calculé en mode curseur que si `?count=true`,
+    et peut être supprimé en mode limit/offset avec `?count=false`.
+    Une recherche plafonnée (voir projects.search.FullTextSearchFilter) ajoute `search_truncated` à la réponse.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    default_ordering = ('created_time', 'id')
+    max_limit = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        plan = self.prepare(queryset, request, view)
+        if plan is None:
+            return None
+        page_queryset, count_queryset = plan
+        count = count_queryset.count() if count_queryset is not None else None
+        return self.finish(list(page_queryset), count)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Version asynchrone de paginate_queryset, pour les vues de lecture asynchrones"""
+        plan = self.prepare(queryset, request, view)
+        if plan is None:
+            return None
+        page_queryset, count_queryset = plan
+        count = await count_queryset.acount() if count_queryset is not None else None
+        return self.finish([obj async for obj in page_queryset], count)
+
+    def paginate_querysets(self, querysets, request, view=None):
+        """
+        Pagination d'une liste répartie sur plusieurs bases (un queryset par shard, voir config.sharding) :
+        chaque shard fournit les objets qui peuvent figurer dans la page, fusionnés selon l'ordre de la liste.
+        En mode limit/offset, chaque shard lit donc `offset + limit` objets : le curseur est à préférer.
+        """
+        plans = [self.prepare(queryset, request, view) for queryset in querysets]
+        if plans[0] is None:
+            return None
+        if self.mode == 'cursor':
+            key = attrgetter(*self.ordering)
+            pages = [list(page_queryset) for page_queryset, count_queryset in plans]
+            results = list(heapq.merge(*pages, key=key, reverse=self.reverse))[:self.limit + 1]
+            count = sum(count_queryset.count() for page_queryset, count_queryset in plans) \
+                if self.with_count else None
+            return self.finish(results, count)
+
+        ordering = self.get_merge_ordering(querysets[0], view)
+        end = self.offset + self.limit + 1
+        pages = [list(queryset.order_by(*ordering)[:end]) for queryset in querysets]
+        results = list(heapq.merge(*pages, key=attrgetter(*ordering)))[self.offset:end]
+        if not self.with_count:
+            return self.finish(results, None)
+        return self.finish(results[:self.limit], sum(queryset.count() for queryset in querysets))
+
+    def get_merge_ordering(self, queryset, view):
+        """Champs d'ordre (croissant) de la liste, ceux du curseur si elle n'est pas triée"""
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        return tuple(field.lstrip('-') for field in ordering) or self.get_ordering(view)
+
+    def prepare(self, queryset, request, view):
+        """
+        Détermine le mode de pagination et retourne le queryset de la page et celui du total
+        (None s'il n'est pas calculé), ou None si la liste n'est pas paginée.
+        """
+        self.request = request
+        self.mode = 'offset'
+        self.with_count = self.get_with_count(request)
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        if self.cursor_query_param in request.query_params:
+            self.mode = 'cursor'
+            self.ordering = self.get_ordering(view)
+            self.model = queryset.model
+            self.position, self.reverse = self.decode_cursor(request)
+            page = queryset
+            if self.position is not None:
+                page = page.filter(self.get_keyset_filter(self.position, self.reverse))
+            order = ['-' + field if self.reverse else field for field in self.ordering]
+            return page.order_by(*order)[:self.limit + 1], queryset if self.with_count else None
+
+        self.offset = self.get_offset(request)
+        if self.with_count is False:
+            # Sans COUNT : on charge un élément de plus pour savoir s'il existe une page suivante
+            return queryset[self.offset:self.offset + self.limit + 1], None
+        self.with_count = True
+        return queryset[self.offset:self.offset + self.limit], queryset
+
+    def finish(self, results, count):
+        """Calcule l'état de la pagination (liens, total) à partir des objets chargés"""
+        if self.mode == 'cursor':
+            self.count = count
+            has_more = len(results) > self.limit
+            results = results[:self.limit]
+            if self.reverse:
+                results.reverse()
+                self.has_next, self.has_previous = True, has_more
+            else:
+                self.has_next, self.has_previous = has_more, self.position is not None
+            self.first_position = self.get_position(results[0]) if results else self.position
+            self.last_position = self.get_position(results[-1]) if results else self.position
+            return results
+
+        if count is None:
+            self.count = self.offset + len(results)
+            return results[:self.limit]
+        self.count = count
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+        return results
+
+    def get_with_count(self, request):
+        """Lit le paramètre `count` : True, False ou None s'il est absent"""
+        value = request.query_params.get(self.count_query_param)
+        if value is None:
+            return None
+        return value.lower() in ('1', 'true', 'yes')
+
+    def get_ordering(self, view):
+        return tuple(getattr(view, 'cursor_ordering', self.default_ordering))
+
+    def get_keyset_filter(self, position, reverse):
+        """
+        Construit la condition `(a, b) > (x, y)` sous la forme
+        `a > x OR (a = x AND b > y)`, exploitable par l'index composite.
+        """
+        lookup = 'lt' if reverse else 'gt'
+        conditions = []
+        for index, field in enumerate(self.ordering):
+            equals = {name: value for name, value in zip(self.ordering[:index], position[:index])}
+            conditions.append(Q(**equals, **{f'{field}__{lookup}': position[index]}))
+        return reduce(or_, conditions)
+
+    def get_position(self, instance):
+        return [getattr(instance, field) for field in self.ordering]
+
+    def encode_cursor(self, position, reverse=False):
+        payload = {'p': [str(value) for value in position]}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode())
+        return encoded.decode('ascii')
+
+    def decode_cursor(self, request):
+        """Retourne la position et le sens de lecture encodés dans le curseur"""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            values = payload['p']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, KeyError, binascii.Error, FieldDoesNotExist, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(payload.get('r'))
+
+    def get_next_link(self):
+        if self.mode != 'cursor':
+            return super().get_next_link()
+        if not self.has_next or self.last_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last_position))
+
+    def get_previous_link(self):
+        if self.mode != 'cursor':
+            return super().get_previous_link()
+        if not self.has_previous or self.first_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.encode_cursor(self.first_position, reverse=True))
+
+    def get_paginated_response(self, data):
+        content = {}
+        if self.with_count:
+            content['count'] = self.count
+        if getattr(self.request, 'search_truncated', False):
+            content['search_truncated'] = True
+        content.update({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+        return Response(content)
+
+    def to_html(self):
+        if self.mode != 'cursor' and self.with_count:
+            return super().to_html()
+        template = loader.get_template('rest_framework/pagination/previous_and_next.html')
+        return template.render({'previous_url': self.get_previous_link(), 'next_url': self.get_next_link()})
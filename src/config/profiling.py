@@ -0,0 +1,185 @@
+import cProfile
+import json
+import pstats
+import uuid
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, Http404
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import IsAdminUser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from config.instrumentation import get_action
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAMETER = 'profile'
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+def get_directory():
+    return Path(getattr(settings, 'REQUEST_PROFILING_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def is_requested(request):
+    return request.META.get(PROFILE_HEADER) == '1' or request.GET.get(PROFILE_PARAMETER) == '1'
+
+
+def is_staff(request):
+    """Utilisateur admin connecté par session ou par l'une des authentifications de l'API (jeton JWT)"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    drf_request = Request(request)
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            user_auth_tuple = authentication_class().authenticate(drf_request)
+        except APIException:
+            return False
+        if user_auth_tuple is not None:
+            return user_auth_tuple[0].is_staff
+    return False
+
+
+def save_capture(profiler, metadata):
+    """Enregistre le profil et ses métadonnées, puis supprime les plus anciens au-delà de REQUEST_PROFILING_MAX"""
+    directory = get_directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    # L'identifiant commence par la date : l'ordre des noms de fichiers est celui des captures
+    capture_id = f"{timezone.now().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+    profiler.dump_stats(directory / f'{capture_id}.prof')
+    with open(directory / f'{capture_id}.json', 'w') as file:
+        json.dump({'id': capture_id, **metadata}, file)
+
+    maximum = getattr(settings, 'REQUEST_PROFILING_MAX', 50)
+    for path in sorted(directory.glob('*.prof'))[:-maximum]:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.json').unlink(missing_ok=True)
+    return capture_id
+
+
+def list_captures():
+    captures = []
+    for path in sorted(get_directory().glob('*.json'), reverse=True):
+        try:
+            with open(path) as file:
+                captures.append(json.load(file))
+        except (OSError, ValueError):
+            # Capture supprimée par la rotation pendant la lecture
+            continue
+    return captures
+
+
+def get_capture_path(capture_id):
+    path = get_directory() / f'{capture_id}.prof'
+    if not path.is_file():
+        raise Http404
+    return path
+
+
+def get_hotspots(capture_id, sort='cumulative', limit=30):
+    """Fonctions les plus coûteuses d'une capture, triées par durée cumulée, durée propre ou nombre d'appels"""
+    stats = pstats.Stats(str(get_capture_path(capture_id)))
+    stats.sort_stats(sort)
+    hotspots = []
+    for function in stats.fcn_list[:limit]:
+        primitive_calls, calls, total_time, cumulative_time, callers = stats.stats[function]
+        filename, line, name = function
+        hotspots.append({
+            'function': pstats.func_std_string(function), 'file': filename, 'line': line, 'name': name,
+            'calls': calls, 'primitive_calls': primitive_calls, 'total_ms': round(total_time * 1000, 3),
+            'cumulative_ms': round(cumulative_time * 1000, 3),
+        })
+    return {'total_ms': round(stats.total_tt * 1000, 3), 'calls': stats.total_calls, 'hotspots': hotspots}
+
+
+class RequestProfilingMiddleware:
+    """
+    Profilage à la demande d'une requête par un admin, avec l'en-tête `X-Profile: 1` ou le paramètre `?profile=1`.
+
+    La vue et le rendu de la réponse sont exécutés sous cProfile ; le profil (.prof) et les métadonnées de la
+    requête sont enregistrés dans REQUEST_PROFILING_DIR, où seules les REQUEST_PROFILING_MAX dernières captures
+    sont gardées. L'identifiant de la capture est retourné dans l'en-tête `X-Profile-Id`.
+    Le middleware est synchrone et asynchrone : sous ASGI, les vues asynchrones ne sont pas exécutées dans un
+    thread à cause de lui. Les lectures servies par les vues asynchrones sont profilées avec la vue DRF synchrone
+    équivalente.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not is_requested(request) or not is_staff(request):
+            return None
+        view_func = getattr(view_func, 'view_initkwargs', {}).get('sync_view') or view_func
+
+        profiler = cProfile.Profile()
+        started = timezone.now()
+        profiler.enable()
+        try:
+            response = view_func(request, *view_args, **view_kwargs)
+            if callable(getattr(response, 'render', None)):
+                response = response.render()
+        finally:
+            profiler.disable()
+
+        match = request.resolver_match
+        response['X-Profile-Id'] = save_capture(profiler, {
+            'created': started.isoformat(), 'method': request.method, 'path': request.get_full_path(),
+            'route': match.view_name, 'action': get_action(match, request.method), 'status': response.status_code,
+            'user_id': getattr(getattr(request, 'user', None), 'pk', None),
+            'duration_ms': round((timezone.now() - started).total_seconds() * 1000, 3),
+        })
+        return response
+
+
+class ProfileCaptureListView(APIView):
+    """Captures de profilage des requêtes (voir RequestProfilingMiddleware), de la plus récente à la plus ancienne"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(list_captures())
+
+
+class ProfileCaptureDetailView(APIView):
+    """
+    Fonctions les plus coûteuses d'une capture (`?limit=` fonctions triées selon `?sort=` : cumulative,
+    tottime ou ncalls) ; le fichier .prof brut est téléchargé avec `?download=1`.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, capture_id):
+        if request.query_params.get('download') == '1':
+            return FileResponse(open(get_capture_path(capture_id), 'rb'), as_attachment=True)
+        sort = request.query_params.get('sort', 'cumulative')
+        try:
+            limit = int(request.query_params.get('limit', 30))
+        except ValueError:
+            limit = 0
+        if sort not in SORT_KEYS or limit < 1:
+            return Response(
+                {'error': f"Sort must be one of: {', '.join(SORT_KEYS)}, limit a positive integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({'id': capture_id, **get_hotspots(capture_id, sort, limit)})
@@ -0,0 +1,58 @@
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Types que ni orjson ni msgpack ne connaissent (Decimal, chaînes traduites...), et dates au format de DRF
+encoder = JSONEncoder()
+
+
+def get_format(request):
+    """Format de la réponse négocié pour `request` (json, msgpack, api...) : les ETags et le cache en dépendent"""
+    renderer = getattr(request, 'accepted_renderer', None)
+    return getattr(renderer, 'format', '')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encodé par orjson lorsqu'il est installé, pour le JSON compact (réponses de l'API) ;
+    le JSON indenté (API navigable, `; indent=`) et l'absence d'orjson passent par le rendu de DRF.
+    Les types non natifs, dont les dates, sont convertis comme le fait DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or not self.compact or self.ensure_ascii or \
+                self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        ret = orjson.dumps(data, default=encoder.default,
+                           option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+        # Comme DRF : U+2028 et U+2029 sont échappés pour que le JSON reste du javascript valide
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Réponses MessagePack (`Accept: application/msgpack` ou `?format=msgpack`), avec le paquet msgpack"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if msgpack is None:
+            raise ImproperlyConfigured('MessagePackRenderer requires the msgpack package')
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encoder.default, use_bin_type=True)
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "config.instrumentation.RequestInstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -52,15 +55,57 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "config.profiling.RequestProfilingMiddleware",
 ]
 
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'config.pagination.KeysetPagination',
     'PAGE_SIZE': 10,
-    'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework_simplejwt.authentication.JWTAuthentication',),
-    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_AUTHENTICATION_CLASSES': ('authentication.authentication.AsyncJWTAuthentication',),
+    'DEFAULT_FILTER_BACKENDS': [
+        'django_filters.rest_framework.DjangoFilterBackend',
+        'projects.search.FullTextSearchFilter',
+    ],
+    # JSON encodé et décodé par orjson s'il est installé (config.renderers, config.parsers)
+    'DEFAULT_RENDERER_CLASSES': [
+        'config.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'config.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# Réponses et corps de requête MessagePack (application/msgpack) si le paquet msgpack est installé
+if find_spec("msgpack"):
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"].insert(1, "config.renderers.MessagePackRenderer")
+    REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"].insert(1, "config.parsers.MessagePackParser")
+
+# Nombre maximal d'objets acceptés par une création en lot (routes issue/bulk et comment/bulk)
+BULK_MAX_ITEMS = 10000
+
+# Nombre d'URLs des issues d'un projet (et des commentaires d'une issue) incluses dans son détail, avec leur
+# nombre et le lien vers la liste paginée
+EMBEDDED_COLLECTION_SIZE = 10
+
+# Nombre maximal d'objets d'une collection (commentaires d'une issue...) inclus par objet avec `?include=`
+INCLUDE_MAX_ITEMS = 100
+
+# Listes sérialisées à partir de lignes values_list plutôt que d'instances (projects.serializers.RowSerializer)
+LIST_ROW_SERIALIZERS = True
+
+# Nombre maximal de résultats retournés par une recherche plein texte (?search=) ; au-delà, la réponse
+# de la liste contient "search_truncated": true
+SEARCH_MAX_RESULTS = 200
+
+# Nombre de lignes lues par requête lors de l'export d'un projet (route project/<id>/export)
+EXPORT_CHUNK_SIZE = 2000
+
+# Nombre de lignes du journal des modifications lues par requête lors d'une synchronisation (route sync)
+SYNC_BATCH_SIZE = 500
+
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
@@ -85,13 +130,102 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Profil de production des bases SQLite (config.sqlite_backend), activé par DJANGO_SQLITE_PROFILE=production :
+# journal WAL (lectures non bloquées par l'écrivain), synchronous=NORMAL, attente des verrous (busy_timeout, ms)
+# et mmap (octets) appliqués à l'ouverture de chaque connexion ; les transactions prennent le verrou d'écriture
+# dès le BEGIN. Par défaut, backend SQLite de Django.
+# Les connexions persistantes (DJANGO_CONN_MAX_AGE secondes, vérifiées avant réutilisation) sont à réserver
+# aux serveurs WSGI : sous ASGI, chaque requête synchrone peut tourner dans un thread différent.
+if os.environ.get("DJANGO_SQLITE_PROFILE", "default") == "production":
+    SQLITE_DATABASE = {
+        "ENGINE": "config.sqlite_backend",
+        "CONN_MAX_AGE": int(os.environ.get("DJANGO_CONN_MAX_AGE", 0)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "pragmas": {"journal_mode": "WAL", "synchronous": "NORMAL", "busy_timeout": 5000, "mmap_size": 268435456},
+            "transaction_mode": "IMMEDIATE",
+        },
+    }
+    # Base de test dans un fichier : les tests de concurrence y écrivent depuis plusieurs threads
+    SQLITE_TEST_DATABASE = {"NAME": BASE_DIR / "test_db.sqlite3"}
+else:
+    SQLITE_DATABASE = {"ENGINE": "django.db.backends.sqlite3"}
+    SQLITE_TEST_DATABASE = {}
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        **SQLITE_DATABASE,
         "NAME": BASE_DIR / "db.sqlite3",
+        "TEST": SQLITE_TEST_DATABASE,
     }
 }
 
+# Transactions d'écriture rejouées si la base reste verrouillée (config.transactions) : nombre d'essais
+# et attente avant le deuxième (secondes, doublée à chaque essai)
+WRITE_RETRY_ATTEMPTS = 3
+WRITE_RETRY_BACKOFF = 0.05
+
+# Réplique en lecture (fichier SQLite tenu à jour par la réplication) : les lectures list / retrieve des viewsets
+# y sont envoyées (voir config.db_routers). Pendant les tests, l'alias utilise la base de test principale.
+if os.environ.get("DJANGO_REPLICA_DATABASE"):
+    DATABASES["replica"] = {
+        **SQLITE_DATABASE,
+        "NAME": os.environ["DJANGO_REPLICA_DATABASE"],
+        "TEST": {"MIRROR": "default"},
+    }
+
+REPLICA_DATABASE_ALIAS = "replica"
+# Durée (secondes) pendant laquelle les lectures d'un utilisateur restent sur la base principale après une écriture
+REPLICA_STICKY_SECONDS = 5
+REPLICA_STICKY_CACHE_ALIAS = "default"
+# Durée maximale (secondes) de mise en cache d'une liste lue sur la réplique, qui peut être en retard
+REPLICA_RESPONSE_CACHE_TIMEOUT = 5
+
+# Répartition des projets, avec leurs issues et commentaires, sur plusieurs bases choisies par id de projet
+# (config.sharding). DJANGO_SHARDS liste les fichiers SQLite des shards ajoutés à la base par défaut ;
+# chaque shard est migré avec `migrate --database=<alias>`.
+SHARD_DATABASES = ["default"]
+for number, path in enumerate(filter(None, os.environ.get("DJANGO_SHARDS", "").split(",")), start=1):
+    DATABASES[f"shard{number}"] = {**SQLITE_DATABASE, "NAME": path}
+    SHARD_DATABASES.append(f"shard{number}")
+
+DATABASE_ROUTERS = ["config.sharding.ProjectShardRouter", "config.db_routers.PrimaryReplicaRouter"]
+
+# Lanceur des tests : ajoute les bases test_replica et test_shard (config.test_runner)
+TEST_RUNNER = "config.test_runner.TestRunner"
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Cache des appartenances aux projets utilisé par les permissions (alias de CACHES, durée en secondes)
+MEMBERSHIP_CACHE_ALIAS = "default"
+MEMBERSHIP_CACHE_TIMEOUT = 300
+
+# Cache par utilisateur des réponses des listes (alias de CACHES, durée en secondes)
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = 60
+
+# Instrumentation des requêtes (en-tête Server-Timing, journal des requêtes lentes au-delà du seuil en ms)
+REQUEST_INSTRUMENTATION = os.environ.get("DJANGO_REQUEST_INSTRUMENTATION", "") == "1"
+SLOW_REQUEST_THRESHOLD_MS = 500
+
+# Profilage à la demande des requêtes par les admins (en-tête X-Profile: 1), activé par
+# DJANGO_REQUEST_PROFILING=1 ; nombre de captures gardées
+REQUEST_PROFILING = os.environ.get("DJANGO_REQUEST_PROFILING", "") == "1"
+REQUEST_PROFILING_DIR = BASE_DIR / "profiles"
+REQUEST_PROFILING_MAX = 50
+
+# Lectures (list, retrieve) des projets, issues et commentaires servies par des vues asynchrones
+# (projects.async_views) : activé par défaut sous ASGI (voir config/asgi.py)
+ASYNC_READ_VIEWS = os.environ.get("DJANGO_ASYNC_READ_VIEWS", "") == "1"
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -0,0 +1,151 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+
+# Modèles répartis par projet : ceux de l'application projects, sauf l'état des imports et les séquences d'ids
+SHARDED_APP = 'projects'
+GLOBAL_MODELS = ('importcheckpoint', 'importedobject', 'idsequence')
+
+_current_shard = ContextVar('current_shard', default=None)
+
+
+def get_shards():
+    return list(getattr(settings, 'SHARD_DATABASES', None) or [DEFAULT_DB_ALIAS])
+
+
+def is_sharded():
+    return len(get_shards()) > 1
+
+
+def is_sharded_model(model):
+    return model._meta.app_label == SHARDED_APP and model._meta.model_name not in GLOBAL_MODELS
+
+
+def shard_for_id(object_id):
+    """Shard d'un projet ou d'une issue d'après son id (voir allocate_ids), None si l'id est invalide"""
+    shards = get_shards()
+    try:
+        return shards[int(object_id) % len(shards)]
+    except (TypeError, ValueError):
+        return None
+
+
+def get_current_shard():
+    return _current_shard.get()
+
+
+@contextmanager
+def use_shard(alias):
+    """Envoie sur `alias` les requêtes des modèles répartis qui ne désignent pas d'objet (signaux, compteurs...)"""
+    token = _current_shard.set(alias)
+    try:
+        yield alias
+    finally:
+        _current_shard.reset(token)
+
+
+def activate(alias):
+    """Comme use_shard, pour une vue : le jeton retourné est passé à deactivate à la fin de la requête"""
+    return _current_shard.set(alias)
+
+
+def deactivate(token):
+    _current_shard.reset(token)
+
+
+def atomic():
+    """Transaction sur le shard courant"""
+    return transaction.atomic(using=get_current_shard() or DEFAULT_DB_ALIAS)
+
+
+def allocate_ids(model, count=1, shard=None):
+    """
+    Réserve `count` identifiants de `model` uniques sur tous les shards (séquence de la base par défaut).
+    Sans `shard`, l'identifiant choisit le shard (projets) ; avec `shard`, les identifiants sont choisis
+    pour que shard_for_id les y retrouve (issues, placées sur le shard de leur projet).
+    """
+    shards = get_shards()
+    name = model._meta.label_lower
+    sequences = apps.get_model('projects', 'IdSequence').objects.using(DEFAULT_DB_ALIAS)
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        # L'UPDATE d'abord : il verrouille la séquence avant sa lecture
+        if not sequences.filter(name=name).update(value=F('value') + count):
+            sequences.create(name=name, value=count)
+        last = sequences.get(name=name).value
+    numbers = range(last - count + 1, last + 1)
+    if shard is None:
+        return list(numbers)
+    return [number * len(shards) + shards.index(shard) for number in numbers]
+
+
+def assign_ids(instances, shard):
+    """Donne des identifiants globaux aux objets (non sauvegardés) d'un bulk_create sur `shard`"""
+    if not is_sharded() or not instances:
+        return
+    for instance, pk in zip(instances, allocate_ids(type(instances[0]), len(instances), shard)):
+        instance.pk = pk
+
+
+def get_instance_shard(instance):
+    """Shard d'un objet : celui d'où il a été lu, sinon celui de son projet"""
+    if instance._state.db and not instance._state.adding:
+        return instance._state.db
+    object_id = {
+        'project': 'pk', 'issue': 'project_id', 'comment': 'issue_id',
+    }.get(instance._meta.model_name)
+    if object_id and getattr(instance, object_id) is not None:
+        return shard_for_id(getattr(instance, object_id))
+    return instance._state.db
+
+
+def copy_users(users):
+    """
+    Recopie des utilisateurs de la base par défaut sur les autres shards : les tables des projets y font
+    référence (clés étrangères, jointures). Appelée à chaque sauvegarde d'un utilisateur.
+    """
+    for user in users:
+        model = type(user)
+        values = {field.attname: getattr(user, field.attname) for field in model._meta.concrete_fields
+                  if not field.primary_key}
+        for alias in get_shards():
+            if alias != DEFAULT_DB_ALIAS:
+                model._base_manager.using(alias).update_or_create(pk=user.pk, defaults=values)
+
+
+def delete_user_copies(user):
+    """Supprime les copies d'un utilisateur et, en cascade, ses objets sur chaque shard"""
+    for alias in get_shards():
+        if alias != DEFAULT_DB_ALIAS:
+            with use_shard(alias):
+                type(user)._base_manager.using(alias).filter(pk=user.pk).delete()
+
+
+class ProjectShardRouter:
+    """
+    Routeur des shards : les projets, avec leurs issues, commentaires et appartenances, sont répartis sur les
+    bases de SHARD_DATABASES selon l'id du projet. Un objet est lu et écrit sur son shard ; les requêtes qui
+    ne désignent pas d'objet vont sur le shard courant (use_shard, résolu par projects.mixins.ShardMixin).
+    Les autres modèles (utilisateurs...) restent sur la base par défaut, les utilisateurs étant recopiés
+    sur chaque shard. Sans shard configuré, le routeur ne décide rien.
+    """
+
+    def db_for_read(self, model, **hints):
+        return self.get_shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self.get_shard(model, hints)
+
+    @staticmethod
+    def get_shard(model, hints):
+        if not is_sharded() or not is_sharded_model(model):
+            return None
+        instance = hints.get('instance')
+        if instance is not None and is_sharded_model(type(instance)):
+            shard = get_instance_shard(instance)
+            if shard:
+                return shard
+        return get_current_shard()
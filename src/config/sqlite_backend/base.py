@@ -0,0 +1,30 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Backend SQLite de production. Deux options s'ajoutent à OPTIONS :
+    - `pragmas` : PRAGMA exécutés à l'ouverture de chaque connexion (journal_mode, synchronous,
+      busy_timeout, mmap_size...) ;
+    - `transaction_mode` : mode des transactions ouvertes par atomic(). Avec IMMEDIATE, le verrou d'écriture
+      est pris dès le BEGIN, pendant lequel busy_timeout s'applique ; une transaction DEFERRED qui lit puis
+      écrit échoue aussitôt (database is locked) si un autre écrivain a pris le verrou entre-temps.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop('pragmas', {})
+        self.transaction_mode = params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
+        else:
+            super()._start_transaction_under_autocommit()
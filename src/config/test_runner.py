@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+# Réplique et second shard ajoutés pendant les tests (voir projects.tests.test_replicas et test_sharding)
+TEST_DATABASES = ('test_replica', 'test_shard')
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Lanceur des tests (TEST_RUNNER) : ajoute à DATABASES une réplique et un second shard distincts de la base
+    principale, inactifs tant qu'un test ne les désigne pas (REPLICA_DATABASE_ALIAS, SHARD_DATABASES).
+    Leurs bases ne sont créées que pour les tests qui les déclarent (attribut `databases`).
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        for alias in TEST_DATABASES:
+            settings.DATABASES[alias] = {**settings.SQLITE_DATABASE, 'NAME': settings.BASE_DIR / f'{alias}.sqlite3'}
+        # connections.databases est le dictionnaire DATABASES : seules les valeurs par défaut restent à remplir
+        connections.configure_settings(settings.DATABASES)
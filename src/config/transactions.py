@@ -0,0 +1,31 @@
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connections, transaction, DEFAULT_DB_ALIAS
+
+LOCK_ERRORS = ('database is locked', 'database table is locked')
+
+
+def is_lock_error(exc):
+    return isinstance(exc, OperationalError) and any(message in str(exc) for message in LOCK_ERRORS)
+
+
+def run_atomic(func, *args, using=None, **kwargs):
+    """
+    Exécute `func` dans une transaction sur `using`. Si la base reste verrouillée par un autre écrivain
+    au-delà de son délai d'attente (busy_timeout), la transaction est rejouée jusqu'à WRITE_RETRY_ATTEMPTS fois
+    après une attente croissante : WRITE_RETRY_BACKOFF secondes, doublées à chaque essai, avec une part aléatoire.
+    Dans une transaction déjà ouverte, l'erreur est propagée : seule la transaction extérieure peut être rejouée.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    attempts = 1 if connections[using].in_atomic_block else getattr(settings, 'WRITE_RETRY_ATTEMPTS', 3)
+    backoff = getattr(settings, 'WRITE_RETRY_BACKOFF', 0.05)
+    for attempt in range(1, attempts + 1):
+        try:
+            with transaction.atomic(using=using):
+                return func(*args, **kwargs)
+        except OperationalError as exc:
+            if attempt == attempts or not is_lock_error(exc):
+                raise
+        time.sleep(backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
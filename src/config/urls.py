@@ -14,13 +14,16 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework import routers
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from authentication.views import UserViewSet
-from projects.views import ProjectViewSet, IssueViewSet, CommentViewSet
+from config.profiling import ProfileCaptureListView, ProfileCaptureDetailView
+from projects.async_views import async_read_urls
+from projects.views import ProjectViewSet, IssueViewSet, CommentViewSet, ResponseCacheStatsView, SyncView
 
 router = routers.SimpleRouter()
 router.register('user', UserViewSet, basename='user')
@@ -30,10 +33,20 @@ router.register('issue', IssueViewSet, basename='issue')
 router.register('comment', CommentViewSet, basename='comment')
 
 
-urlpatterns = [
-    path("admin/", admin.site.urls),
-    path('api-auth/', include('rest_framework.urls')),
-    path('api/token/', TokenObtainPairView.as_view(), name='obtain_tokens'),
-    path('api/token/refresh/', TokenRefreshView.as_view(), name='refresh_token'),
-    path('api/', include(router.urls)),
-]
+def build_urlpatterns(async_reads=False):
+    """Routes du projet ; avec `async_reads`, les lectures des viewsets de projets sont asynchrones"""
+    api_urls = async_read_urls(router.urls) if async_reads else router.urls
+    return [
+        path("admin/", admin.site.urls),
+        path('api-auth/', include('rest_framework.urls')),
+        path('api/token/', TokenObtainPairView.as_view(), name='obtain_tokens'),
+        path('api/token/refresh/', TokenRefreshView.as_view(), name='refresh_token'),
+        path('api/cache/stats/', ResponseCacheStatsView.as_view(), name='cache_stats'),
+        path('api/sync/', SyncView.as_view(), name='sync'),
+        path('api/profiles/', ProfileCaptureListView.as_view(), name='profile_captures'),
+        path('api/profiles/<slug:capture_id>/', ProfileCaptureDetailView.as_view(), name='profile_capture'),
+        path('api/', include(api_urls)),
+    ]
+
+
+urlpatterns = build_urlpatterns(settings.ASYNC_READ_VIEWS)
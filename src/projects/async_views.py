@@ -0,0 +1,180 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.urls import URLPattern
+from django.utils.cache import get_conditional_response
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.response import Response
+
+from config import sharding
+from config.instrumentation import span
+from projects import response_cache
+from projects.views import ProjectViewSet, IssueViewSet, CommentViewSet
+
+ASYNC_VIEWSETS = (ProjectViewSet, IssueViewSet, CommentViewSet)
+
+
+class AsyncReadView(View):
+    """
+    Vue montée à la place d'une route d'un viewset : les lectures (list, retrieve) sont traitées
+    en asynchrone (authentification JWT, permissions, ORM et pagination asynchrones), les autres
+    méthodes sont déléguées dans un thread à la vue DRF synchrone générée par le routeur.
+
+    Les filtres (django-filter, recherche plein texte) restent synchrones : ils ne sont exécutés
+    dans un thread que si la requête en contient, comme la sérialisation. Avec plusieurs shards, tout est délégué
+    à la vue synchrone, comme les documents composés (`?include=`).
+    """
+    sync_view = None
+
+    async def get(self, request, *args, **kwargs):
+        if sharding.is_sharded():
+            # Le shard courant est une variable de contexte de la requête : lectures faites par la vue synchrone
+            return await self.delegate(request, *args, **kwargs)
+        if self.sync_view.cls.include_param in request.GET:
+            # Documents composés : objets inclus chargés par prefetch, dans la vue synchrone
+            return await self.delegate(request, *args, **kwargs)
+        viewset = self.sync_view.cls(**self.sync_view.initkwargs)
+        viewset.action_map = self.sync_view.actions
+        viewset.args, viewset.kwargs = args, kwargs
+        viewset.headers = {}
+        drf_request = viewset.initialize_request(request, *args, **kwargs)
+        viewset.request = drf_request
+        try:
+            viewset.format_kwarg = viewset.get_format_suffix(**kwargs)
+            drf_request.accepted_renderer, drf_request.accepted_media_type = \
+                viewset.perform_content_negotiation(drf_request)
+            await self.authenticate(drf_request)
+            await self.check_permissions(viewset, drf_request)
+            viewset.check_throttles(drf_request)
+            if viewset.action == 'list':
+                response = await self.list(viewset, drf_request)
+            else:
+                response = await self.retrieve(viewset, drf_request)
+        except Exception as exc:
+            response = viewset.handle_exception(exc)
+        response = viewset.finalize_response(drf_request, response, *args, **kwargs)
+        if isinstance(response, Response):
+            response.render()
+        return response
+
+    async def post(self, request, *args, **kwargs):
+        return await self.delegate(request, *args, **kwargs)
+
+    put = patch = delete = options = post
+
+    async def delegate(self, request, *args, **kwargs):
+        return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+
+    @staticmethod
+    async def authenticate(request):
+        """Équivalent asynchrone de Request._authenticate"""
+        for authenticator in request.authenticators:
+            if hasattr(authenticator, 'aauthenticate'):
+                user_auth_tuple = await authenticator.aauthenticate(request)
+            else:
+                user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+        request._not_authenticated()
+
+    @staticmethod
+    async def check_permissions(viewset, request):
+        with span(request, 'permission'):
+            await AsyncReadView.run_permission_checks(viewset, request)
+
+    @staticmethod
+    async def run_permission_checks(viewset, request):
+        for permission in viewset.get_permissions():
+            if hasattr(permission, 'ahas_permission'):
+                allowed = await permission.ahas_permission(request, viewset)
+            else:
+                allowed = permission.has_permission(request, viewset)
+            if not allowed:
+                viewset.permission_denied(
+                    request, message=getattr(permission, 'message', None), code=getattr(permission, 'code', None)
+                )
+
+    @staticmethod
+    async def check_object_permissions(viewset, request, obj):
+        with span(request, 'permission'):
+            await AsyncReadView.run_object_permission_checks(viewset, request, obj)
+
+    @staticmethod
+    async def run_object_permission_checks(viewset, request, obj):
+        for permission in viewset.get_permissions():
+            if hasattr(permission, 'ahas_object_permission'):
+                allowed = await permission.ahas_object_permission(request, viewset, obj)
+            else:
+                allowed = permission.has_object_permission(request, viewset, obj)
+            if not allowed:
+                viewset.permission_denied(
+                    request, message=getattr(permission, 'message', None), code=getattr(permission, 'code', None)
+                )
+
+    @staticmethod
+    async def filter_queryset(viewset, request, queryset):
+        """Les filtres ne sont appliqués (dans un thread) que si la requête en contient"""
+        filter_params = {*getattr(viewset, 'filterset_fields', ()), 'search'}
+        if filter_params.intersection(request.query_params):
+            return await sync_to_async(viewset.filter_queryset)(queryset)
+        return queryset
+
+    async def list(self, viewset, request):
+        key = response_cache.make_key(request, viewset.basename)
+        cached = viewset.get_cached_response(request, key)
+        if cached is not None:
+            return cached
+
+        generation = response_cache.get_list_generation(request, viewset.basename)
+        queryset = await self.filter_queryset(viewset, request, viewset.route_queryset(viewset.get_queryset()))
+        if viewset.use_rows():
+            # Sans filtre, viewset.filter_queryset n'a pas été appelé (values_list peut être répété)
+            queryset = viewset.get_row_queryset(queryset)
+        page = await viewset.paginator.apaginate_queryset(queryset, request, view=viewset)
+        objects = page if page is not None else [obj async for obj in queryset]
+        etag, last_modified = viewset.get_list_validators(generation, objects, queryset.db)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            data = await self.serialize(viewset, objects, many=True)
+            response = viewset.get_paginated_response(data) if page is not None else Response(data)
+        return viewset.cache_response(key, viewset.set_validators(response, etag, last_modified), using=queryset.db)
+
+    async def retrieve(self, viewset, request):
+        lookup = {viewset.lookup_field: viewset.kwargs[viewset.lookup_url_kwarg or viewset.lookup_field]}
+        queryset = await self.filter_queryset(viewset, request, viewset.route_queryset(viewset.get_queryset()))
+        try:
+            state = await queryset.prefetch_related(None).filter(**lookup) \
+                .values_list('version', 'updated_time').afirst()
+            obj = await queryset.aget(**lookup) if state else None
+        except (TypeError, ValueError, ValidationError, queryset.model.DoesNotExist):
+            obj = None
+        if obj is None:
+            raise Http404
+        await self.check_object_permissions(viewset, request, obj)
+
+        etag, last_modified = viewset.get_object_validators(*state)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = Response(await self.serialize(viewset, obj))
+        return viewset.set_validators(response, etag, last_modified)
+
+    @staticmethod
+    async def serialize(viewset, *args, **kwargs):
+        """Données du sérialiseur, produites dans un thread : un champ peut lire une relation non préchargée"""
+        return await sync_to_async(lambda: viewset.serializer_data(viewset.get_serializer(*args, **kwargs)))()
+
+
+def async_read_urls(urlpatterns):
+    """Remplace les routes des viewsets de projets, issues et commentaires par des AsyncReadView"""
+    patterns = []
+    for pattern in urlpatterns:
+        callback = pattern.callback
+        if getattr(callback, 'cls', None) in ASYNC_VIEWSETS and callback.actions.get('get') in ('list', 'retrieve'):
+            # Comme les vues DRF, l'authentification par jeton n'utilise pas la protection CSRF
+            view = csrf_exempt(AsyncReadView.as_view(sync_view=callback))
+            pattern = URLPattern(pattern.pattern, view, pattern.default_args, pattern.name)
+        patterns.append(pattern)
+    return patterns
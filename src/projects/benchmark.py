@@ -0,0 +1,203 @@
+import statistics
+import time
+from dataclasses import dataclass, field
+
+from django.db import connection, reset_queries, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from authentication.models import User
+from projects.models import Project, Issue, Comment, Membership
+from projects.seeding import SEED_PASSWORD
+
+# Espaces de noms hors API (administration, connexion de l'API navigable)
+EXCLUDED_NAMESPACES = ('admin', 'rest_framework')
+IGNORED_METHODS = ('head', 'options', 'trace')
+
+
+@dataclass
+class Scenario:
+    """Requête mesurée : `write` l'exécute dans un savepoint annulé, `staff` avec un compte admin"""
+    route: str
+    method: str
+    path: str
+    data: object = None
+    label: str = ''
+    write: bool = False
+    staff: bool = False
+    timings: list = field(default_factory=list)
+    queries: list = field(default_factory=list)
+    status: int = None
+
+    @property
+    def name(self):
+        return f"{self.method.upper()} {self.route}{f' {self.label}' if self.label else ''}"
+
+
+def api_routes():
+    """Couples (nom de route, méthode HTTP) de toutes les routes de config/urls.py hors EXCLUDED_NAMESPACES"""
+    routes = set()
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                if pattern.namespace not in EXCLUDED_NAMESPACES:
+                    walk(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                callback = pattern.callback
+                sync_view = getattr(callback, 'view_initkwargs', {}).get('sync_view')
+                callback = sync_view or callback
+                if getattr(callback, 'actions', None):
+                    methods = callback.actions
+                else:
+                    view_class = getattr(callback, 'cls', None) or getattr(callback, 'view_class', None)
+                    methods = [method for method in view_class.http_method_names if hasattr(view_class, method)]
+                routes.update((pattern.name, method) for method in methods if method not in IGNORED_METHODS)
+
+    walk(get_resolver().url_patterns)
+    return routes
+
+
+class BenchmarkData:
+    """Objets de la base utilisés par les scénarios, choisis pour que l'utilisateur puisse les modifier"""
+
+    def __init__(self, username=None):
+        if username:
+            self.user = User.objects.get(username=username)
+            self.project = Project.objects.filter(author=self.user).order_by('-issue_count').first()
+        else:
+            self.project = Project.objects.order_by('-issue_count', 'id').first()
+            self.user = self.project.author if self.project else None
+        if self.project is None:
+            raise ValueError('No project to benchmark, generate data with the seed_data command')
+        issues = Issue.objects.filter(project=self.project)
+        self.issue = issues.filter(author=self.user).order_by('-comment_count').first() or issues.first()
+        self.own_issue_ids = list(issues.filter(author=self.user).values_list('id', flat=True)[:50]) or [0]
+        comments = Comment.objects.filter(issue__project=self.project)
+        self.comment = comments.filter(author=self.user).first() or comments.first()
+        self.outsider = User.objects.exclude(
+            id__in=Membership.objects.filter(project=self.project).values('user_id')
+        ).exclude(is_staff=True).first()
+        self.staff = User.objects.filter(is_staff=True).first() or User.objects.create_user(
+            username='bench-admin', password=SEED_PASSWORD, birth_date='1990-01-01', can_be_contacted=False,
+            can_data_be_shared=False, is_staff=True,
+        )
+
+
+def build_scenarios(data):
+    """Scénarios couvrant chaque route et méthode de l'API (les variantes de liste ont un libellé)"""
+    project, issue, comment, user = data.project, data.issue, data.comment, data.user
+    project_detail = reverse('project-detail', args=[project.pk])
+    issue_detail = reverse('issue-detail', args=[issue.pk]) if issue else None
+    comment_detail = reverse('comment-detail', args=[comment.pk]) if comment else None
+    user_detail = reverse('user-detail', args=[user.pk])
+    new_user = {
+        'username': 'bench-new-user', 'password': 'Bench-pass-2024', 'password2': 'Bench-pass-2024',
+        'birth_date': '1990-01-01', 'can_be_contacted': True, 'can_data_be_shared': False,
+    }
+    new_issue = {'name': 'bench issue', 'project': project.pk, 'description': 'bench', 'tag': 'BUG',
+                 'priority': 'High'}
+    scenarios = [
+        Scenario('obtain_tokens', 'post', reverse('obtain_tokens'),
+                 {'username': user.username, 'password': SEED_PASSWORD}),
+        Scenario('refresh_token', 'post', reverse('refresh_token'), {'refresh': str(RefreshToken.for_user(user))}),
+        Scenario('cache_stats', 'get', reverse('cache_stats'), staff=True),
+        Scenario('profile_captures', 'get', reverse('profile_captures'), staff=True),
+        Scenario('user-list', 'get', reverse('user-list'), staff=True),
+        Scenario('user-list', 'post', reverse('user-list'), new_user, write=True),
+        Scenario('user-detail', 'get', user_detail),
+        Scenario('user-detail', 'put', user_detail, {**new_user, 'username': user.username}, write=True),
+        Scenario('user-detail', 'patch', user_detail, {'can_be_contacted': True}, write=True),
+        Scenario('user-detail', 'delete', user_detail, write=True),
+        Scenario('project-list', 'get', reverse('project-list')),
+        Scenario('project-list', 'get', reverse('project-list') + '?cursor=', label='cursor'),
+        Scenario('project-list', 'get', reverse('project-list') + '?search=api', label='search'),
+        Scenario('project-list', 'post', reverse('project-list'),
+                 {'name': 'bench project', 'description': 'bench', 'type': 'iOS'}, write=True),
+        Scenario('project-detail', 'get', project_detail),
+        Scenario('project-detail', 'put', project_detail,
+                 {'name': 'bench renamed project', 'description': 'bench', 'type': 'iOS'}, write=True),
+        Scenario('project-detail', 'patch', project_detail, {'description': 'bench'}, write=True),
+        Scenario('project-detail', 'delete', project_detail, write=True),
+        Scenario('project-add-contributor', 'post', reverse('project-add-contributor', args=[project.pk]),
+                 {'username': data.outsider.username if data.outsider else user.username}, write=True),
+        Scenario('project-export', 'get', reverse('project-export', args=[project.pk])),
+        Scenario('project-export', 'get', reverse('project-export', args=[project.pk]) + '?output=csv', label='csv'),
+        Scenario('issue-list', 'get', reverse('issue-list')),
+        Scenario('issue-list', 'get', f"{reverse('issue-list')}?project={project.pk}&cursor=", label='project cursor'),
+        Scenario('issue-list', 'get', reverse('issue-list') + '?search=api', label='search'),
+        Scenario('issue-list', 'post', reverse('issue-list'), new_issue, write=True),
+        Scenario('issue-bulk', 'post', reverse('issue-bulk'), [new_issue] * 20, write=True),
+        Scenario('issue-bulk-update', 'patch', f"{reverse('issue-bulk-update')}?project={project.pk}",
+                 {'ids': data.own_issue_ids, 'priority': 'Low'}, write=True),
+        Scenario('comment-list', 'get', reverse('comment-list')),
+        Scenario('comment-list', 'get', reverse('comment-list') + '?search=api', label='search'),
+    ]
+    if issue_detail:
+        scenarios += [
+            Scenario('issue-detail', 'get', issue_detail),
+            Scenario('issue-detail', 'put', issue_detail, new_issue, write=True),
+            Scenario('issue-detail', 'patch', issue_detail, {'priority': 'Low'}, write=True),
+            Scenario('issue-detail', 'delete', issue_detail, write=True),
+            Scenario('comment-list', 'post', reverse('comment-list'), {'issue': issue.pk, 'description': 'bench'},
+                     write=True),
+            Scenario('comment-bulk', 'post', reverse('comment-bulk'),
+                     [{'issue': issue.pk, 'description': 'bench'}] * 20, write=True),
+        ]
+    if comment_detail:
+        scenarios += [
+            Scenario('comment-detail', 'get', comment_detail),
+            Scenario('comment-detail', 'put', comment_detail, {'issue': comment.issue_id, 'description': 'bench'},
+                     write=True),
+            Scenario('comment-detail', 'patch', comment_detail, {'description': 'bench'}, write=True),
+            Scenario('comment-detail', 'delete', comment_detail, write=True),
+        ]
+    return scenarios
+
+
+def client_for(user):
+    return Client(headers={'Authorization': f'Bearer {AccessToken.for_user(user)}'})
+
+
+def run_scenario(scenario, client, iterations, warmup=1):
+    """Exécute le scénario `warmup` fois sans mesure puis `iterations` fois en mesurant durée et requêtes SQL"""
+    for iteration in range(warmup + iterations):
+        # Le journal des requêtes est borné : il est vidé pour que le décompte reste exact
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            if scenario.write:
+                with transaction.atomic():
+                    response = request(client, scenario)
+                    transaction.set_rollback(True)
+            else:
+                response = request(client, scenario)
+            elapsed = time.perf_counter() - started
+        if iteration >= warmup:
+            scenario.timings.append(elapsed)
+            scenario.queries.append(len(queries))
+        scenario.status = response.status_code
+
+
+def request(client, scenario):
+    response = getattr(client, scenario.method)(scenario.path, scenario.data, content_type='application/json') \
+        if scenario.data is not None else getattr(client, scenario.method)(scenario.path)
+    if response.streaming:
+        # Le contenu d'une réponse en flux est produit pendant sa lecture
+        for chunk in response.streaming_content:
+            pass
+    return response
+
+
+def summarize(scenario):
+    milliseconds = [timing * 1000 for timing in scenario.timings]
+    percentiles = statistics.quantiles(milliseconds, n=100, method='inclusive') if len(milliseconds) > 1 \
+        else milliseconds * 99
+    return {
+        'route': scenario.route, 'method': scenario.method.upper(), 'path': scenario.path, 'status': scenario.status,
+        'iterations': len(milliseconds), 'mean_ms': round(statistics.fmean(milliseconds), 3),
+        'p50_ms': round(percentiles[49], 3), 'p95_ms': round(percentiles[94], 3), 'p99_ms': round(percentiles[98], 3),
+        'queries': max(scenario.queries),
+    }
@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.core.cache import caches
+
+from config import sharding
+from projects.models import Issue, Comment, Membership
+
+USER_PROJECTS_KEY = 'membership:user:{}'
+ISSUE_PROJECT_KEY = 'membership:issue:{}'
+COMMENT_ISSUE_KEY = 'membership:comment:{}'
+
+
+def get_cache():
+    """Retourne le cache utilisé pour les appartenances (alias configurable dans les settings)"""
+    return caches[getattr(settings, 'MEMBERSHIP_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'MEMBERSHIP_CACHE_TIMEOUT', 300)
+
+
+def get_user_project_ids(user_id):
+    """Retourne l'ensemble des ids des projets auxquels contribue l'utilisateur"""
+    cache = get_cache()
+    key = USER_PROJECTS_KEY.format(user_id)
+    project_ids = cache.get(key)
+    if project_ids is None:
+        # Les appartenances sont sur le shard de chaque projet (voir config.sharding)
+        project_ids = set()
+        for shard in sharding.get_shards():
+            memberships = Membership.objects.using(shard).filter(user_id=user_id)
+            project_ids.update(memberships.values_list('project_id', flat=True))
+        cache.set(key, project_ids, get_timeout())
+    return project_ids
+
+
+def get_issue_project_id(issue_id):
+    """Retourne l'id du projet de l'issue, ou None si l'issue n'existe pas"""
+    cache = get_cache()
+    key = ISSUE_PROJECT_KEY.format(issue_id)
+    project_id = cache.get(key)
+    if project_id is None:
+        project_id = Issue.objects.filter(id=issue_id).values_list('project_id', flat=True).first()
+        if project_id is not None:
+            cache.set(key, project_id, get_timeout())
+    return project_id
+
+
+def get_comment_issue_id(comment_id):
+    """Retourne l'id de l'issue du commentaire, ou None si le commentaire n'existe pas"""
+    cache = get_cache()
+    key = COMMENT_ISSUE_KEY.format(comment_id)
+    issue_id = cache.get(key)
+    if issue_id is None:
+        issue_id = Comment.objects.filter(id=comment_id).values_list('issue_id', flat=True).first()
+        if issue_id is not None:
+            cache.set(key, issue_id, get_timeout())
+    return issue_id
+
+
+def is_project_contributor(user_id, project_id):
+    return project_id in get_user_project_ids(user_id)
+
+
+async def aget_user_project_ids(user_id):
+    """Version asynchrone de get_user_project_ids"""
+    cache = get_cache()
+    key = USER_PROJECTS_KEY.format(user_id)
+    project_ids = await cache.aget(key)
+    if project_ids is None:
+        # Comme get_user_project_ids, les appartenances sont lues sur chaque shard
+        project_ids = set()
+        for shard in sharding.get_shards():
+            memberships = Membership.objects.using(shard).filter(user_id=user_id)
+            project_ids.update([project_id async for project_id in memberships.values_list('project_id', flat=True)])
+        await cache.aset(key, project_ids, get_timeout())
+    return project_ids
+
+
+async def aget_issue_project_id(issue_id):
+    """Version asynchrone de get_issue_project_id"""
+    cache = get_cache()
+    key = ISSUE_PROJECT_KEY.format(issue_id)
+    project_id = await cache.aget(key)
+    if project_id is None:
+        project_id = await Issue.objects.filter(id=issue_id).values_list('project_id', flat=True).afirst()
+        if project_id is not None:
+            await cache.aset(key, project_id, get_timeout())
+    return project_id
+
+
+async def aget_comment_issue_id(comment_id):
+    """Version asynchrone de get_comment_issue_id"""
+    cache = get_cache()
+    key = COMMENT_ISSUE_KEY.format(comment_id)
+    issue_id = await cache.aget(key)
+    if issue_id is None:
+        issue_id = await Comment.objects.filter(id=comment_id).values_list('issue_id', flat=True).afirst()
+        if issue_id is not None:
+            await cache.aset(key, issue_id, get_timeout())
+    return issue_id
+
+
+async def ais_project_contributor(user_id, project_id):
+    return project_id in await aget_user_project_ids(user_id)
+
+
+def invalidate_users(user_ids):
+    get_cache().delete_many([USER_PROJECTS_KEY.format(user_id) for user_id in user_ids])
+
+
+def invalidate_project(project):
+    """Invalide les appartenances de tous les contributeurs du projet"""
+    invalidate_users(project.memberships.values_list('user_id', flat=True))
+
+
+def invalidate_issue(issue_id):
+    get_cache().delete(ISSUE_PROJECT_KEY.format(issue_id))
+
+
+def invalidate_issues(issue_ids):
+    get_cache().delete_many([ISSUE_PROJECT_KEY.format(issue_id) for issue_id in issue_ids])
+
+
+def invalidate_comments(comment_ids):
+    get_cache().delete_many([COMMENT_ISSUE_KEY.format(comment_id) for comment_id in comment_ids])
@@ -0,0 +1,115 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from projects.models import Project, Issue, Comment
+from projects.versions import bump
+
+
+def added(field, count):
+    """
+    Expression `field + count`, ramenée à 0 si elle deviendrait négative : un compteur qui a dérivé
+    (voir recount) ne doit pas faire échouer l'écriture sur la contrainte des PositiveIntegerField
+    """
+    return Greatest(F(field) + count, Value(0)) if count < 0 else F(field) + count
+
+
+def issues_added(project_id, count=1):
+    """Ajoute `count` (éventuellement négatif) au compteur d'issues du projet, qui change de version"""
+    Project.objects.filter(pk=project_id).update(issue_count=added('issue_count', count), **bump())
+
+
+def comments_added(issue_id, count=1):
+    """
+    Ajoute `count` (éventuellement négatif) aux compteurs de commentaires de l'issue et de son projet,
+    qui changent de version
+    """
+    Issue.objects.filter(pk=issue_id).update(comment_count=added('comment_count', count), **bump())
+    Project.objects.filter(issues=issue_id).update(comment_count=added('comment_count', count), **bump())
+
+
+def issue_moved(issue, previous_project_id):
+    """Reporte les compteurs d'une issue déplacée d'un projet à un autre"""
+    Project.objects.filter(pk=previous_project_id).update(
+        issue_count=added('issue_count', -1), comment_count=added('comment_count', -issue.comment_count), **bump()
+    )
+    Project.objects.filter(pk=issue.project_id).update(
+        issue_count=F('issue_count') + 1, comment_count=F('comment_count') + issue.comment_count, **bump()
+    )
+
+
+def add_counts(model, field, counts, chunk_size=1000):
+    """
+    Ajoute à `field` le nombre associé à chaque clé primaire de `counts` ({pk: nombre}) :
+    les objets sont regroupés par nombre, soit une requête UPDATE par valeur distincte (et par bloc
+    de `chunk_size` objets) au lieu d'une par objet.
+    """
+    by_count = defaultdict(list)
+    for pk, count in counts.items():
+        by_count[count].append(pk)
+    for count, pks in by_count.items():
+        for start in range(0, len(pks), chunk_size):
+            model.objects.filter(pk__in=pks[start:start + chunk_size]).update(**{field: added(field, count)}, **bump())
+
+
+def bulk_issues_added(issues):
+    add_counts(Project, 'issue_count', Counter(issue.project_id for issue in issues))
+
+
+def bulk_comments_added(comments):
+    issue_counts = Counter(comment.issue_id for comment in comments)
+    add_counts(Issue, 'comment_count', issue_counts)
+    project_counts = Counter()
+    for issue_id, project_id in Issue.objects.filter(id__in=issue_counts).values_list('id', 'project_id'):
+        project_counts[project_id] += issue_counts[issue_id]
+    add_counts(Project, 'comment_count', project_counts)
+
+
+def rows_deleted(project_ids, issue_projects, comment_issues):
+    """
+    Retire des compteurs les issues et les commentaires supprimés ensemble par une même cascade :
+    `project_ids` sont les projets supprimés, `issue_projects` les issues supprimées ({id: project_id})
+    et `comment_issues` les commentaires supprimés ({id: issue_id}). Seuls les projets et les issues
+    restants sont modifiés, par une requête par valeur distincte ; retourne les ids de ces projets.
+    """
+    issue_counts = Counter(issue_id for issue_id in comment_issues.values() if issue_id not in issue_projects)
+    project_of = dict(Issue.objects.filter(id__in=issue_counts).values_list('id', 'project_id')) if issue_counts else {}
+    project_of.update(issue_projects)
+    project_issue_counts = Counter(issue_projects.values())
+    project_comment_counts = Counter(project_of[issue_id] for issue_id in comment_issues.values()
+                                     if issue_id in project_of)
+    for counts in (project_issue_counts, project_comment_counts):
+        for project_id in project_ids:
+            counts.pop(project_id, None)
+    add_counts(Issue, 'comment_count', {issue_id: -count for issue_id, count in issue_counts.items()})
+    add_counts(Project, 'issue_count', {project_id: -count for project_id, count in project_issue_counts.items()})
+    add_counts(Project, 'comment_count',
+               {project_id: -count for project_id, count in project_comment_counts.items()})
+    return set(project_issue_counts) | set(project_comment_counts)
+
+
+def count_subquery(queryset, field):
+    """Sous-requête comptant les lignes de `queryset` liées à la ligne courante par `field`"""
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('pk'))
+    return Coalesce(Subquery(counts.values('total'), output_field=IntegerField()), Value(0))
+
+
+def recount(dry_run=False):
+    """
+    Recalcule tous les compteurs à partir des tables et corrige ceux qui ont dérivé.
+    Retourne le nombre de projets et d'issues dont les compteurs étaient faux.
+    """
+    issues = Issue.objects.alias(actual=count_subquery(Comment.objects.all(), 'issue')).exclude(
+        comment_count=F('actual')
+    )
+    projects = Project.objects.alias(
+        actual_issues=count_subquery(Issue.objects.all(), 'project'),
+        actual_comments=count_subquery(Comment.objects.all(), 'issue__project'),
+    ).exclude(issue_count=F('actual_issues'), comment_count=F('actual_comments'))
+    if dry_run:
+        return projects.count(), issues.count()
+
+    fixed_issues = issues.update(comment_count=F('actual'))
+    fixed_projects = projects.update(issue_count=F('actual_issues'), comment_count=F('actual_comments'))
+    return fixed_projects, fixed_issues
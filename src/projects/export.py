@@ -0,0 +1,85 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from projects.models import Project, Issue, Comment
+
+PROJECT_FIELDS = ('id', 'name', 'description', 'type', 'author', 'created_time', 'updated_time')
+ISSUE_FIELDS = ('id', 'project', 'name', 'description', 'priority', 'tag', 'contributor', 'author',
+                'created_time', 'updated_time')
+COMMENT_FIELDS = ('id', 'issue', 'description', 'author', 'created_time', 'updated_time')
+
+# Colonnes du CSV : le type d'enregistrement puis l'union des champs exportés
+CSV_COLUMNS = ('record', 'id', 'project', 'issue', 'name', 'description', 'type', 'priority', 'tag',
+               'contributor', 'author', 'created_time', 'updated_time')
+
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def get_chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def export_records(project_id, chunk_size=None, using=None):
+    """
+    Parcourt le projet puis ses issues et ses commentaires sous forme de dictionnaires (`values()`),
+    lus par blocs de `chunk_size` lignes avec un curseur serveur : la mémoire reste constante.
+    Les lignes sont lues sur la base `using` (shard du projet), le contenu étant produit après la vue.
+    """
+    chunk_size = chunk_size or get_chunk_size()
+    project = Project.objects.using(using).filter(pk=project_id).values(*PROJECT_FIELDS).first()
+    if project is None:
+        return
+    yield 'project', project
+    issues = Issue.objects.using(using).filter(project_id=project_id).order_by('id').values(*ISSUE_FIELDS)
+    for issue in issues.iterator(chunk_size=chunk_size):
+        yield 'issue', issue
+    comments = Comment.objects.using(using).filter(issue__project_id=project_id).order_by('issue_id') \
+        .values(*COMMENT_FIELDS)
+    for comment in comments.iterator(chunk_size=chunk_size):
+        yield 'comment', comment
+
+
+def batched(lines, size):
+    """Regroupe les lignes produites par blocs de `size` pour limiter le nombre d'écritures sur la socket"""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def plain_values(values):
+    """Dates au format ISO 8601 complet (microsecondes comprises), identique en NDJSON et en CSV"""
+    return {key: value.isoformat() if hasattr(value, 'isoformat') else value for key, value in values.items()}
+
+
+def to_ndjson(records):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for record, values in records:
+        yield encoder.encode({'record': record, **plain_values(values)}) + '\n'
+
+
+class LineBuffer:
+    """Pseudo-fichier qui retourne la ligne écrite par csv.writer au lieu de la stocker"""
+    def write(self, value):
+        return value
+
+
+def to_csv(records):
+    writer = csv.DictWriter(LineBuffer(), fieldnames=CSV_COLUMNS)
+    yield writer.writeheader()
+    for record, values in records:
+        yield writer.writerow({'record': record, **plain_values(values)})
+
+
+def stream_export(project_id, output='ndjson', chunk_size=None, using=None):
+    """Retourne le générateur du contenu de l'export du projet au format `output` (ndjson ou csv)"""
+    chunk_size = chunk_size or get_chunk_size()
+    formatter = to_csv if output == 'csv' else to_ndjson
+    return batched(formatter(export_records(project_id, chunk_size, using)), chunk_size)
@@ -0,0 +1,347 @@
+import json
+import time
+import uuid
+from datetime import datetime, time as datetime_time, timezone as datetime_timezone
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections, router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from authentication.models import User
+from projects import cache, counters, response_cache
+from projects.models import Project, Issue, Comment, Contributor, Membership, ImportCheckpoint, ImportedObject, \
+    TypeChoices, PriorityChoices, IssueTagChoices
+
+# Flux importés, dans l'ordre des dépendances entre objets
+STREAMS = ('users', 'projects', 'contributors', 'issues', 'comments')
+
+
+class RowError(ValueError):
+    """Ligne d'un flux impossible à importer"""
+
+
+def read_batches(file, start, size):
+    """Lit le fichier NDJSON par lots de `size` lignes (numéro, ligne), à partir de la ligne `start`"""
+    batch = []
+    for number, line in enumerate(file, start=1):
+        if number <= start:
+            continue
+        batch.append((number, line))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def parse_timestamp(value, default):
+    if not value:
+        return default
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise RowError(f'Invalid date: {value}')
+        parsed = datetime.combine(day, datetime_time())
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, datetime_timezone.utc)
+    return parsed
+
+
+def required(row, field):
+    value = row.get(field)
+    if value in (None, ''):
+        raise RowError(f'Missing field: {field}')
+    return value
+
+
+def is_uuid(value):
+    try:
+        uuid.UUID(str(value))
+    except ValueError:
+        return False
+    return True
+
+
+def choice(row, field, choices):
+    value = required(row, field)
+    if value not in choices.values:
+        raise RowError(f'Invalid {field}: {value}')
+    return value
+
+
+class SoftDeskImporter:
+    """
+    Import de flux NDJSON (users, projects, contributors, issues, comments) par lots.
+
+    Chaque lot est validé ligne par ligne, ses clés étrangères sont résolues depuis les correspondances
+    d'identifiants gardées en mémoire (complétées au besoin depuis ImportedObject), puis il est écrit avec
+    `bulk_create` dans une transaction qui enregistre aussi les nouvelles correspondances et l'avancement
+    du flux (ImportCheckpoint) : un import interrompu reprend exactement après le dernier lot validé.
+    Les lignes invalides sont ignorées et listées dans `errors`.
+    """
+
+    def __init__(self, source, batch_size=5000):
+        self.source = source
+        self.batch_size = batch_size
+        self.ids = {'user': {}, 'project': {}, 'issue': {}}
+        self.errors = []
+        self.touched_projects = set()
+
+    def reset(self):
+        ImportCheckpoint.objects.filter(source=self.source).delete()
+        ImportedObject.objects.filter(source=self.source).delete()
+
+    def import_stream(self, stream, file):
+        """Importe un flux ; retourne (lignes lues, objets créés, durée en secondes)"""
+        checkpoint, created = ImportCheckpoint.objects.get_or_create(source=self.source, stream=stream)
+        handler = getattr(self, f'import_{stream}')
+        lines = created_count = 0
+        started = time.perf_counter()
+        for batch in read_batches(file, checkpoint.lines, self.batch_size):
+            rows = []
+            for number, line in batch:
+                if not line.strip():
+                    continue
+                try:
+                    rows.append((number, json.loads(line)))
+                except json.JSONDecodeError as e:
+                    self.errors.append((stream, number, f'Invalid JSON: {e}'))
+            with transaction.atomic():
+                created_count += handler(rows)
+                checkpoint.lines = batch[-1][0]
+                checkpoint.save(update_fields=['lines'])
+            lines += len(batch)
+        return lines, created_count, time.perf_counter() - started
+
+    def finish(self):
+        """Invalide les caches des projets modifiés par l'import"""
+        if self.touched_projects:
+            cache.invalidate_users(response_cache.get_project_user_ids(self.touched_projects))
+            response_cache.invalidate_projects(self.touched_projects, response_cache.ALL_LISTS)
+
+    def validate(self, stream, rows, build, kind=None):
+        """
+        Construit l'objet de chaque ligne avec `build` ; retourne les couples (ligne, objet) valides.
+        Avec `kind`, une ligne dont l'identifiant source a déjà été importé est rejetée.
+        """
+        if kind:
+            self.resolve(kind, [row.get('id') for number, row in rows])
+        valid, seen = [], set()
+        for number, row in rows:
+            try:
+                if kind:
+                    source_id = str(required(row, 'id'))
+                    if source_id in self.ids[kind] or source_id in seen:
+                        raise RowError(f'Duplicate id: {source_id}')
+                    seen.add(source_id)
+                valid.append((row, build(row)))
+            except (RowError, TypeError, ValueError) as e:
+                self.errors.append((stream, number, str(e)))
+        return valid
+
+    def resolve(self, kind, source_ids):
+        """Charge en mémoire les correspondances d'identifiants `kind` manquantes"""
+        known = self.ids[kind]
+        missing = {str(source_id) for source_id in source_ids if source_id is not None} - known.keys()
+        if missing:
+            known.update(
+                ImportedObject.objects.filter(source=self.source, kind=kind, source_id__in=missing)
+                .values_list('source_id', 'object_id')
+            )
+
+    def lookup(self, kind, row, field):
+        object_id = self.ids[kind].get(str(required(row, field)))
+        if object_id is None:
+            raise RowError(f'Unknown {field}: {row[field]}')
+        return object_id
+
+    def bulk_create(self, model, objects):
+        """
+        Écrit les objets par lots d'un seul INSERT en gardant les dates de la source : l'insertion est brute
+        (`raw`), sans le pre_save des champs auto_now / auto_now_add qui les remplacerait par l'heure courante.
+        Chaque ligne n'est écrite qu'une fois : les triggers (journal des modifications, index plein texte)
+        ne s'exécutent qu'à l'insertion.
+        """
+        if not objects:
+            return objects
+        using = router.db_for_write(model)
+        connection = connections[using]
+        fields = [field for field in model._meta.concrete_fields if not field.generated]
+        returning_fields = model._meta.db_returning_fields
+        if objects[0].pk is None:
+            fields = [field for field in fields if field not in returning_fields]
+        # Sans RETURNING sur plusieurs lignes, l'id de chaque objet n'est connu qu'en l'insérant seul
+        batch_size = 1
+        if connection.features.can_return_rows_from_bulk_insert:
+            batch_size = min(self.batch_size, max(connection.ops.bulk_batch_size(fields, objects), 1))
+        for start in range(0, len(objects), batch_size):
+            batch = objects[start:start + batch_size]
+            rows = model._base_manager._insert(batch, fields, returning_fields=returning_fields, raw=True,
+                                               using=using)
+            for obj, row in zip(batch, rows):
+                for field, value in zip(returning_fields, row):
+                    setattr(obj, field.attname, value)
+                obj._state.adding, obj._state.db = False, using
+        return objects
+
+    def remember(self, kind, created):
+        """Enregistre les correspondances (identifiant source, objet créé)"""
+        mappings = [(str(required(row, 'id')), obj.pk) for row, obj in created]
+        ImportedObject.objects.bulk_create([
+            ImportedObject(source=self.source, kind=kind, source_id=source_id, object_id=object_id)
+            for source_id, object_id in mappings
+        ])
+        self.ids[kind].update(mappings)
+
+    def import_users(self, rows):
+        """Les utilisateurs dont le nom existe déjà sont réutilisés et non recréés"""
+        usernames = {row.get('username') for number, row in rows}
+        existing = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+        seen = set()
+        now = timezone.now()
+
+        def build(row):
+            username = required(row, 'username')
+            if username in existing:
+                return User(pk=existing[username])
+            if username in seen:
+                raise RowError(f'Duplicate username: {username}')
+            birth_date = parse_date(required(row, 'birth_date'))
+            if birth_date is None:
+                raise RowError(f"Invalid birth_date: {row['birth_date']}")
+            seen.add(username)
+            return User(
+                username=username, email=row.get('email', ''), first_name=row.get('first_name', ''),
+                last_name=row.get('last_name', ''), birth_date=birth_date,
+                can_be_contacted=bool(row.get('can_be_contacted', False)),
+                can_data_be_shared=bool(row.get('can_data_be_shared', False)),
+                password=row.get('password') or make_password(None), is_active=row.get('is_active', True),
+                date_joined=parse_timestamp(row.get('date_joined'), now),
+            )
+
+        valid = self.validate('users', rows, build, kind='user')
+        new_users = [user for row, user in valid if user.pk is None]
+        User.objects.bulk_create(new_users, batch_size=self.batch_size)
+        self.remember('user', valid)
+        return len(new_users)
+
+    def import_projects(self, rows):
+        """Comme par l'API, le nom d'un projet est unique : un nom déjà pris (base ou lot) rejette la ligne"""
+        self.resolve('user', [row.get('author') for number, row in rows])
+        names = {row.get('name') for number, row in rows if isinstance(row.get('name'), str)}
+        taken = set(Project.objects.filter(name__in=names).values_list('name', flat=True))
+        now = timezone.now()
+
+        def build(row):
+            name = required(row, 'name')
+            if name in taken:
+                raise RowError(f'Duplicate name: {name}')
+            created_time = parse_timestamp(row.get('created_time'), now)
+            project = Project(
+                name=name, description=row.get('description', ''),
+                type=choice(row, 'type', TypeChoices), author_id=self.lookup('user', row, 'author'),
+                created_time=created_time, updated_time=parse_timestamp(row.get('updated_time'), created_time),
+            )
+            taken.add(name)
+            return project
+
+        valid = self.validate('projects', rows, build, kind='project')
+        projects = self.bulk_create(Project, [project for row, project in valid])
+        self.remember('project', valid)
+        # Comme à la création par l'API, l'auteur est contributeur de son projet
+        self.add_contributors([(project.pk, project.author_id) for project in projects])
+        return len(projects)
+
+    def import_contributors(self, rows):
+        self.resolve('project', [row.get('project') for number, row in rows])
+        self.resolve('user', [row.get('user') for number, row in rows])
+        valid = self.validate(
+            'contributors', rows,
+            lambda row: (self.lookup('project', row, 'project'), self.lookup('user', row, 'user')),
+        )
+        return self.add_contributors([pair for row, pair in valid])
+
+    def add_contributors(self, pairs):
+        """Ajoute les contributeurs (projet, utilisateur), comme Project.add_contributor mais en lot"""
+        if not pairs:
+            return 0
+        contributors = self.get_contributors({user_id for project_id, user_id in pairs})
+        Project.contributors.through.objects.bulk_create([
+            Project.contributors.through(project_id=project_id, contributor_id=contributors[user_id])
+            for project_id, user_id in pairs
+        ], ignore_conflicts=True, batch_size=self.batch_size)
+        Membership.objects.bulk_create([
+            Membership(project_id=project_id, user_id=user_id) for project_id, user_id in pairs
+        ], ignore_conflicts=True, batch_size=self.batch_size)
+        self.touched_projects.update(project_id for project_id, user_id in pairs)
+        return len(pairs)
+
+    @staticmethod
+    def get_contributors(user_ids):
+        """Retourne les ids des Contributor des utilisateurs, en créant ceux qui manquent"""
+        contributors = dict(Contributor.objects.filter(user_id__in=user_ids).values_list('user_id', 'id'))
+        missing = user_ids - contributors.keys()
+        if missing:
+            Contributor.objects.bulk_create([Contributor(user_id=user_id) for user_id in missing])
+            contributors.update(Contributor.objects.filter(user_id__in=missing).values_list('user_id', 'id'))
+        return contributors
+
+    def import_issues(self, rows):
+        self.resolve('project', [row.get('project') for number, row in rows])
+        self.resolve('user', [row.get(field) for number, row in rows for field in ('author', 'contributor')])
+        now = timezone.now()
+
+        def build(row):
+            created_time = parse_timestamp(row.get('created_time'), now)
+            author_id = self.lookup('user', row, 'author')
+            issue = Issue(
+                project_id=self.lookup('project', row, 'project'), name=required(row, 'name'),
+                description=row.get('description', ''), priority=choice(row, 'priority', PriorityChoices),
+                tag=choice(row, 'tag', IssueTagChoices), author_id=author_id,
+                created_time=created_time, updated_time=parse_timestamp(row.get('updated_time'), created_time),
+            )
+            # Utilisateur assigné, l'auteur à défaut ; remplacé par son Contributor avant l'écriture
+            issue.contributor_user_id = author_id
+            if row.get('contributor'):
+                issue.contributor_user_id = self.lookup('user', row, 'contributor')
+            return issue
+
+        valid = self.validate('issues', rows, build, kind='issue')
+        contributors = self.get_contributors({issue.contributor_user_id for row, issue in valid})
+        for row, issue in valid:
+            issue.contributor_id = contributors[issue.contributor_user_id]
+        issues = self.bulk_create(Issue, [issue for row, issue in valid])
+        self.remember('issue', valid)
+        counters.bulk_issues_added(issues)
+        self.touched_projects.update(issue.project_id for issue in issues)
+        return len(issues)
+
+    def import_comments(self, rows):
+        """Les commentaires gardent leur UUID s'il est valide : ils n'ont pas besoin de correspondance"""
+        self.resolve('issue', [row.get('issue') for number, row in rows])
+        self.resolve('user', [row.get('author') for number, row in rows])
+        now = timezone.now()
+        source_ids = [row['id'] for number, row in rows if is_uuid(row.get('id'))]
+        existing = set(Comment.objects.filter(id__in=source_ids).values_list('id', flat=True))
+
+        def build(row):
+            comment_id = uuid.UUID(str(row['id'])) if is_uuid(row.get('id')) else uuid.uuid4()
+            if comment_id in existing:
+                raise RowError(f'Duplicate id: {comment_id}')
+            existing.add(comment_id)
+            created_time = parse_timestamp(row.get('created_time'), now)
+            return Comment(
+                id=comment_id, issue_id=self.lookup('issue', row, 'issue'),
+                description=required(row, 'description'), author_id=self.lookup('user', row, 'author'),
+                created_time=created_time, updated_time=parse_timestamp(row.get('updated_time'), created_time),
+            )
+
+        valid = self.validate('comments', rows, build)
+        comments = self.bulk_create(Comment, [comment for row, comment in valid])
+        counters.bulk_comments_added(comments)
+        self.touched_projects.update(
+            Issue.objects.filter(id__in={comment.issue_id for comment in comments}).values_list('project_id', flat=True)
+        )
+        return len(comments)
@@ -0,0 +1,101 @@
+import asyncio
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import User
+from config.urls import build_urlpatterns
+from projects.models import Membership
+
+
+class URLConf:
+    """Module de routes construit à la volée, utilisable comme ROOT_URLCONF"""
+    def __init__(self, urlpatterns):
+        self.urlpatterns = urlpatterns
+
+
+class Command(BaseCommand):
+    help = ("Compare les lectures de projets, issues et commentaires servies par les vues synchrones "
+            "et par les vues asynchrones pour des clients lents, avec le même client ASGI et la même concurrence")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help="Utilisateur des requêtes (par défaut le premier contributeur)")
+        parser.add_argument('--requests', type=int, default=200,
+                            help="Nombre de requêtes pour chacun des deux chemins")
+        parser.add_argument('--concurrency', type=int, default=50, help="Nombre de clients simultanés")
+        parser.add_argument(
+            '--latency', type=int, default=100,
+            help="Latence réseau d'un client lent en millisecondes, avant chaque requête",
+        )
+        parser.add_argument('--with-cache', action='store_true', help="Garde le cache des réponses de listes")
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['username'])
+        project_id = Membership.objects.filter(user=user).values_list('project_id', flat=True).first()
+        urls = ['/api/project/', f'/api/project/{project_id}/', f'/api/issue/?project={project_id}', '/api/comment/']
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        requests = [urls[index % len(urls)] for index in range(options['requests'])]
+        latency = options['latency'] / 1000
+        # Le client de test de Django envoie ses requêtes à l'hôte `testserver`
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if not options['with_cache']:
+            overrides['RESPONSE_CACHE_TIMEOUT'] = 0
+
+        self.stdout.write(
+            f"{len(requests)} requests, {options['concurrency']} concurrent clients, "
+            f"{options['latency']} ms client latency"
+        )
+        # Seules les routes changent d'un passage à l'autre : vues synchrones puis asynchrones
+        results = []
+        for async_reads in (False, True):
+            with override_settings(ROOT_URLCONF=URLConf(build_urlpatterns(async_reads)), **overrides):
+                results.append(asyncio.run(self.run(requests, headers, latency, options['concurrency'])))
+        sync_views, async_views = results
+
+        self.report('sync views', *sync_views)
+        self.report('async views', *async_views)
+        self.stdout.write(self.style.SUCCESS(f'Throughput gain: x{sync_views[0] / async_views[0]:.2f}'))
+
+    @staticmethod
+    def get_user(username):
+        users = User.objects.all()
+        if username:
+            users = users.filter(username=username)
+        else:
+            users = users.filter(memberships__isnull=False).order_by('id')
+        user = users.first()
+        if user is None:
+            raise CommandError('No user found, create data first')
+        return user
+
+    @staticmethod
+    async def run(requests, headers, latency, concurrency):
+        """
+        Envoie les requêtes par `concurrency` clients simultanés, chacun attendant `latency` avant sa requête.
+        Les vues synchrones sont exécutées par le gestionnaire ASGI dans son thread, comme sous un serveur ASGI.
+        """
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call(url):
+            submitted = time.perf_counter()
+            async with semaphore:
+                await asyncio.sleep(latency)
+                response = await client.get(url, headers=headers)
+                assert response.status_code == 200, (url, response.status_code)
+                return time.perf_counter() - submitted
+
+        started = time.perf_counter()
+        durations = await asyncio.gather(*[call(url) for url in requests])
+        return time.perf_counter() - started, durations
+
+    def report(self, label, elapsed, durations):
+        percentiles = statistics.quantiles([duration * 1000 for duration in durations], n=100)
+        self.stdout.write(
+            f'{label:<14} {len(durations) / elapsed:8.1f} req/s  '
+            f'p50 {percentiles[49]:7.1f} ms  p95 {percentiles[94]:7.1f} ms'
+        )
@@ -0,0 +1,108 @@
+import json
+import logging
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from authentication.models import User
+from projects.benchmark import BenchmarkData, api_routes, build_scenarios, client_for, run_scenario, summarize
+from projects.models import Project, Issue, Comment
+
+
+class Command(BaseCommand):
+    help = ("Mesure la latence (p50/p95/p99) et le nombre de requêtes SQL de chaque route de l'API avec le client "
+            "de test et une authentification JWT, et écrit un rapport JSON comparable d'un commit à l'autre")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help="Utilisateur des requêtes (par défaut l'auteur du plus gros projet)")
+        parser.add_argument('--iterations', type=int, default=20, help="Nombre de mesures par scénario")
+        parser.add_argument('--warmup', type=int, default=1, help="Nombre d'exécutions non mesurées par scénario")
+        parser.add_argument('--output', default='benchmark.json', help="Fichier du rapport JSON")
+        parser.add_argument('--compare', help="Rapport JSON de référence à comparer au résultat")
+        parser.add_argument('--with-cache', action='store_true', help="Garde le cache des réponses de listes")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('At least one iteration is required')
+        # Le client de test de Django envoie ses requêtes à l'hôte `testserver`
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if not options['with_cache']:
+            overrides['RESPONSE_CACHE_TIMEOUT'] = 0
+
+        # Les réponses 4xx attendues (droits) ne sont pas journalisées pendant la mesure
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        # Tout est annulé à la fin : les écritures des scénarios et l'éventuel compte admin créé pour la mesure
+        with override_settings(**overrides), transaction.atomic():
+            try:
+                data = BenchmarkData(options['username'])
+            except (ValueError, User.DoesNotExist) as e:
+                raise CommandError(str(e))
+            scenarios = build_scenarios(data)
+            clients = {False: client_for(data.user), True: client_for(data.staff)}
+            results = {}
+            for scenario in scenarios:
+                run_scenario(scenario, clients[scenario.staff], options['iterations'], options['warmup'])
+                results[scenario.name] = summarize(scenario)
+                self.stdout.write(self.format_result(scenario.name, results[scenario.name]))
+            transaction.set_rollback(True)
+
+        uncovered = sorted(api_routes() - {(scenario.route, scenario.method) for scenario in scenarios})
+        for route, method in uncovered:
+            self.stderr.write(f'Route not covered: {method.upper()} {route}')
+        report = {
+            'meta': {
+                'commit': self.get_commit(), 'created': timezone.now().isoformat(),
+                'iterations': options['iterations'], 'response_cache': options['with_cache'],
+                'user': data.user.username, 'data': self.get_volumes(),
+            },
+            'routes': results,
+            'uncovered': [f'{method.upper()} {route}' for route, method in uncovered],
+        }
+        with open(options['output'], 'w') as file:
+            json.dump(report, file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare']) as file:
+                self.compare(json.load(file), report)
+
+    @staticmethod
+    def format_result(name, result):
+        return (f"{name:<42} {result['status']:>3}  p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  "
+                f"p99 {result['p99_ms']:8.2f} ms  {result['queries']:>4} queries")
+
+    @staticmethod
+    def get_commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    @staticmethod
+    def get_volumes():
+        return {
+            'users': User.objects.count(), 'projects': Project.objects.count(), 'issues': Issue.objects.count(),
+            'comments': Comment.objects.count(),
+        }
+
+    def compare(self, baseline, report):
+        """Affiche l'évolution de chaque route par rapport au rapport de référence"""
+        self.stdout.write(f"\nCompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('data')})")
+        for name, result in report['routes'].items():
+            previous = baseline['routes'].get(name)
+            if previous is None:
+                self.stdout.write(f'{name:<42} new')
+                continue
+            changes = []
+            for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+                ratio = result[key] / previous[key] - 1 if previous[key] else 0
+                changes.append(f"{key[:3]} {ratio:+7.1%}")
+            changes.append(f"queries {previous['queries']} -> {result['queries']}")
+            self.stdout.write(f"{name:<42} {'  '.join(changes)}")
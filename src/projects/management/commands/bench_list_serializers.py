@@ -0,0 +1,81 @@
+import json
+import logging
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+
+from authentication.models import User
+from projects.benchmark import BenchmarkData, client_for
+
+ROUTES = ('/api/project/', '/api/issue/', '/api/comment/')
+
+
+class Command(BaseCommand):
+    help = ("Compare le débit (lignes/s) des listes sérialisées par les sérialiseurs de modèle et par les "
+            "sérialiseurs de lignes (LIST_ROW_SERIALIZERS), et vérifie que leur JSON est identique")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help="Nombre de mesures par liste et par mode")
+        parser.add_argument('--limit', type=int, default=100, help="Nombre d'objets par page")
+        parser.add_argument('--output', help="Fichier du rapport JSON")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('At least one iteration is required')
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'], 'RESPONSE_CACHE_TIMEOUT': 0}
+        results = {}
+        # Annule l'éventuel compte admin créé pour la mesure
+        with override_settings(**overrides), transaction.atomic():
+            try:
+                client = client_for(BenchmarkData().staff)
+            except (ValueError, User.DoesNotExist) as e:
+                raise CommandError(str(e))
+            for route in ROUTES:
+                path = f"{route}?limit={options['limit']}&count=false"
+                contents, result = {}, {}
+                for mode, rows in (('model', False), ('rows', True)):
+                    with override_settings(LIST_ROW_SERIALIZERS=rows):
+                        contents[mode], result[mode] = self.measure(client, path, options['iterations'])
+                if contents['model'] != contents['rows']:
+                    raise CommandError(f'{route}: the row serializer output differs from the model serializer')
+                result['gain'] = round(result['rows']['rows_per_second'] / result['model']['rows_per_second'] - 1, 3) \
+                    if result['model']['rows_per_second'] else None
+                results[route] = result
+                self.stdout.write(self.format_result(route, result))
+            transaction.set_rollback(True)
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    @staticmethod
+    def measure(client, path, iterations):
+        """Contenu de la réponse et débit moyen de la liste, après une requête non mesurée"""
+        response = client.get(path)
+        if response.status_code != 200:
+            raise CommandError(f'{path}: status {response.status_code}')
+        rows = len(json.loads(response.content)['results'])
+        timings = []
+        for iteration in range(iterations):
+            started = time.perf_counter()
+            client.get(path)
+            timings.append(time.perf_counter() - started)
+        median = statistics.median(timings)
+        return response.content, {
+            'rows': rows, 'p50_ms': round(median * 1000, 3),
+            'rows_per_second': round(rows / median) if median else 0,
+        }
+
+    @staticmethod
+    def format_result(route, result):
+        model, rows = result['model'], result['rows']
+        gain = f"{result['gain']:+.1%}" if result['gain'] is not None else 'n/a'
+        return (f"{route:<16} {rows['rows']:>4} rows  model {model['rows_per_second']:>8} rows/s "
+                f"({model['p50_ms']:.2f} ms)  rows {rows['rows_per_second']:>8} rows/s ({rows['p50_ms']:.2f} ms)  "
+                f"{gain}")
@@ -0,0 +1,102 @@
+import io
+import json
+import logging
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from authentication.models import User
+from config import parsers, renderers
+from projects.benchmark import BenchmarkData, client_for
+
+ROUTES = ('/api/project/', '/api/issue/', '/api/comment/')
+
+
+def get_formats():
+    """(nom, renderer, parser) comparés : le JSON de DRF sert de référence"""
+    formats = [('drf-json', JSONRenderer(), JSONParser())]
+    if renderers.orjson is not None:
+        formats.append(('orjson', renderers.FastJSONRenderer(), parsers.FastJSONParser()))
+    if renderers.msgpack is not None:
+        formats.append(('msgpack', renderers.MessagePackRenderer(), parsers.MessagePackParser()))
+    return formats
+
+
+class Command(BaseCommand):
+    help = ("Compare la taille et les temps d'encodage et de décodage des pages de listes en JSON (DRF), "
+            "JSON (orjson) et MessagePack, selon les paquets installés")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help="Nombre de mesures par liste et par format")
+        parser.add_argument('--limit', type=int, default=100, help="Nombre d'objets par page")
+        parser.add_argument('--output', help="Fichier du rapport JSON")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('At least one iteration is required')
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'], 'RESPONSE_CACHE_TIMEOUT': 0}
+        pages = {}
+        # Annule l'éventuel compte admin créé pour la mesure
+        with override_settings(**overrides), transaction.atomic():
+            try:
+                client = client_for(BenchmarkData().staff)
+            except (ValueError, User.DoesNotExist) as e:
+                raise CommandError(str(e))
+            for route in ROUTES:
+                response = client.get(f"{route}?limit={options['limit']}&count=false")
+                if response.status_code != 200:
+                    raise CommandError(f'{route}: status {response.status_code}')
+                pages[route] = response.data
+            transaction.set_rollback(True)
+
+        results = {}
+        for route, data in pages.items():
+            results[route] = {
+                name: self.measure(renderer, parser, data, options['iterations'])
+                for name, renderer, parser in get_formats()
+            }
+            self.stdout.write(self.format_result(route, len(data['results']), results[route]))
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    @staticmethod
+    def measure(renderer, parser, data, iterations):
+        """Taille de la page encodée et temps médians d'encodage et de décodage (ms)"""
+        content = renderer.render(data)
+        if parser.parse(io.BytesIO(content)) != json.loads(JSONRenderer().render(data)):
+            raise CommandError(f'{renderer.format}: the decoded page differs from the source data')
+        encode, decode = [], []
+        for iteration in range(iterations):
+            started = time.perf_counter()
+            renderer.render(data)
+            encode.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            parser.parse(io.BytesIO(content))
+            decode.append(time.perf_counter() - started)
+        return {
+            'bytes': len(content),
+            'encode_ms': round(statistics.median(encode) * 1000, 4),
+            'decode_ms': round(statistics.median(decode) * 1000, 4),
+        }
+
+    @staticmethod
+    def format_result(route, rows, result):
+        reference = result['drf-json']
+        lines = [f'{route} ({rows} rows)']
+        for name, measures in result.items():
+            lines.append(
+                f"  {name:<9} {measures['bytes']:>8} B ({measures['bytes'] / reference['bytes']:>4.0%})  "
+                f"encode {measures['encode_ms']:>8.3f} ms (x{reference['encode_ms'] / measures['encode_ms']:.1f})  "
+                f"decode {measures['decode_ms']:>8.3f} ms (x{reference['decode_ms'] / measures['decode_ms']:.1f})"
+            )
+        return '\n'.join(lines)
@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from config import sharding
+
+
+class Command(BaseCommand):
+    help = ("Recopie les utilisateurs de la base par défaut sur les autres shards (SHARD_DATABASES), "
+            "après l'ajout d'un shard ; les sauvegardes suivantes sont recopiées par signal")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Nombre d'utilisateurs par lot")
+
+    def handle(self, *args, **options):
+        if not sharding.is_sharded():
+            raise CommandError('Only one shard is configured')
+        users = get_user_model()._base_manager.order_by('pk')
+        copied = 0
+        for user in users.iterator(chunk_size=options['batch_size']):
+            sharding.copy_users([user])
+            copied += 1
+        self.stdout.write(self.style.SUCCESS(f'{copied} user(s) copied to {len(sharding.get_shards()) - 1} shard(s)'))
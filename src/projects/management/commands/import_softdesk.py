@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from config import sharding
+from projects.importer import STREAMS, SoftDeskImporter
+
+
+class Command(BaseCommand):
+    help = ("Importe les fichiers NDJSON users, projects, contributors, issues et comments d'un dossier "
+            "par lots bulk_create ; un import interrompu reprend au dernier lot enregistré")
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help="Dossier contenant les fichiers <flux>.ndjson")
+        parser.add_argument('--source', help="Nom de l'import pour la reprise (par défaut le nom du dossier)")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Nombre de lignes par transaction")
+        parser.add_argument('--reset', action='store_true',
+                            help="Oublie l'avancement et les correspondances d'identifiants de l'import")
+
+    def handle(self, *args, **options):
+        if sharding.is_sharded():
+            raise CommandError("The importer writes to the default database only, it doesn't support SHARD_DATABASES")
+        directory = Path(options['directory'])
+        if not directory.is_dir():
+            raise CommandError(f'{directory} is not a directory')
+        importer = SoftDeskImporter(options['source'] or directory.resolve().name, options['batch_size'])
+        if options['reset']:
+            importer.reset()
+
+        for stream in STREAMS:
+            path = directory / f'{stream}.ndjson'
+            if not path.exists():
+                self.stdout.write(f'{stream}: no {path.name}, skipped')
+                continue
+            with path.open(encoding='utf-8') as file:
+                lines, created, elapsed = importer.import_stream(stream, file)
+            rate = lines / elapsed if elapsed else 0
+            self.stdout.write(
+                f'{stream}: {lines} line(s) read, {created} created in {elapsed:.2f}s ({rate:.0f} rows/s)'
+            )
+        importer.finish()
+
+        for stream, number, message in importer.errors[:50]:
+            self.stderr.write(f'{stream}.ndjson:{number}: {message}')
+        if len(importer.errors) > 50:
+            self.stderr.write(f'... {len(importer.errors) - 50} more error(s)')
+        self.stdout.write(self.style.SUCCESS(f'Import finished with {len(importer.errors)} error(s)'))
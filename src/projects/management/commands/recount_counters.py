@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from config import sharding
+from projects.counters import recount
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs d'issues et de commentaires des projets et des issues"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Affiche les compteurs faux sans les corriger")
+
+    def handle(self, *args, **options):
+        projects = issues = 0
+        for shard in sharding.get_shards():
+            with sharding.use_shard(shard), sharding.atomic():
+                fixed_projects, fixed_issues = recount(dry_run=options['dry_run'])
+            projects, issues = projects + fixed_projects, issues + fixed_issues
+        verb = 'to repair' if options['dry_run'] else 'repaired'
+        self.stdout.write(self.style.SUCCESS(f'{projects} project(s) and {issues} issue(s) {verb}'))
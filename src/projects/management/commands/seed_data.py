@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from config import sharding
+from projects.importer import STREAMS, SoftDeskImporter
+from projects.seeding import SEED_PASSWORD, generate
+
+
+class Command(BaseCommand):
+    help = ("Génère un jeu de données aléatoire reproductible (utilisateurs, projets, contributeurs, issues, "
+            "commentaires) pour les benchmarks ; les volumes sont multipliés par --scale")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help="Nombre d'utilisateurs")
+        parser.add_argument('--projects', type=int, default=50, help="Nombre de projets")
+        parser.add_argument('--contributors', type=int, default=8, help="Nombre moyen de contributeurs par projet")
+        parser.add_argument('--issues', type=int, default=40, help="Nombre moyen d'issues par projet")
+        parser.add_argument('--comments', type=int, default=5, help="Nombre moyen de commentaires par issue")
+        parser.add_argument('--scale', type=float, default=1, help="Multiplie les nombres d'utilisateurs et de projets")
+        parser.add_argument('--seed', type=int, default=0, help="Graine du générateur aléatoire")
+        parser.add_argument('--prefix', default='seed', help="Préfixe des noms d'utilisateurs et de projets")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Nombre de lignes par transaction")
+
+    def handle(self, *args, **options):
+        if sharding.is_sharded():
+            raise CommandError("The importer writes to the default database only, it doesn't support SHARD_DATABASES")
+        streams = generate(
+            users=int(options['users'] * options['scale']), projects=int(options['projects'] * options['scale']),
+            contributors=options['contributors'], issues=options['issues'], comments=options['comments'],
+            seed=options['seed'], prefix=options['prefix'],
+        )
+        # L'import n'a pas vocation à être repris : son avancement et ses correspondances sont oubliés
+        importer = SoftDeskImporter(f"seed:{options['prefix']}:{options['seed']}", options['batch_size'])
+        importer.reset()
+        for stream in STREAMS:
+            lines, created, elapsed = importer.import_stream(stream, streams[stream])
+            self.stdout.write(f'{stream}: {created} created in {elapsed:.2f}s')
+        importer.finish()
+        importer.reset()
+
+        for stream, number, message in importer.errors[:10]:
+            self.stderr.write(f'{stream}:{number}: {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Data generated, users {options['prefix']}<n> have the password {SEED_PASSWORD!r}"
+        ))
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0002_alter_comment_issue_alter_issue_contributor_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["created_time", "id"], name="comment_keyset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="issue",
+            index=models.Index(fields=["created_time", "id"], name="issue_keyset_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                fields=["created_time", "id"], name="project_keyset_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def populate_membership(apps, schema_editor):
+    """Recopie les contributeurs de chaque projet (M2M via Contributor) dans la table Membership"""
+    Project = apps.get_model("projects", "Project")
+    Membership = apps.get_model("projects", "Membership")
+    rows = Project.contributors.through.objects.values_list(
+        "project_id", "contributor__user_id"
+    ).iterator(chunk_size=2000)
+    batch = []
+    for project_id, user_id in rows:
+        batch.append(Membership(project_id=project_id, user_id=user_id))
+        if len(batch) >= 2000:
+            Membership.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    Membership.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def clear_membership(apps, schema_editor):
+    apps.get_model("projects", "Membership").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("projects", "0004_membership"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_membership, clear_membership),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:48
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field):
+    counts = (
+        queryset.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(total=Count("pk"))
+    )
+    return Coalesce(
+        Subquery(counts.values("total"), output_field=IntegerField()), Value(0)
+    )
+
+
+def initialize_counters(apps, schema_editor):
+    """Calcule les compteurs des projets et issues existants"""
+    Project = apps.get_model("projects", "Project")
+    Issue = apps.get_model("projects", "Issue")
+    Comment = apps.get_model("projects", "Comment")
+    Issue.objects.update(comment_count=count_subquery(Comment.objects.all(), "issue"))
+    Project.objects.update(
+        issue_count=count_subquery(Issue.objects.all(), "project"),
+        comment_count=count_subquery(Comment.objects.all(), "issue__project"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0005_populate_membership"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="issue",
+            name="comment_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="comment_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="issue_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(initialize_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:50
+
+from django.db import migrations, models
+
+# (type de document, table, colonne titre, colonne texte)
+INDEXED_TABLES = [
+    ("project", "projects_project", "new.name", "new.description"),
+    ("issue", "projects_issue", "new.name", "new.description"),
+    ("comment", "projects_comment", "''", "new.description"),
+]
+
+TRIGGERS = """
+CREATE TRIGGER projects_search_{kind}_insert AFTER INSERT ON {table} BEGIN
+    INSERT INTO projects_searchdocument (kind, object_id) VALUES ('{kind}', new.id);
+    INSERT INTO projects_search (rowid, title, body) VALUES (last_insert_rowid(), {title}, {body});
+END;
+CREATE TRIGGER projects_search_{kind}_update AFTER UPDATE ON {table}
+WHEN {old_title} IS NOT {title} OR old.{body_column} IS NOT {body} BEGIN
+    UPDATE projects_search SET title = {title}, body = {body} WHERE rowid = (
+        SELECT id FROM projects_searchdocument WHERE kind = '{kind}' AND object_id = new.id
+    );
+END;
+CREATE TRIGGER projects_search_{kind}_delete AFTER DELETE ON {table} BEGIN
+    DELETE FROM projects_search WHERE rowid = (
+        SELECT id FROM projects_searchdocument WHERE kind = '{kind}' AND object_id = old.id
+    );
+    DELETE FROM projects_searchdocument WHERE kind = '{kind}' AND object_id = old.id;
+END;
+"""
+
+
+def create_search_index(apps, schema_editor):
+    """Crée la table FTS5, ses triggers de synchronisation et indexe les lignes existantes (SQLite uniquement)"""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE projects_search USING fts5("
+            "title, body, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        for kind, table, title, body in INDEXED_TABLES:
+            cursor.execute(
+                f"INSERT INTO projects_searchdocument (kind, object_id) "
+                f"SELECT '{kind}', id FROM {table}"
+            )
+            cursor.execute(
+                f"INSERT INTO projects_search (rowid, title, body) "
+                f"SELECT d.id, {title.replace('new.', 't.')}, {body.replace('new.', 't.')} "
+                f"FROM {table} t JOIN projects_searchdocument d "
+                f"ON d.kind = '{kind}' AND d.object_id = t.id"
+            )
+            triggers = TRIGGERS.format(
+                kind=kind,
+                table=table,
+                title=title,
+                body=body,
+                old_title=title.replace("new.", "old."),
+                body_column=body.replace("new.", ""),
+            )
+            for statement in triggers.split("END;")[:-1]:
+                cursor.execute(statement + "END;")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for kind, table, title, body in INDEXED_TABLES:
+            for event in ("insert", "update", "delete"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS projects_search_{kind}_{event}")
+        cursor.execute("DROP TABLE IF EXISTS projects_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0006_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("kind", models.CharField(max_length=10)),
+                ("object_id", models.CharField(max_length=36)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="searchdocument",
+            constraint=models.UniqueConstraint(
+                fields=("kind", "object_id"), name="searchdocument_kind_object_uniq"
+            ),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
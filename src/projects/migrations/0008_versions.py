@@ -0,0 +1,58 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:52
+
+from django.db import migrations, models
+from django.db.models import F
+
+from projects.migrations._triggers import RecreateSearchTriggers
+
+
+def initialize_updated_time(apps, schema_editor):
+    """Les objets existants n'ont pas été modifiés depuis leur création connue"""
+    for model_name in ("Project", "Issue", "Comment"):
+        apps.get_model("projects", model_name).objects.update(
+            updated_time=F("created_time")
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0007_search"),
+    ]
+
+    operations = [
+        # Les tables indexées sont reconstruites : triggers de l'index plein texte recréés au retour arrière
+        RecreateSearchTriggers(),
+        migrations.AddField(
+            model_name="comment",
+            name="updated_time",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name="issue",
+            name="updated_time",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="issue",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="updated_time",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.RunPython(initialize_updated_time, migrations.RunPython.noop),
+        RecreateSearchTriggers(),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0008_versions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source", models.CharField(max_length=64)),
+                ("stream", models.CharField(max_length=16)),
+                ("lines", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ImportedObject",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source", models.CharField(max_length=64)),
+                ("kind", models.CharField(max_length=10)),
+                ("source_id", models.CharField(max_length=64)),
+                ("object_id", models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="importcheckpoint",
+            constraint=models.UniqueConstraint(
+                fields=("source", "stream"), name="importcheckpoint_source_stream_uniq"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="importedobject",
+            constraint=models.UniqueConstraint(
+                fields=("source", "kind", "source_id"),
+                name="importedobject_source_uniq",
+            ),
+        ),
+    ]
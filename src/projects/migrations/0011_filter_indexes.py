@@ -0,0 +1,87 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+from projects.migrations._triggers import RecreateSearchTriggers
+
+
+def rename_duplicate_projects(apps, schema_editor):
+    """
+    Les noms de projet deviennent uniques : les doublons créés hors API reçoivent le premier suffixe libre
+    (2), (3)... qui n'est pas déjà le nom d'un autre projet
+    """
+    Project = apps.get_model("projects", "Project")
+    duplicates = Project.objects.values("name").annotate(total=Count("id")).filter(total__gt=1)
+    for name in list(duplicates.values_list("name", flat=True)):
+        number = 1
+        for project in Project.objects.filter(name=name).order_by("id")[1:]:
+            while True:
+                number += 1
+                candidate = f"{name[:120]} ({number})"
+                if not Project.objects.filter(name=candidate).exists():
+                    break
+            project.name = candidate
+            project.save(update_fields=["name"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0010_id_sequence"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Les tables indexées sont reconstruites : triggers de l'index plein texte recréés au retour arrière
+        RecreateSearchTriggers(),
+        migrations.RunPython(rename_duplicate_projects, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="comment",
+            name="issue",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="comments",
+                to="projects.issue",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="issue",
+            name="project",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="issues",
+                to="projects.project",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="project",
+            name="name",
+            field=models.CharField(max_length=128, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["issue", "created_time", "id"], name="comment_issue_keyset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="issue",
+            index=models.Index(
+                fields=["project", "created_time", "id"],
+                name="issue_project_keyset_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="issue",
+            index=models.Index(
+                fields=["project", "priority", "tag"],
+                name="issue_project_priority_tag_idx",
+            ),
+        ),
+        RecreateSearchTriggers(),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-18 21:09
+
+from django.db import migrations, models
+
+from projects.migrations._triggers import CreateChangeLog
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0011_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Change",
+            fields=[
+                ("seq", models.BigAutoField(primary_key=True, serialize=False)),
+                ("kind", models.CharField(max_length=10)),
+                ("object_id", models.CharField(max_length=36)),
+                ("project_id", models.BigIntegerField(null=True)),
+                ("user_id", models.BigIntegerField(null=True)),
+                ("deleted", models.BooleanField(default=False)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["user_id", "seq"], name="change_user_seq_idx")
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="change",
+            constraint=models.UniqueConstraint(
+                fields=("kind", "object_id", "project_id"), name="change_object_uniq"
+            ),
+        ),
+        CreateChangeLog(),
+    ]
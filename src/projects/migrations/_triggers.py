@@ -0,0 +1,178 @@
+"""
+Triggers SQLite figés pour les migrations (ce module, préfixé par `_`, n'est pas une migration).
+
+Sous SQLite, une migration qui modifie une table la reconstruit et supprime ses triggers. Toute migration
+qui reconstruit projects_project, projects_issue ou projects_comment doit donc recréer les deux jeux de
+triggers : RecreateSearchTriggers (index plein texte, 0007_search) et RecreateChangeLogTriggers (journal
+des modifications, 0012_change_log), à la fin de ses opérations et à leur début pour le retour arrière.
+
+Le SQL est figé : il ne doit pas suivre le code de l'application. Si des triggers changent, une nouvelle
+migration les recrée avec son propre SQL au lieu de modifier celui-ci, déjà appliqué.
+"""
+
+from django.db import migrations
+
+# (type de document, table, colonne titre, colonne texte)
+SEARCH_TABLES = [
+    ("project", "projects_project", "name", "description"),
+    ("issue", "projects_issue", "name", "description"),
+    ("comment", "projects_comment", None, "description"),
+]
+
+SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER projects_search_{kind}_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO projects_searchdocument (kind, object_id) VALUES ('{kind}', new.id);
+        INSERT INTO projects_search (rowid, title, body) VALUES (last_insert_rowid(), {new_title}, new.{body});
+    END
+    """,
+    """
+    CREATE TRIGGER projects_search_{kind}_update AFTER UPDATE ON {table}
+    WHEN {old_title} IS NOT {new_title} OR old.{body} IS NOT new.{body} BEGIN
+        UPDATE projects_search SET title = {new_title}, body = new.{body} WHERE rowid = (
+            SELECT id FROM projects_searchdocument WHERE kind = '{kind}' AND object_id = new.id
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER projects_search_{kind}_delete AFTER DELETE ON {table} BEGIN
+        DELETE FROM projects_search WHERE rowid = (
+            SELECT id FROM projects_searchdocument WHERE kind = '{kind}' AND object_id = old.id
+        );
+        DELETE FROM projects_searchdocument WHERE kind = '{kind}' AND object_id = old.id;
+    END
+    """,
+]
+
+# (type d'objet, table, expression du projet, expression de l'utilisateur), `{row}` désignant la ligne
+CHANGE_LOG_TABLES = [
+    ("project", "projects_project", "{row}.id", "NULL"),
+    ("issue", "projects_issue", "{row}.project_id", "NULL"),
+    ("comment", "projects_comment", "(SELECT project_id FROM projects_issue WHERE id = {row}.issue_id)", "NULL"),
+    ("membership", "projects_membership", "{row}.project_id", "{row}.user_id"),
+]
+
+CHANGE_LOG_ROW = """
+    INSERT OR REPLACE INTO projects_change (kind, object_id, project_id, user_id, deleted)
+    SELECT '{kind}', {row}.id, {project}, {user}, {deleted}
+"""
+
+# Une modification remplace la ligne de l'objet ; s'il change de projet, son ancien projet reçoit une tombstone
+CHANGE_LOG_TRIGGERS = [
+    """
+    CREATE TRIGGER projects_sync_{kind}_insert AFTER INSERT ON {table} BEGIN
+        {log_new};
+    END
+    """,
+    """
+    CREATE TRIGGER projects_sync_{kind}_update AFTER UPDATE ON {table} BEGIN
+        {log_old} WHERE {old_project} IS NOT {new_project};
+        {log_new};
+    END
+    """,
+    """
+    CREATE TRIGGER projects_sync_{kind}_delete AFTER DELETE ON {table} BEGIN
+        {log_old};
+    END
+    """,
+]
+
+# Les commentaires d'une issue déplacée changent de projet avec elle
+CHANGE_LOG_MOVE_TRIGGER = """
+CREATE TRIGGER projects_sync_issue_move AFTER UPDATE OF project_id ON projects_issue
+WHEN old.project_id IS NOT new.project_id BEGIN
+    INSERT OR REPLACE INTO projects_change (kind, object_id, project_id, user_id, deleted)
+    SELECT 'comment', id, old.project_id, NULL, 1 FROM projects_comment WHERE issue_id = new.id;
+    INSERT OR REPLACE INTO projects_change (kind, object_id, project_id, user_id, deleted)
+    SELECT 'comment', id, new.project_id, NULL, 0 FROM projects_comment WHERE issue_id = new.id;
+END
+"""
+
+
+def search_trigger_statements():
+    """Instructions SQL qui (re)créent les triggers tenant l'index plein texte à jour"""
+    statements = []
+    for kind, table, title, body in SEARCH_TABLES:
+        for event, trigger in zip(("insert", "update", "delete"), SEARCH_TRIGGERS):
+            statements.append(f"DROP TRIGGER IF EXISTS projects_search_{kind}_{event}")
+            statements.append(trigger.format(
+                kind=kind, table=table, body=body,
+                new_title=f"new.{title}" if title else "''",
+                old_title=f"old.{title}" if title else "''",
+            ))
+    return statements
+
+
+def log_row(kind, project, user, row, deleted):
+    return CHANGE_LOG_ROW.format(
+        kind=kind, row=row, project=project.format(row=row), user=user.format(row=row), deleted=int(deleted),
+    ).strip()
+
+
+def change_log_trigger_statements():
+    """Instructions SQL qui (re)créent les triggers du journal des modifications"""
+    statements = []
+    for kind, table, project, user in CHANGE_LOG_TABLES:
+        for event, trigger in zip(("insert", "update", "delete"), CHANGE_LOG_TRIGGERS):
+            statements.append(f"DROP TRIGGER IF EXISTS projects_sync_{kind}_{event}")
+            statements.append(trigger.format(
+                kind=kind, table=table,
+                log_new=log_row(kind, project, user, "new", deleted=False),
+                log_old=log_row(kind, project, user, "old", deleted=True),
+                new_project=project.format(row="new"), old_project=project.format(row="old"),
+            ))
+    return statements + ["DROP TRIGGER IF EXISTS projects_sync_issue_move", CHANGE_LOG_MOVE_TRIGGER]
+
+
+def fill_change_log_statements():
+    """Instructions SQL qui ajoutent au journal les objets qui n'y sont pas (leur ligne existante n'est pas déplacée)"""
+    return [
+        f"INSERT OR IGNORE INTO projects_change (kind, object_id, project_id, user_id, deleted) "
+        f"SELECT '{kind}', t.id, {project.format(row='t')}, {user.format(row='t')}, 0 FROM {table} t"
+        for kind, table, project, user in CHANGE_LOG_TABLES
+    ]
+
+
+def drop_change_log_statements():
+    names = [
+        f"projects_sync_{kind}_{event}" for kind, *_ in CHANGE_LOG_TABLES for event in ("insert", "update", "delete")
+    ]
+    return [f"DROP TRIGGER IF EXISTS {name}" for name in [*names, "projects_sync_issue_move"]]
+
+
+class SQLiteRunSQL(migrations.RunSQL):
+    """RunSQL exécuté sous SQLite uniquement (triggers, tables FTS5) ; les sous-classes fixent leur SQL"""
+
+    def deconstruct(self):
+        return self.__class__.__qualname__, [], {}
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "sqlite":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "sqlite":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class RecreateSearchTriggers(SQLiteRunSQL):
+    """Recrée les triggers de l'index plein texte, à l'aller comme au retour arrière"""
+
+    def __init__(self):
+        statements = search_trigger_statements()
+        super().__init__(statements, statements)
+
+
+class RecreateChangeLogTriggers(SQLiteRunSQL):
+    """Recrée les triggers du journal des modifications, à l'aller comme au retour arrière"""
+
+    def __init__(self):
+        statements = change_log_trigger_statements()
+        super().__init__(statements, statements)
+
+
+class CreateChangeLog(SQLiteRunSQL):
+    """Remplit le journal des modifications et crée ses triggers, supprimés au retour arrière"""
+
+    def __init__(self):
+        super().__init__(fill_change_log_statements() + change_log_trigger_statements(), drop_change_log_statements())
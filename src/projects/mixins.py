@@ -0,0 +1,491 @@
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db.models import Prefetch
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import exceptions, status
+from rest_framework.decorators import action
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from config import db_routers, sharding, transactions
+from config.instrumentation import span
+from config.renderers import get_format
+from projects import response_cache
+
+
+class BulkCreateMixin:
+    """
+    Création en lot : un tableau JSON envoyé sur la route de création ou sur `<route>/bulk/`.
+
+    Chaque élément est validé par `bulk_serializer_class`, puis la vue résout les relations pour tout
+    le lot dans `build_bulk_instances` (une requête par type de relation et non par élément).
+    Les éléments valides sont insérés avec `bulk_create` dans une transaction (une par shard) et la réponse
+    détaille le résultat ou les erreurs de chaque élément, dans l'ordre de la requête.
+
+    Les vues définissent `bulk_serializer_class`, `bulk_response_serializer_class` et
+    `build_bulk_instances(valid)`, qui reçoit la liste des couples (index, données validées) et retourne pour
+    chacun (index, instance non sauvegardée) ou (index, dictionnaire d'erreurs). Leur absence est signalée
+    dès la définition de la vue.
+    """
+    bulk_serializer_class = None
+    bulk_response_serializer_class = None
+    bulk_shard_field = None
+    bulk_batch_size = 500
+    bulk_required = ('bulk_serializer_class', 'bulk_response_serializer_class', 'build_bulk_instances')
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        missing = [name for name in cls.bulk_required if getattr(cls, name, None) is None]
+        if missing:
+            raise ImproperlyConfigured(f"{cls.__name__} must define {', '.join(missing)} (BulkCreateMixin)")
+
+    def create(self, request, *args, **kwargs):
+        if isinstance(request.data, list):
+            return self.bulk(request)
+        return super().create(request, *args, **kwargs)
+
+    @action(methods=['post'], detail=False)
+    def bulk(self, request):
+        """Route de création en lot"""
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'error': 'A list of objects is required'}, status=status.HTTP_400_BAD_REQUEST)
+        max_items = getattr(settings, 'BULK_MAX_ITEMS', 10000)
+        if len(items) > max_items:
+            return Response({'error': f'At most {max_items} objects can be created at once'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(items)
+        valid = []
+        with span(request, 'serializer'):
+            for index, item in enumerate(items):
+                serializer = self.bulk_serializer_class(data=item)
+                if serializer.is_valid():
+                    valid.append((index, serializer.validated_data))
+                else:
+                    results[index] = {'index': index, 'errors': serializer.errors}
+
+        instances = []
+        for shard, shard_items in self.group_bulk_items(valid):
+            # Une transaction par shard, rejouée si la base est verrouillée : les éléments d'un shard
+            # sont tous créés ou aucun
+            with sharding.use_shard(shard):
+                instances += transactions.run_atomic(self.create_bulk_items, shard_items, results, using=shard)
+
+        context = self.get_serializer_context()
+        with span(request, 'serializer'):
+            for index, instance in instances:
+                data = self.bulk_response_serializer_class(instance, context=context).data
+                results[index] = {'index': index, 'data': data}
+
+        if not instances and items:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif len(instances) < len(items):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response({'created': len(instances), 'results': results}, status=response_status)
+
+    def group_bulk_items(self, valid):
+        """Regroupe les éléments valides par shard (config.sharding), désigné par le champ `bulk_shard_field`"""
+        if not sharding.is_sharded():
+            return [(None, valid)]
+        groups = {}
+        for index, data in valid:
+            groups.setdefault(sharding.shard_for_id(data[self.bulk_shard_field]), []).append((index, data))
+        return groups.items()
+
+    def create_bulk_items(self, valid, results):
+        """Crée les éléments d'un shard ; les erreurs de relation sont reportées dans `results`"""
+        instances = []
+        for index, instance_or_errors in self.build_bulk_instances(valid):
+            if isinstance(instance_or_errors, dict):
+                results[index] = {'index': index, 'errors': instance_or_errors}
+            else:
+                instances.append((index, instance_or_errors))
+        if instances:
+            self.perform_bulk_create([instance for index, instance in instances])
+        return instances
+
+    def perform_bulk_create(self, instances):
+        model = type(instances[0])
+        model.objects.bulk_create(instances, batch_size=self.bulk_batch_size)
+
+
+class FieldSelectionMixin:
+    """
+    Représentations partielles des lectures : `?fields=a,b` ne garde que ces champs et `?omit=c` retire ceux-là.
+    La sélection est passée aux sérialiseurs (contexte `fields`, voir projects.serializers.SparseFieldsMixin)
+    et les vues n'en chargent que les relations nécessaires (`wants_field`). Un champ inconnu est refusé (400).
+    """
+    fields_param = 'fields'
+    omit_param = 'omit'
+
+    def get_sparse_fields(self):
+        """Champs demandés, ou None sans sélection (écritures comprises)"""
+        if '_sparse_fields' not in self.__dict__:
+            self._sparse_fields = self.parse_sparse_fields()
+        return self._sparse_fields
+
+    def parse_sparse_fields(self):
+        params = self.request.query_params
+        if self.request.method not in SAFE_METHODS or not {self.fields_param, self.omit_param} & params.keys():
+            return None
+        serializer = self.get_serializer_class()()
+        available = [name for name, field in serializer.fields.items() if not field.write_only]
+        requested, omitted = ([name.strip() for name in params.get(param, '').split(',') if name.strip()]
+                              for param in (self.fields_param, self.omit_param))
+        unknown = [name for name in (*requested, *omitted) if name not in available]
+        if unknown:
+            raise exceptions.ValidationError({'error': f"Unknown fields: {', '.join(unknown)}"})
+        return {name for name in requested or available if name not in omitted}
+
+    def wants_field(self, name):
+        fields = self.get_sparse_fields()
+        return fields is None or name in fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_sparse_fields()
+        return context
+
+
+class IncludeMixin:
+    """
+    Documents composés : `?include=a,b` ajoute aux lectures une section `included` contenant les objets liés
+    demandés, sans doublon. `includes` associe chaque nom à (relation, queryset, sérialiseur) ; chaque relation est
+    chargée par un seul prefetch pour tous les objets de la réponse, bornée à INCLUDE_MAX_ITEMS objets par objet
+    pour les collections. Ces réponses ne sont ni en cache ni validées par ETag (les objets inclus ont leur propre
+    état) et les listes sont lues en instances. Un nom inconnu est refusé (400).
+    """
+    include_param = 'include'
+    includes = {}
+
+    def get_includes(self):
+        """Noms des relations demandées, vide sans `include` (écritures comprises)"""
+        if '_includes' not in self.__dict__:
+            self._includes = self.parse_includes()
+        return self._includes
+
+    def parse_includes(self):
+        value = self.request.query_params.get(self.include_param, '')
+        if self.request.method not in SAFE_METHODS:
+            return []
+        names = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.includes]
+        if unknown:
+            raise exceptions.ValidationError({'error': f"Unknown includes: {', '.join(unknown)}"})
+        return names
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        names = self.get_includes()
+        if not names:
+            return queryset
+        return queryset.prefetch_related(*(self.get_include_prefetch(queryset.model, name) for name in names))
+
+    def get_include_prefetch(self, model, name):
+        relation, related, serializer_class = self.includes[name]
+        if model._meta.get_field(relation).many_to_one:
+            return Prefetch(relation, queryset=related, to_attr=f'included_{name}')
+        return Prefetch(relation, queryset=related[:getattr(settings, 'INCLUDE_MAX_ITEMS', 100)],
+                        to_attr=f'included_{name}')
+
+    def get_serializer(self, *args, **kwargs):
+        if args and self.get_includes():
+            self.include_source = args[0] if kwargs.get('many') else [args[0]]
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        return self.add_included(super().list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.add_included(super().retrieve(request, *args, **kwargs))
+
+    def add_included(self, response):
+        objects = self.__dict__.pop('include_source', None)
+        if objects is None or not isinstance(response.data, dict):
+            return response
+        # Sérialiseurs des objets inclus : tous leurs champs
+        context = {**self.get_serializer_context(), 'fields': None}
+        included = {}
+        for name in self.get_includes():
+            related = {}
+            for obj in objects:
+                value = getattr(obj, f'included_{name}')
+                for item in (value if isinstance(value, list) else [value]):
+                    if item is not None:
+                        related.setdefault(item.pk, item)
+            serializer_class = self.includes[name][2]
+            with span(self.request, 'serializer'):
+                included[name] = serializer_class(list(related.values()), many=True, context=context).data
+        response.data['included'] = included
+        return response
+
+
+class RowListMixin:
+    """
+    Listes sérialisées par `row_serializer_class` (voir projects.serializers.RowSerializer) : les objets sont lus
+    en lignes `values_list` et non en instances, sur les seules colonnes des champs demandés (FieldSelectionMixin,
+    à placer avant avec IncludeMixin). Désactivé avec LIST_ROW_SERIALIZERS = False et pour les documents composés.
+    """
+    row_serializer_class = None
+
+    def use_rows(self):
+        return (self.action == 'list' and self.row_serializer_class is not None
+                and getattr(settings, 'LIST_ROW_SERIALIZERS', True) and not self.get_includes())
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return self.get_row_queryset(queryset) if self.use_rows() else queryset
+
+    def get_row_queryset(self, queryset):
+        """Les lignes portent aussi les champs d'ordre du curseur de pagination et ceux des validateurs de la page"""
+        get_ordering = getattr(self.paginator, 'get_ordering', None)
+        ordering = get_ordering(self) if get_ordering else ()
+        extra_columns = (*ordering, *getattr(self, 'list_validator_fields', ()))
+        return self.row_serializer_class.get_rows(queryset, extra_columns, self.get_sparse_fields())
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many') and self.use_rows():
+            return self.row_serializer_class(*args, context=self.get_serializer_context(), **kwargs)
+        return super().get_serializer(*args, **kwargs)
+
+
+class WriteRetryMixin:
+    """
+    Création, modification et suppression dans une transaction sur le shard de la requête, rejouée si la base
+    reste verrouillée par un autre écrivain (voir config.transactions.run_atomic). À placer juste avant
+    ModelViewSet : les créations en lot (BulkCreateMixin) ont leurs propres transactions.
+    """
+
+    def create(self, request, *args, **kwargs):
+        return self.run_write(super().create, request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        return self.run_write(super().update, request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        return self.run_write(super().destroy, request, *args, **kwargs)
+
+    @staticmethod
+    def run_write(method, *args, **kwargs):
+        return transactions.run_atomic(method, *args, using=sharding.get_current_shard(), **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    GET conditionnels (ETag fort, Last-Modified) sur `retrieve` et `list`.
+
+    L'état d'une ressource est lu sans charger l'objet (`version`, `updated_time`) : si le client le possède
+    déjà (If-None-Match / If-Modified-Since), la réponse est un 304 sans sérialisation.
+    Les validateurs d'une liste ne coûtent aucune requête : ils sont calculés d'après la page lue (id, version et
+    date de modification des objets, total de la pagination) et la génération des listes de l'utilisateur
+    (voir projects.response_cache), renouvelée par toute écriture qui les concerne, suppressions comprises.
+    Un 304 évite alors la sérialisation et le rendu de la page.
+    Les ETags dépendent du format de la réponse (JSON, MessagePack...) et des champs demandés (FieldSelectionMixin,
+    à placer avant) ; les réponses varient selon Accept. Pas de validation des documents composés (IncludeMixin).
+    """
+    # Colonnes des objets d'une page lues pour ses validateurs (voir RowListMixin)
+    list_validator_fields = ('id', 'version', 'updated_time')
+
+    def retrieve(self, request, *args, **kwargs):
+        state = self.get_object_state() if not self.get_includes() else None
+        if state is None:
+            return super().retrieve(request, *args, **kwargs)
+        etag, last_modified = self.get_object_validators(*state)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        response = not_modified or super().retrieve(request, *args, **kwargs)
+        return self.set_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        """Comme ListModelMixin.list, avec la réponse 304 décidée entre la lecture de la page et sa sérialisation"""
+        if self.get_includes():
+            return super().list(request, *args, **kwargs)
+        # Lue avant la page : une écriture concurrente la renouvelle, la page lue ne peut pas garder son ETag
+        generation = response_cache.get_list_generation(request, self.basename)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        objects = page if page is not None else list(queryset)
+        etag, last_modified = self.get_list_validators(generation, objects, queryset.db)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            with span(request, 'serializer'):
+                data = self.get_serializer(objects, many=True).data
+            response = self.get_paginated_response(data) if page is not None else Response(data)
+        return self.set_validators(response, etag, last_modified)
+
+    def get_object_state_queryset(self):
+        """Queryset de l'état (version, updated_time) de l'objet demandé s'il est visible"""
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        return queryset.filter(**{self.lookup_field: lookup}).values_list('version', 'updated_time')
+
+    def get_object_state(self):
+        """Retourne (version, updated_time) de l'objet demandé s'il est visible, sans le charger"""
+        try:
+            return self.get_object_state_queryset().first()
+        except (TypeError, ValueError, ValidationError):
+            return None
+
+    def get_fields_tag(self):
+        """Suffixe de l'ETag d'une représentation partielle (FieldSelectionMixin)"""
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return ''
+        return '-' + hashlib.sha1(','.join(sorted(fields)).encode()).hexdigest()[:12]
+
+    def get_object_validators(self, version, updated_time):
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        etag = f'"{self.basename}-{lookup}-{version}-{get_format(self.request)}{self.get_fields_tag()}"'
+        return etag, timegm(updated_time.utctimetuple())
+
+    def get_list_validators(self, generation, objects, using):
+        """
+        ETag et Last-Modified d'une page lue sur la base `using` (instances ou lignes). Last-Modified est la date
+        de la génération, postérieure aux écritures qui l'ont renouvelée ; il n'est pas envoyé pour une page lue
+        sur la réplique, qui peut être en retard sur la génération (l'ETag suit, lui, les versions lues).
+        """
+        rows = ','.join(f'{obj.id}:{obj.version}' for obj in objects)
+        key = (f"{self.request.build_absolute_uri()}|{get_format(self.request)}|{generation}"
+               f"|{getattr(self.paginator, 'count', None)}|{rows}")
+        etag = f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+        if using == db_routers.get_replica_alias():
+            return etag, None
+        return etag, max([generation // 10 ** 9, *(timegm(obj.updated_time.utctimetuple()) for obj in objects)])
+
+    @staticmethod
+    def set_validators(response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            patch_vary_headers(response, ['Accept'])
+        return response
+
+
+class ResponseCacheMixin:
+    """
+    Cache par utilisateur des réponses de `list`, indexé par l'URL complète (filtres, recherche,
+    pagination et curseur compris). Les signaux invalident les listes des seuls utilisateurs qui voient
+    l'objet modifié (voir projects.response_cache). À placer avant ConditionalGetMixin :
+    ses validateurs (ETag, Last-Modified), mis en cache, permettent de répondre 304 sans aucune requête.
+    Les documents composés (IncludeMixin) ne sont pas mis en cache, les listes lues sur la réplique
+    seulement REPLICA_RESPONSE_CACHE_TIMEOUT secondes.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if self.get_includes():
+            return super().list(request, *args, **kwargs)
+        key = response_cache.make_key(request, self.basename)
+        cached = self.get_cached_response(request, key)
+        if cached is not None:
+            return cached
+        response = super().list(request, *args, **kwargs)
+        return self.cache_response(key, response, using=getattr(self, 'read_alias', None))
+
+    validator_headers = ('ETag', 'Last-Modified')
+
+    @classmethod
+    def get_cached_response(cls, request, key):
+        """Retourne la réponse en cache (ou un 304 si le client a déjà son état), sinon None"""
+        entry = response_cache.get_response(key)
+        if entry is None:
+            return None
+        data, headers = entry
+        response = get_conditional_response(
+            request, etag=headers.get('ETag'), last_modified=parse_http_date_safe(headers.get('Last-Modified')),
+        ) if headers else None
+        if response is None:
+            response = Response(data)
+        for name, value in headers.items():
+            response[name] = value
+        response['X-Cache'] = 'HIT'
+        return response
+
+    @classmethod
+    def cache_response(cls, key, response, using=None):
+        """Met en cache la réponse de la liste lue sur la base `using` (voir response_cache.set_response)"""
+        if response.status_code == status.HTTP_200_OK:
+            headers = {name: response[name] for name in cls.validator_headers if name in response}
+            response_cache.set_response(key, (response.data, headers), using)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    Lectures `list` et `retrieve` sur la réplique en lecture (voir config.db_routers), écritures sur la base
+    principale. Après une écriture réussie, les lectures de l'utilisateur restent sur la base principale
+    pendant REPLICA_STICKY_SECONDS pour qu'il voie ses modifications malgré le retard de la réplique.
+    """
+    replica_actions = ('list', 'retrieve')
+
+    def filter_queryset(self, queryset):
+        # Les viewsets redéfinissent get_queryset : la base est choisie ici, où passent toutes les lectures
+        return super().filter_queryset(self.route_queryset(queryset))
+
+    def route_queryset(self, queryset):
+        # Les répliques des shards ne sont pas gérées : avec plusieurs shards, tout est lu sur les shards
+        if sharding.is_sharded():
+            return queryset
+        if self.request.method in SAFE_METHODS and self.action in self.replica_actions:
+            # Base lue, qui fixe aussi la durée de mise en cache de la liste (ResponseCacheMixin)
+            self.read_alias = db_routers.get_read_alias(self.request.user)
+            return queryset.using(self.read_alias)
+        return queryset
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method not in SAFE_METHODS and status.is_success(response.status_code):
+            db_routers.stick_to_primary(request.user)
+        return response
+
+
+class ShardMixin:
+    """
+    Vues des objets répartis par projet sur plusieurs bases (voir config.sharding). Le shard de la requête
+    est résolu avant les permissions d'après l'objet désigné (`get_request_shard`) et toutes les requêtes
+    de la vue y sont envoyées. Les listes qui ne désignent pas de shard sont lues sur chacun et fusionnées
+    par la pagination. À placer avant ConditionalGetMixin.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        if sharding.is_sharded():
+            self.shard_token = sharding.activate(self.get_request_shard(request))
+        super().initial(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = self.__dict__.pop('shard_token', None)
+        if token is not None:
+            sharding.deactivate(token)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def get_request_shard(self, request):
+        """Shard de l'objet de l'URL (projet ou issue, d'après son id), None pour lire tous les shards"""
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        return sharding.shard_for_id(lookup) if lookup is not None else None
+
+    def is_fan_out(self):
+        return self.action == 'list' and sharding.is_sharded() and sharding.get_current_shard() is None
+
+    def get_shard_querysets(self):
+        querysets = []
+        for shard in sharding.get_shards():
+            with sharding.use_shard(shard):
+                # Les filtres (recherche, validation des filtres) s'exécutent sur le shard
+                querysets.append(self.filter_queryset(self.get_queryset()).using(shard))
+        return querysets
+
+    def paginate_queryset(self, queryset):
+        if not self.is_fan_out() or self.paginator is None:
+            return super().paginate_queryset(queryset)
+        return self.paginator.paginate_querysets(self.get_shard_querysets(), self.request, view=self)
@@ -3,6 +3,8 @@ import uuid
 from django.conf import settings
 from django.db import models
 
+from config import sharding
+
 
 class TypeChoices(models.TextChoices):
     BACKEND = "Back-end"
@@ -23,22 +25,69 @@ class IssueTagChoices(models.TextChoices):
     TASK = 'Task'
 
 
-class Project(models.Model):
-    name = models.CharField(max_length=128)
+class CounterFieldsMixin:
+    """
+    Les compteurs dénormalisés et la version ne sont modifiés que par des UPDATE atomiques
+    (voir projects.counters et projects.versions) : une sauvegarde complète de l'objet
+    ne doit pas réécrire une valeur lue auparavant.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not args:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class ShardedIdMixin:
+    """
+    Avec plusieurs shards (config.sharding), l'id d'un nouvel objet est alloué avant l'insertion :
+    il est unique sur tous les shards et désigne celui de l'objet.
+    """
+
+    def get_id_shard(self):
+        return None
+
+    def save(self, *args, **kwargs):
+        if self.pk is None and sharding.is_sharded():
+            self.pk = sharding.allocate_ids(type(self), shard=self.get_id_shard())[0]
+        super().save(*args, **kwargs)
+
+
+class Project(ShardedIdMixin, CounterFieldsMixin, models.Model):
+    name = models.CharField(max_length=128, unique=True)
     description = models.TextField(blank=True)
     type = models.CharField(max_length=10, choices=TypeChoices.choices)
     author = models.ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     created_time = models.DateTimeField(auto_now_add=True)
     contributors = models.ManyToManyField(to="Contributor")
+    issue_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_time = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    counter_fields = ('issue_count', 'comment_count', 'version')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_time', 'id'], name='project_keyset_idx'),
+        ]
 
     def add_contributor(self, user):
-        """Permet de créer si besoin puis d'ajouter un contributeur au projet"""
+        """
+        Permet de créer si besoin puis d'ajouter un contributeur au projet.
+        La table d'appartenance (Membership) est tenue à jour par le signal m2m_changed.
+        """
         contributor, created = Contributor.objects.get_or_create(user=user)
         self.contributors.add(contributor)
 
 
-class Issue(models.Model):
-    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="issues")
+class Issue(ShardedIdMixin, CounterFieldsMixin, models.Model):
+    # Index en tête des index composites (project, ...) ci-dessous
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="issues", db_index=False)
     name = models.CharField(max_length=128)
     description = models.TextField(blank=True)
     priority = models.CharField(max_length=10, choices=PriorityChoices.choices)
@@ -46,15 +95,131 @@ class Issue(models.Model):
     contributor = models.ForeignKey(to="Contributor", on_delete=models.CASCADE, blank=True)
     author = models.ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     created_time = models.DateTimeField(auto_now_add=True)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_time = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    counter_fields = ('comment_count', 'version')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_time', 'id'], name='issue_keyset_idx'),
+            # Issues visibles d'un projet dans l'ordre de la pagination, et filtres de la liste (?priority=, ?tag=)
+            models.Index(fields=['project', 'created_time', 'id'], name='issue_project_keyset_idx'),
+            models.Index(fields=['project', 'priority', 'tag'], name='issue_project_priority_tag_idx'),
+        ]
+
+    def get_id_shard(self):
+        return sharding.shard_for_id(self.project_id)
 
 
-class Comment(models.Model):
+class Comment(CounterFieldsMixin, models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4)
-    issue = models.ForeignKey(Issue, on_delete=models.CASCADE, related_name="comments")
+    # Index en tête de comment_issue_keyset_idx
+    issue = models.ForeignKey(Issue, on_delete=models.CASCADE, related_name="comments", db_index=False)
     description = models.TextField()
     author = models.ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     created_time = models.DateTimeField(auto_now_add=True)
+    updated_time = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    counter_fields = ('version',)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_time', 'id'], name='comment_keyset_idx'),
+            models.Index(fields=['issue', 'created_time', 'id'], name='comment_issue_keyset_idx'),
+        ]
 
 
 class Contributor(models.Model):
     user = models.OneToOneField(to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+
+
+class Membership(models.Model):
+    """
+    Appartenance d'un utilisateur à un projet, indexée sur (project, user).
+    Miroir de Project.contributors qui évite la jointure via Contributor pour les contrôles de visibilité.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="memberships")
+    user = models.ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="memberships")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'user'], name='membership_project_user_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'project'], name='membership_user_project_idx'),
+        ]
+
+
+class SearchDocument(models.Model):
+    """
+    Document de l'index plein texte : la table virtuelle FTS5 `projects_search` partage son rowid.
+    Les lignes sont écrites par les triggers SQLite créés par la migration 0007_search.
+    """
+    kind = models.CharField(max_length=10)
+    object_id = models.CharField(max_length=36)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='searchdocument_kind_object_uniq'),
+        ]
+
+
+class Change(models.Model):
+    """
+    Journal des modifications de la synchronisation incrémentale (route sync, voir projects.sync) : une ligne par
+    objet et par projet, remplacée à chaque écriture par une ligne de `seq` supérieur et marquée `deleted` à la
+    suppression de l'objet (tombstone). Les lignes sont écrites par les triggers SQLite créés par la migration
+    0012_change_log.
+    """
+    seq = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=10)
+    object_id = models.CharField(max_length=36)
+    project_id = models.BigIntegerField(null=True)
+    # Utilisateur d'une appartenance (kind = membership)
+    user_id = models.BigIntegerField(null=True)
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id', 'project_id'], name='change_object_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user_id', 'seq'], name='change_user_seq_idx'),
+        ]
+
+
+class ImportCheckpoint(models.Model):
+    """Avancement d'un import (commande import_softdesk) : nombre de lignes traitées de chaque flux"""
+    source = models.CharField(max_length=64)
+    stream = models.CharField(max_length=16)
+    lines = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'stream'], name='importcheckpoint_source_stream_uniq'),
+        ]
+
+
+class ImportedObject(models.Model):
+    """
+    Correspondance entre l'identifiant d'un objet dans la source d'un import et celui de l'objet créé.
+    Écrite dans la même transaction que l'objet, elle permet de reprendre un import interrompu.
+    """
+    source = models.CharField(max_length=64)
+    kind = models.CharField(max_length=10)
+    source_id = models.CharField(max_length=64)
+    object_id = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'kind', 'source_id'], name='importedobject_source_uniq'),
+        ]
+
+
+class IdSequence(models.Model):
+    """Séquence des identifiants d'un modèle réparti sur plusieurs shards (voir config.sharding.allocate_ids)"""
+    name = models.CharField(max_length=64, unique=True)
+    value = models.PositiveBigIntegerField(default=0)
@@ -1,32 +1,96 @@
+from django.core.exceptions import ValidationError
+from django.http import Http404
 from rest_framework import permissions
 from rest_framework.generics import get_object_or_404
 
-from projects.models import Project, Issue
+from projects import cache
+from projects.models import Project
 from projects.serializers import IssueDetailSerializer, CommentSerializer
 
 
 class IsProjectContributor(permissions.BasePermission):
     """
     Permet de définir si un utilisateur est contributeur du projet pour la notion d'issue ou de commentaire.
-    Seul un contributeur du projet peut créer une issue ou un commentaire
+    Seul un contributeur du projet peut créer une issue ou un commentaire.
+    Les appartenances sont lues depuis le cache (voir projects.cache) : aucune requête sur un cache chaud.
     """
     def has_permission(self, request, view):
         project_id = None
         if view.action == 'list':
             return True
+        if view.action == 'create' and isinstance(request.data, list):
+            # Création en lot : l'appartenance est vérifiée élément par élément par la vue
+            return True
         if view.action in ['create', 'retrieve', 'update']:
+            lookup = view.kwargs.get(view.lookup_url_kwarg or view.lookup_field)
             if view.get_serializer_class() == IssueDetailSerializer:
-                project_id = request.data.get('project') or view.get_object().project_id
+                project_id = request.data.get('project') or self.get_issue_project_id(lookup)
             elif view.get_serializer_class() == CommentSerializer:
-                issue_id = request.data.get('issue') or view.get_object().issue_id
-                project_id = Issue.objects.get(id=issue_id).project_id
+                issue_id = request.data.get('issue') or self.get_comment_issue_id(lookup)
+                project_id = self.get_issue_project_id(issue_id)
             if project_id:
-                project = get_object_or_404(Project, id=project_id)
-                return project.contributors.filter(user=request.user).exists()
+                if self.is_contributor(request.user, project_id):
+                    return True
+                if lookup and not request.user.is_staff:
+                    # L'objet ne fait pas partie des objets visibles par l'utilisateur
+                    raise Http404
             return False
 
         return True
 
+    async def ahas_permission(self, request, view):
+        """Version asynchrone de has_permission, limitée aux lectures (list, retrieve) des vues asynchrones"""
+        if view.action != 'retrieve':
+            return True
+        lookup = view.kwargs.get(view.lookup_url_kwarg or view.lookup_field)
+        try:
+            if view.get_serializer_class() == IssueDetailSerializer:
+                project_id = await cache.aget_issue_project_id(lookup)
+            else:
+                issue_id = await cache.aget_comment_issue_id(lookup)
+                project_id = await cache.aget_issue_project_id(issue_id) if issue_id is not None else None
+        except (TypeError, ValueError, ValidationError):
+            project_id = None
+        if project_id is None:
+            raise Http404
+        if await cache.ais_project_contributor(request.user.id, project_id):
+            return True
+        if not request.user.is_staff:
+            raise Http404
+        return False
+
+    @staticmethod
+    def get_issue_project_id(issue_id):
+        try:
+            project_id = cache.get_issue_project_id(issue_id)
+        except (TypeError, ValueError, ValidationError):
+            project_id = None
+        if project_id is None:
+            raise Http404
+        return project_id
+
+    @staticmethod
+    def get_comment_issue_id(comment_id):
+        try:
+            issue_id = cache.get_comment_issue_id(comment_id)
+        except (TypeError, ValueError, ValidationError):
+            issue_id = None
+        if issue_id is None:
+            raise Http404
+        return issue_id
+
+    @staticmethod
+    def is_contributor(user, project_id):
+        try:
+            project_id = int(project_id)
+        except (TypeError, ValueError):
+            raise Http404
+        if cache.is_project_contributor(user.id, project_id):
+            return True
+        # Le projet doit exister pour renvoyer un refus plutôt qu'une 404
+        get_object_or_404(Project, id=project_id)
+        return False
+
 
 class CanEditObject(permissions.BasePermission):
     """Définit si l'utilisateur peut editer un objet"""
@@ -34,9 +98,13 @@ class CanEditObject(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
         if view.action in ['update', 'partial_update', 'destroy']:
-            return obj.author == request.user or request.user.is_staff
+            return obj.author_id == request.user.id or request.user.is_staff
         else:
             return True
 
+    async def ahas_object_permission(self, request, view, obj):
+        """Version asynchrone : la vérification ne fait aucune requête"""
+        return self.has_object_permission(request, view, obj)
+
 
 
@@ -0,0 +1,114 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from config import db_routers
+from config.renderers import get_format
+from projects.models import Project, Membership
+
+GENERATION_KEY = 'listcache:gen:{}:{}'
+RESPONSE_KEY = 'listcache:response:{}:{}:{}:{}'
+STATS_KEY = 'listcache:stats:{}'
+STAFF = 'staff'
+
+# Listes dont le contenu dépend de chaque type d'objet (les listes de projets affichent les compteurs)
+PROJECT_LISTS = ('project',)
+ISSUE_LISTS = ('issue', 'project')
+COMMENT_LISTS = ('comment', 'issue', 'project')
+ALL_LISTS = ('comment', 'issue', 'project')
+
+
+def get_cache():
+    """Retourne le cache des réponses de listes (alias configurable dans les settings)"""
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def get_timeout(using=None):
+    """Durée de mise en cache des réponses, plus courte pour les listes lues (`using`) sur la réplique"""
+    timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60)
+    if using is not None and using == db_routers.get_replica_alias():
+        timeout = min(timeout, getattr(settings, 'REPLICA_RESPONSE_CACHE_TIMEOUT', 5))
+    return timeout
+
+
+def get_generation(owner, basename):
+    """
+    Génération courante des listes `basename` d'un utilisateur (ou des admins) : la supprimer invalide
+    toutes les réponses en cache associées et change l'ETag des listes (voir projects.mixins.ConditionalGetMixin).
+    Une génération est la date (ns) de sa création : recréée, elle ne reprend jamais une ancienne valeur.
+    """
+    cache = get_cache()
+    key = GENERATION_KEY.format(owner, basename)
+    generation = cache.get(key)
+    if generation is None:
+        generation = time.time_ns()
+        cache.add(key, generation, None)
+        generation = cache.get(key, generation)
+    return generation
+
+
+def get_list_generation(request, basename):
+    """Génération des listes `basename` de l'utilisateur de la requête (celle des admins s'il l'est)"""
+    user = request.user
+    return get_generation(STAFF if user.is_staff else user.pk, basename)
+
+
+def make_key(request, basename):
+    digest = hashlib.sha1(f'{request.build_absolute_uri()}|{get_format(request)}'.encode()).hexdigest()
+    return RESPONSE_KEY.format(basename, request.user.pk, get_list_generation(request, basename), digest)
+
+
+def get_response(key):
+    entry = get_cache().get(key)
+    record(entry is not None)
+    return entry
+
+
+def set_response(key, entry, using=None):
+    """
+    Met en cache la réponse d'une liste lue sur la base `using`. Une lecture sur la réplique, en retard,
+    peut ne pas contenir une écriture dont l'invalidation a déjà eu lieu : elle n'est gardée que peu de temps.
+    """
+    get_cache().set(key, entry, get_timeout(using))
+
+
+def record(hit):
+    cache = get_cache()
+    key = STATS_KEY.format('hits' if hit else 'misses')
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def get_stats():
+    values = get_cache().get_many([STATS_KEY.format('hits'), STATS_KEY.format('misses')])
+    hits = values.get(STATS_KEY.format('hits'), 0)
+    misses = values.get(STATS_KEY.format('misses'), 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else None}
+
+
+def invalidate_users(user_ids, basenames=ALL_LISTS):
+    """
+    Invalide les listes `basenames` des utilisateurs donnés, et celles des admins qui voient tout.
+    L'invalidation a lieu au commit, pour qu'une lecture concurrente ne remette pas en cache l'état précédent.
+    """
+    keys = [GENERATION_KEY.format(owner, basename) for owner in [*user_ids, STAFF] for basename in basenames]
+    transaction.on_commit(lambda: get_cache().delete_many(keys))
+
+
+def get_project_user_ids(project_ids):
+    """Utilisateurs qui voient les projets : leurs contributeurs et leurs auteurs"""
+    user_ids = set(Membership.objects.filter(project_id__in=project_ids).values_list('user_id', flat=True))
+    user_ids.update(Project.objects.filter(pk__in=project_ids).values_list('author_id', flat=True))
+    return user_ids
+
+
+def invalidate_projects(project_ids, basenames):
+    """Invalide les listes `basenames` de tous les utilisateurs qui voient ces projets"""
+    invalidate_users(get_project_user_ids(project_ids), basenames)
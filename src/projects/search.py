@@ -0,0 +1,89 @@
+import re
+from functools import reduce
+from operator import and_, or_
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, CharField, IntegerField, Q, Value, When
+from rest_framework.filters import BaseFilterBackend
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+SEARCH_SQL = """
+SELECT d.object_id, snippet(projects_search, -1, %s, %s, '…', 12)
+FROM projects_search
+JOIN projects_searchdocument d ON d.id = projects_search.rowid
+WHERE projects_search MATCH %s AND d.kind = %s AND d.object_id IN ({visible})
+ORDER BY bm25(projects_search, 10.0, 1.0)
+LIMIT %s
+"""
+
+
+def build_match_query(search):
+    """
+    Transforme la saisie de l'utilisateur en requête FTS5 : chaque mot est cité (pas d'opérateurs),
+    tous les mots sont requis et le dernier est recherché comme préfixe.
+    """
+    tokens = TOKEN_RE.findall(search)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Filtre `?search=` des listes : recherche plein texte dans l'index FTS5 (voir la migration 0007_search).
+
+    La recherche ne porte que sur les objets du queryset de la vue, donc respecte les règles de visibilité
+    de `get_queryset`. Les résultats sont triés par pertinence (bm25, le titre pesant plus que le texte)
+    et chaque objet reçoit un extrait `search_snippet`. Hors SQLite, on se rabat sur `icontains`.
+    Seuls les SEARCH_MAX_RESULTS plus pertinents sont retenus : quand d'autres objets correspondent,
+    `request.search_truncated` le signale à la pagination, qui l'indique dans la réponse.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        search = request.query_params.get(self.search_param, '').strip()
+        kind = getattr(view, 'search_kind', None)
+        if not search or kind is None:
+            return queryset
+        connection = connections[queryset.db]
+        if connection.vendor != 'sqlite':
+            return self.filter_icontains(queryset, search, view)
+
+        match = build_match_query(search)
+        if match is None:
+            return queryset.none()
+        visible_sql, visible_params = queryset.order_by().values('pk').query.sql_with_params()
+        limit = getattr(settings, 'SEARCH_MAX_RESULTS', 200)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                SEARCH_SQL.format(visible=visible_sql),
+                ['<mark>', '</mark>', match, kind, *visible_params, limit + 1],
+            )
+            rows = cursor.fetchall()
+        if len(rows) > limit:
+            request.search_truncated = True
+            rows = rows[:limit]
+        if not rows:
+            return queryset.none()
+
+        pk_field = queryset.model._meta.pk
+        matches = [(pk_field.to_python(object_id), snippet) for object_id, snippet in rows]
+        return queryset.filter(pk__in=[pk for pk, snippet in matches]).annotate(
+            search_rank=Case(*[When(pk=pk, then=Value(rank)) for rank, (pk, snippet) in enumerate(matches)],
+                             output_field=IntegerField()),
+            search_snippet=Case(*[When(pk=pk, then=Value(snippet)) for pk, snippet in matches],
+                                output_field=CharField()),
+        ).order_by('search_rank')
+
+    def filter_icontains(self, queryset, search, view):
+        conditions = [
+            reduce(or_, [Q(**{f'{field}__icontains': token}) for field in view.search_fields])
+            for token in TOKEN_RE.findall(search)
+        ]
+        if not conditions:
+            return queryset.none()
+        return queryset.filter(reduce(and_, conditions))
@@ -0,0 +1,97 @@
+import json
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from projects.models import TypeChoices, PriorityChoices, IssueTagChoices
+
+# Mot de passe commun des utilisateurs générés (utilisé par la commande bench_endpoints pour obtenir un jeton)
+SEED_PASSWORD = 'softdesk-bench'
+
+WORDS = (
+    'api', 'login', 'page', 'cache', 'user', 'token', 'export', 'search', 'mobile', 'error', 'crash', 'screen',
+    'button', 'network', 'timeout', 'database', 'query', 'slow', 'layout', 'android', 'ios', 'payment', 'profile',
+    'settings', 'notification', 'upload', 'image', 'report', 'dashboard', 'filter', 'sort', 'permission', 'admin',
+    'session', 'email', 'password', 'reset', 'signup', 'onboarding', 'sync', 'offline', 'release', 'build', 'test',
+)
+
+
+def sentence(rng, minimum, maximum):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(minimum, maximum)))
+
+
+def spread(rng, mean):
+    """Nombre aléatoire de moyenne `mean`, très variable d'un objet à l'autre (les gros projets existent)"""
+    return int(rng.expovariate(1 / mean)) if mean else 0
+
+
+def generate(users=200, projects=50, contributors=8, issues=40, comments=5, seed=0, prefix='seed'):
+    """
+    Retourne les flux NDJSON ({flux: générateur de lignes}) d'un jeu de données aléatoire reproductible,
+    au format lu par projects.importer.SoftDeskImporter. `contributors`, `issues` et `comments` sont des
+    moyennes par projet, par projet et par issue. Seule la structure des projets est gardée en mémoire :
+    les flux d'issues et de commentaires sont produits au fil de leur lecture.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password(SEED_PASSWORD)
+    created = [now - timedelta(days=rng.uniform(30, 730)) for _ in range(projects)]
+    authors = [rng.randrange(users) for _ in range(projects)]
+    members = [
+        sorted({authors[project], *rng.sample(range(users), min(users, max(0, spread(rng, contributors))))})
+        for project in range(projects)
+    ]
+    issue_counts = [spread(rng, issues) for _ in range(projects)]
+
+    def issue_time(project, number):
+        return created[project] + timedelta(minutes=17 * (number + 1))
+
+    def user_lines():
+        for user in range(users):
+            yield json.dumps({
+                'id': user, 'username': f'{prefix}{user}', 'email': f'{prefix}{user}@example.com',
+                'password': password, 'birth_date': f'{rng.randint(1960, 2005)}-{rng.randint(1, 12):02}-15',
+                'can_be_contacted': rng.random() < 0.5, 'can_data_be_shared': rng.random() < 0.5,
+                'date_joined': (now - timedelta(days=rng.uniform(730, 1500))).isoformat(),
+            })
+
+    def project_lines():
+        for project in range(projects):
+            yield json.dumps({
+                'id': project, 'name': f'{prefix} {project} {sentence(rng, 1, 3)}',
+                'description': sentence(rng, 5, 30), 'type': rng.choice(TypeChoices.values),
+                'author': authors[project], 'created_time': created[project].isoformat(),
+            })
+
+    def contributor_lines():
+        for project in range(projects):
+            for user in members[project]:
+                yield json.dumps({'project': project, 'user': user})
+
+    def issue_lines():
+        for project in range(projects):
+            for number in range(issue_counts[project]):
+                yield json.dumps({
+                    'id': f'{project}-{number}', 'project': project, 'name': sentence(rng, 2, 6),
+                    'description': sentence(rng, 10, 60), 'priority': rng.choice(PriorityChoices.values),
+                    'tag': rng.choice(IssueTagChoices.values), 'author': rng.choice(members[project]),
+                    'contributor': rng.choice(members[project]),
+                    'created_time': issue_time(project, number).isoformat(),
+                })
+
+    def comment_lines():
+        for project in range(projects):
+            for number in range(issue_counts[project]):
+                for index in range(spread(rng, comments)):
+                    yield json.dumps({
+                        'issue': f'{project}-{number}', 'description': sentence(rng, 3, 40),
+                        'author': rng.choice(members[project]),
+                        'created_time': (issue_time(project, number) + timedelta(hours=index + 1)).isoformat(),
+                    })
+
+    return {
+        'users': user_lines(), 'projects': project_lines(), 'contributors': contributor_lines(),
+        'issues': issue_lines(), 'comments': comment_lines(),
+    }
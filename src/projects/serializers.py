@@ -1,14 +1,92 @@
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Prefetch
 from rest_framework import serializers
 from django.utils.translation import gettext as _
-from rest_framework.relations import HyperlinkedRelatedField, HyperlinkedIdentityField
+from rest_framework.relations import HyperlinkedIdentityField
+from rest_framework.reverse import reverse
+from rest_framework.utils.serializer_helpers import ReturnList
 
-from projects.models import Project, Issue, Comment, Contributor
+from config import sharding
+from projects.models import Project, Issue, Comment, Contributor, Membership
 
 UserModel = get_user_model()
 
 
+class SearchSnippetMixin:
+    """Ajoute l'extrait `search_snippet` à la représentation des objets trouvés par une recherche plein texte"""
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if hasattr(instance, 'search_snippet'):
+            data['search_snippet'] = instance.search_snippet
+        return data
+
+
+class SparseFieldsMixin:
+    """
+    Ne garde que les champs demandés par la vue (contexte `fields`, voir projects.mixins.FieldSelectionMixin).
+    La sélection ne s'applique qu'au sérialiseur racine : les sérialiseurs imbriqués gardent tous leurs champs.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = self.context.get('fields')
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if selected is None or parent is not None:
+            return fields
+        return {name: field for name, field in fields.items() if name in selected}
+
+
+def bounded_prefetch(related_name, queryset):
+    """
+    Prefetch des EMBEDDED_COLLECTION_SIZE premiers objets de la collection `related_name`, dans l'ordre de la
+    pagination, lus par BoundedCollectionField : une seule requête (fenêtrée) pour tous les objets du queryset.
+    `queryset` ne doit lire que l'id et la clé étrangère de la collection.
+    """
+    size = getattr(settings, 'EMBEDDED_COLLECTION_SIZE', 10)
+    return Prefetch(related_name, queryset=queryset.order_by('created_time', 'id')[:size],
+                    to_attr=f'bounded_{related_name}')
+
+
+class BoundedCollectionField(serializers.Field):
+    """
+    Collection d'un objet de détail, de taille bornée : nombre d'objets (compteur `count_field` de l'objet), lien
+    vers la liste paginée filtrée sur l'objet et URLs des EMBEDDED_COLLECTION_SIZE premiers objets, dans l'ordre
+    de la pagination. Les objets sont préchargés par `bounded_prefetch` : la représentation ne fait pas de requête
+    (vues asynchrones comprises). Sans prefetch (objet créé), ils sont lus par une requête limitée.
+    """
+
+    def __init__(self, related_name, count_field, basename, filter_param, **kwargs):
+        self.related_name = related_name
+        self.count_field = count_field
+        self.basename = basename
+        self.filter_param = filter_param
+        super().__init__(read_only=True, source='*', **kwargs)
+
+    def to_representation(self, instance):
+        request = self.context.get('request')
+        related = getattr(instance, f'bounded_{self.related_name}', None)
+        if related is None:
+            size = getattr(settings, 'EMBEDDED_COLLECTION_SIZE', 10)
+            related = getattr(instance, self.related_name).order_by('created_time', 'id').only('pk')[:size]
+        list_url = reverse(f'{self.basename}-list', request=request)
+        return {
+            'count': getattr(instance, self.count_field),
+            'url': f'{list_url}?{urlencode({self.filter_param: instance.pk})}',
+            'results': [
+                reverse(f'{self.basename}-detail', kwargs={'pk': obj.pk}, request=request) for obj in related
+            ],
+        }
+
+
 class ContributorSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField()
 
@@ -17,18 +95,26 @@ class ContributorSerializer(serializers.ModelSerializer):
         fields = ['user', 'id']
 
 
-class ProjectListSerializer(serializers.ModelSerializer):
+class UserSummarySerializer(serializers.ModelSerializer):
+    """Utilisateur inclus dans un document composé (`?include=author`) : identité publique seulement"""
+
+    class Meta:
+        model = UserModel
+        fields = ['id', 'username']
+
+
+class ProjectListSerializer(SparseFieldsMixin, SearchSnippetMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Project
-        fields = ["id", "name", "description", "type"]
+        fields = ["id", "name", "description", "type", "issue_count", "comment_count"]
         depth = 1
 
 
-class ProjectDetailSerializer(serializers.ModelSerializer):
+class ProjectDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     contributors = ContributorSerializer(many=True, read_only=True)
     author = serializers.StringRelatedField()
-    issues = HyperlinkedRelatedField(view_name='issue-detail', many=True, read_only=True)
+    issues = BoundedCollectionField('issues', 'issue_count', 'issue', 'project')
 
     class Meta:
         model = Project
@@ -40,8 +126,8 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
         depth = 1
 
     def validate_name(self, value):
-        """Interdiction d'avoir 2 project avec le même nom."""
-        if Project.objects.filter(name=value).exists():
+        """Interdiction d'avoir 2 project avec le même nom, sur tous les shards."""
+        if any(Project.objects.using(shard).filter(name=value).exists() for shard in sharding.get_shards()):
             raise serializers.ValidationError(_('Project with this name already exist'))
         return value
 
@@ -52,12 +138,12 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
         return project
 
 
-class IssueListSerializer(serializers.ModelSerializer):
+class IssueListSerializer(SparseFieldsMixin, SearchSnippetMixin, serializers.ModelSerializer):
     url = HyperlinkedIdentityField(view_name='issue-detail')
 
     class Meta:
         model = Issue
-        fields = ['id', 'name', 'project', 'priority', 'tag', 'url']
+        fields = ['id', 'name', 'project', 'priority', 'tag', 'comment_count', 'url']
 
 
 class ContributorField(serializers.Field):
@@ -78,8 +164,8 @@ class ContributorField(serializers.Field):
                 raise serializers.ValidationError(_('Contributor does not exist'))
 
 
-class IssueDetailSerializer(serializers.ModelSerializer):
-    comments = HyperlinkedRelatedField(many=True, read_only=True, view_name='comment-detail')
+class IssueDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    comments = BoundedCollectionField('comments', 'comment_count', 'comment', 'issue')
     contributor = ContributorField(required=False)
     author = serializers.StringRelatedField()
 
@@ -88,7 +174,6 @@ class IssueDetailSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'project', 'description', 'author', 'tag', 'priority', 'comments', 'contributor']
         extra_kwargs = {
             'author': {'read_only': True},
-            'comments': {'read_only': True},
         }
 
     def is_valid(self, raise_exception=False):
@@ -99,7 +184,7 @@ class IssueDetailSerializer(serializers.ModelSerializer):
         project = data.get('project')
         contributor = data.get('contributor')
 
-        if contributor and not project.contributors.filter(id=contributor.id).exists():
+        if contributor and not Membership.objects.filter(project=project, user_id=contributor.user_id).exists():
             raise serializers.ValidationError(_('This contributor is not contributing to this project.'))
 
         return data
@@ -114,7 +199,7 @@ class IssueDetailSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, SearchSnippetMixin, serializers.ModelSerializer):
     author = serializers.StringRelatedField()
 
     class Meta:
@@ -123,3 +208,155 @@ class CommentSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'author': {'read_only': True},
         }
+
+
+class IssueBulkSerializer(serializers.ModelSerializer):
+    """
+    Validation d'une issue d'un import en lot.
+    Le projet et le contributeur ne sont pas chargés ici : la vue les résout pour tout le lot.
+    """
+    project = serializers.IntegerField()
+    contributor = serializers.JSONField(required=False)
+
+    class Meta:
+        model = Issue
+        fields = ['name', 'project', 'description', 'tag', 'priority', 'contributor']
+
+    def validate_contributor(self, value):
+        """Le contributeur est désigné par son username ou par son id de contributeur"""
+        if isinstance(value, bool) or not isinstance(value, (str, int)):
+            raise serializers.ValidationError(_('Contributor must be a username or a contributor id'))
+        return value
+
+
+class CommentBulkSerializer(serializers.ModelSerializer):
+    """Validation d'un commentaire d'un import en lot. L'issue est résolue par la vue pour tout le lot."""
+    issue = serializers.IntegerField()
+
+    class Meta:
+        model = Comment
+        fields = ['issue', 'description']
+
+
+class IssueBulkUpdateSerializer(serializers.Serializer):
+    """Modification en lot d'issues : sélection optionnelle par ids et champs à modifier"""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    priority = serializers.ChoiceField(choices=Issue._meta.get_field('priority').choices, required=False)
+    tag = serializers.ChoiceField(choices=Issue._meta.get_field('tag').choices, required=False)
+    contributor = ContributorField(required=False)
+
+    update_fields = ('priority', 'tag', 'contributor')
+
+    def validate(self, data):
+        if not any(field in data for field in self.update_fields):
+            raise serializers.ValidationError(_('At least one of priority, tag or contributor is required.'))
+        return data
+
+
+class RowSerializer:
+    """
+    Sérialiseur rapide des listes, en lecture seule. Les objets sont lus avec `values_list(named=True)` sur les
+    seules colonnes `columns` et chaque ligne est convertie par `to_representation` sans passer par les champs
+    DRF : le JSON produit doit être identique à celui du sérialiseur de modèle de la liste. Avec une sélection
+    de champs (contexte `fields`), seules les colonnes de ces champs (`field_columns`) sont lues.
+    L'absence de `columns` ou de `to_representation` est signalée dès la définition du sérialiseur.
+    """
+    columns = ()
+    # Colonnes lues pour chaque champ de la représentation, quand elles diffèrent de son nom
+    field_columns = {}
+    # Même format de date que les DateTimeField des sérialiseurs de modèle
+    datetime_field = serializers.DateTimeField()
+
+    row_required = ('columns', 'to_representation')
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        missing = [name for name in cls.row_required if not getattr(cls, name, None)]
+        if missing:
+            raise ImproperlyConfigured(f"{cls.__name__} must define {', '.join(missing)} (RowSerializer)")
+
+    def __init__(self, instance=None, many=True, context=None):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+
+    @classmethod
+    def get_rows(cls, queryset, extra_columns=(), fields=None):
+        """
+        Queryset des lignes : colonnes du sérialiseur (ou des champs `fields`), `extra_columns` (champs d'ordre
+        de la pagination) et annotations du queryset (rang et extrait d'une recherche plein texte)
+        """
+        columns = cls.columns
+        if fields is not None:
+            needed = {column for name in fields for column in cls.field_columns.get(name, (name,))}
+            columns = [column for column in columns if column in needed]
+        columns = dict.fromkeys([*columns, *extra_columns, *queryset.query.annotations])
+        return queryset.prefetch_related(None).values_list(*columns, named=True)
+
+    @property
+    def data(self):
+        fields = self.context.get('fields')
+        if fields is None:
+            return ReturnList([self.serialize(row) for row in self.instance], serializer=self)
+        return ReturnList([self.serialize_fields(row, fields) for row in self.instance], serializer=self)
+
+    def serialize(self, row):
+        data = self.to_representation(row)
+        # Comme SearchSnippetMixin
+        if 'search_snippet' in row._fields:
+            data['search_snippet'] = row.search_snippet
+        return data
+
+    def serialize_fields(self, row, fields):
+        """Représentation partielle : les colonnes non lues valent None le temps de la conversion"""
+        row = SimpleNamespace(**{**dict.fromkeys(self.columns), **row._asdict()})
+        data = self.to_representation(row)
+        data = {name: value for name, value in data.items() if name in fields}
+        if hasattr(row, 'search_snippet'):
+            data['search_snippet'] = row.search_snippet
+        return data
+
+
+class ProjectListRowSerializer(RowSerializer):
+    """Version rapide de ProjectListSerializer"""
+    columns = ('id', 'name', 'description', 'type', 'issue_count', 'comment_count')
+
+    def to_representation(self, row):
+        return {
+            'id': row.id, 'name': row.name, 'description': row.description, 'type': row.type,
+            'issue_count': row.issue_count, 'comment_count': row.comment_count,
+        }
+
+
+class IssueListRowSerializer(RowSerializer):
+    """Version rapide d'IssueListSerializer : l'URL de chaque issue est formée d'après un modèle calculé une fois"""
+    columns = ('id', 'name', 'project_id', 'priority', 'tag', 'comment_count')
+    field_columns = {'project': ('project_id',), 'url': ('id',)}
+    url_placeholder = '__pk__'
+
+    def __init__(self, instance=None, many=True, context=None):
+        super().__init__(instance, many, context)
+        # Comme HyperlinkedIdentityField : URL absolue, avec le suffixe de format de la requête
+        url = reverse('issue-detail', kwargs={'pk': self.url_placeholder}, request=self.context.get('request'),
+                      format=self.context.get('format'))
+        self.url_prefix, self.url_suffix = url.split(self.url_placeholder)
+
+    def to_representation(self, row):
+        return {
+            'id': row.id, 'name': row.name, 'project': row.project_id, 'priority': row.priority, 'tag': row.tag,
+            'comment_count': row.comment_count, 'url': f'{self.url_prefix}{row.id}{self.url_suffix}',
+        }
+
+
+class CommentRowSerializer(RowSerializer):
+    """Version rapide de CommentSerializer"""
+    columns = ('id', 'author__username', 'description', 'created_time', 'updated_time', 'version', 'issue_id')
+    field_columns = {'author': ('author__username',), 'issue': ('issue_id',)}
+
+    def to_representation(self, row):
+        to_datetime = self.datetime_field.to_representation
+        return {
+            'id': str(row.id), 'author': row.author__username, 'description': row.description,
+            'created_time': to_datetime(row.created_time), 'updated_time': to_datetime(row.updated_time),
+            'version': row.version, 'issue': row.issue_id,
+        }
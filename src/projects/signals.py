@@ -0,0 +1,160 @@
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from config import sharding
+from projects import cache, counters, response_cache, versions
+from projects.models import Project, Issue, Comment, Contributor, Membership
+
+
+@receiver(m2m_changed, sender=Project.contributors.through)
+def sync_membership_on_contributors_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Répercute l'ajout ou le retrait de contributeurs dans la table Membership,
+    invalide le cache d'appartenance des utilisateurs concernés et change la version des projets.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # instance est un Contributor, pk_set contient des ids de projets
+        user_ids = [instance.user_id]
+        memberships = Membership.objects.filter(user_id=instance.user_id)
+        project_ids = pk_set if pk_set is not None else list(memberships.values_list('project_id', flat=True))
+        if action == 'post_add':
+            Membership.objects.bulk_create(
+                [Membership(project_id=project_id, user_id=instance.user_id) for project_id in pk_set],
+                ignore_conflicts=True,
+            )
+        elif action == 'post_remove':
+            memberships.filter(project_id__in=pk_set).delete()
+        else:
+            memberships.delete()
+    else:
+        project_ids = [instance.pk]
+        memberships = Membership.objects.filter(project=instance)
+        if action == 'pre_clear':
+            user_ids = list(memberships.values_list('user_id', flat=True))
+            memberships.delete()
+        else:
+            user_ids = list(Contributor.objects.filter(pk__in=pk_set).values_list('user_id', flat=True))
+            if action == 'post_add':
+                Membership.objects.bulk_create(
+                    [Membership(project=instance, user_id=user_id) for user_id in user_ids],
+                    ignore_conflicts=True,
+                )
+            else:
+                memberships.filter(user_id__in=user_ids).delete()
+    cache.invalidate_users(user_ids)
+    response_cache.invalidate_users(user_ids)
+    versions.touch(Project.objects.filter(pk__in=project_ids))
+
+
+def get_cascade_deletes(origin, instance):
+    """
+    Lignes supprimées par la suppression partie de `origin` (objet ou queryset), relevées par les signaux
+    pre_delete puis comptées une seule fois au premier post_delete (apply_cascade_deletes) : les issues et
+    commentaires supprimés en cascade ne coûtent pas chacun une mise à jour des compteurs et des caches.
+    """
+    holder = instance if origin is None else origin
+    return vars(holder).setdefault('_cascade_deletes', {'projects': set(), 'issues': {}, 'comments': {}})
+
+
+def apply_cascade_deletes(origin, instance):
+    """Reporte les suppressions relevées dans les compteurs et les caches des projets et issues restants"""
+    deletes = vars(instance if origin is None else origin).pop('_cascade_deletes', None)
+    if deletes is None:
+        return
+    cache.invalidate_issues(deletes['issues'])
+    cache.invalidate_comments(deletes['comments'])
+    project_ids = counters.rows_deleted(deletes['projects'], deletes['issues'], deletes['comments'])
+    if project_ids:
+        response_cache.invalidate_projects(project_ids, response_cache.ALL_LISTS)
+
+
+@receiver(pre_delete, sender=Project)
+def invalidate_membership_on_project_delete(sender, instance, origin=None, **kwargs):
+    cache.invalidate_project(instance)
+    response_cache.invalidate_projects([instance.pk], response_cache.ALL_LISTS)
+    get_cascade_deletes(origin, instance)['projects'].add(instance.pk)
+
+
+@receiver(pre_delete, sender=Issue)
+def collect_issue_delete(sender, instance, origin=None, **kwargs):
+    get_cascade_deletes(origin, instance)['issues'][instance.pk] = instance.project_id
+
+
+@receiver(pre_delete, sender=Comment)
+def collect_comment_delete(sender, instance, origin=None, **kwargs):
+    get_cascade_deletes(origin, instance)['comments'][instance.pk] = instance.issue_id
+
+
+@receiver(pre_save, sender=Issue)
+def remember_issue_project(sender, instance, **kwargs):
+    """Mémorise le projet actuel d'une issue modifiée pour reporter ses compteurs si elle change de projet"""
+    if instance.pk and not instance._state.adding:
+        instance._previous_project_id = Issue.objects.filter(pk=instance.pk).values_list(
+            'project_id', flat=True).first()
+
+
+@receiver(post_save, sender=Project)
+def version_project_on_save(sender, instance, created, **kwargs):
+    response_cache.invalidate_projects([instance.pk], response_cache.PROJECT_LISTS)
+    if not created:
+        versions.touch_project(instance.pk)
+
+
+@receiver(post_save, sender=Issue)
+def count_issue_on_save(sender, instance, created, **kwargs):
+    """Met à jour les compteurs et les versions de l'issue et de son projet"""
+    if created:
+        counters.issues_added(instance.project_id)
+        response_cache.invalidate_projects([instance.project_id], response_cache.ISSUE_LISTS)
+        return
+    versions.touch(Issue.objects.filter(pk=instance.pk))
+    previous_project_id = getattr(instance, '_previous_project_id', None)
+    if previous_project_id is not None and previous_project_id != instance.project_id:
+        counters.issue_moved(instance, previous_project_id)
+        cache.invalidate_issue(instance.pk)
+        # Les commentaires de l'issue changent aussi de visibilité
+        response_cache.invalidate_projects([previous_project_id, instance.project_id], response_cache.ALL_LISTS)
+    else:
+        versions.touch_project(instance.project_id)
+        response_cache.invalidate_projects([instance.project_id], response_cache.ISSUE_LISTS)
+
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Issue)
+@receiver(post_delete, sender=Comment)
+def count_rows_on_delete(sender, instance, origin=None, **kwargs):
+    apply_cascade_deletes(origin, instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_on_save(sender, instance, created, **kwargs):
+    """Met à jour les compteurs et les versions du commentaire, de son issue et de son projet"""
+    if created:
+        counters.comments_added(instance.issue_id)
+    else:
+        versions.touch(Comment.objects.filter(pk=instance.pk))
+        versions.touch_issue(instance.issue_id)
+    invalidate_comment_lists(instance.issue_id)
+
+
+def invalidate_comment_lists(issue_id):
+    project_id = cache.get_issue_project_id(issue_id)
+    if project_id is not None:
+        response_cache.invalidate_projects([project_id], response_cache.COMMENT_LISTS)
+
+
+@receiver(post_save, sender=get_user_model())
+def copy_user_to_shards(sender, instance, using, **kwargs):
+    """Les utilisateurs sont recopiés sur chaque shard, où les projets y font référence"""
+    if using == DEFAULT_DB_ALIAS and sharding.is_sharded():
+        sharding.copy_users([instance])
+
+
+@receiver(post_delete, sender=get_user_model())
+def delete_user_from_shards(sender, instance, using, **kwargs):
+    if using == DEFAULT_DB_ALIAS and sharding.is_sharded():
+        sharding.delete_user_copies(instance)
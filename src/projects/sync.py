@@ -0,0 +1,123 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.db.models import Max, Q
+
+from config import sharding
+from projects.export import COMMENT_FIELDS, ISSUE_FIELDS, PROJECT_FIELDS, batched, export_records, to_ndjson
+from projects.models import Change, Comment, Issue, Membership, Project
+
+CONTENT_TYPE = 'application/x-ndjson'
+
+# Modèle et champs lus de chaque type d'objet synchronisé (ceux de l'export d'un projet)
+SYNCED_MODELS = {
+    'project': (Project, PROJECT_FIELDS, 'id'),
+    'issue': (Issue, ISSUE_FIELDS, 'project_id'),
+    'comment': (Comment, COMMENT_FIELDS, 'issue__project_id'),
+}
+
+
+def encode_token(positions):
+    """Jeton de synchronisation : dernier `seq` lu sur chaque shard, dans l'ordre de SHARD_DATABASES"""
+    return base64.urlsafe_b64encode(json.dumps(positions, separators=(',', ':')).encode()).decode('ascii')
+
+
+def decode_token(token):
+    """Positions encodées dans le jeton (zéro sans jeton : synchronisation complète), ValueError s'il est invalide"""
+    shards = sharding.get_shards()
+    if not token:
+        return [0] * len(shards)
+    try:
+        positions = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except (TypeError, ValueError, binascii.Error):
+        raise ValueError('Invalid sync token')
+    if not isinstance(positions, list) or len(positions) != len(shards) or \
+            not all(type(position) is int and position >= 0 for position in positions):
+        raise ValueError('Invalid sync token')
+    return positions
+
+
+def get_positions():
+    """Dernier `seq` du journal de chaque shard"""
+    return [
+        Change.objects.using(alias).aggregate(last=Max('seq'))['last'] or 0 for alias in sharding.get_shards()
+    ]
+
+
+def get_batch_size():
+    return getattr(settings, 'SYNC_BATCH_SIZE', 500)
+
+
+def visible_projects(user, using):
+    """Projets visibles par l'utilisateur sur le shard `using`, comme dans ProjectViewSet"""
+    projects = Project.objects.using(using)
+    if user.is_staff:
+        return projects
+    member_of = Membership.objects.using(using).filter(user=user).values('project_id')
+    return projects.filter(Q(author=user) | Q(id__in=member_of))
+
+
+def sync_records(user, since, until, batch_size=None):
+    """
+    Enregistrements (type, valeurs) de la synchronisation de l'utilisateur entre les positions `since` et `until`
+    de chaque shard, suivis du nouveau jeton. Les projets rejoints depuis `since` sont envoyés en entier (export),
+    les projets quittés ou supprimés sous forme de tombstone ; les autres changements sont lus dans l'ordre du
+    journal par lots de `batch_size` lignes, une requête par type d'objet et par lot.
+    """
+    batch_size = batch_size or get_batch_size()
+    for alias, first, last in zip(sharding.get_shards(), since, until):
+        if last <= first:
+            continue
+        visible = visible_projects(user, alias)
+        changes = Change.objects.using(alias).filter(seq__gt=first, seq__lte=last).exclude(kind='membership')
+        if not user.is_staff:
+            joined = set()
+            memberships = list(dict.fromkeys(Change.objects.using(alias).filter(
+                kind='membership', user_id=user.pk, seq__gt=first, seq__lte=last,
+            ).order_by('seq').values_list('project_id', flat=True)))
+            visible_ids = set(visible.filter(id__in=memberships).values_list('id', flat=True))
+            for project_id in memberships:
+                if project_id in visible_ids:
+                    joined.add(project_id)
+                    yield from export_records(project_id, batch_size, using=alias)
+                else:
+                    yield 'deleted', {'kind': 'project', 'id': project_id}
+            changes = changes.filter(project_id__in=visible.values('id')).exclude(project_id__in=joined)
+
+        position = first
+        while True:
+            batch = list(changes.filter(seq__gt=position).order_by('seq')
+                         .values_list('seq', 'kind', 'object_id', 'deleted')[:batch_size])
+            if not batch:
+                break
+            position = batch[-1][0]
+            yield from batch_records(batch, visible, alias)
+    yield 'sync', {'token': encode_token(until)}
+
+
+def batch_records(batch, visible, using):
+    """Tombstones du lot, puis objets modifiés encore visibles (parents d'abord)"""
+    live = {kind: [] for kind in SYNCED_MODELS}
+    for seq, kind, object_id, deleted in batch:
+        model = SYNCED_MODELS[kind][0]
+        if deleted:
+            yield 'deleted', {'kind': kind, 'id': model._meta.pk.to_python(object_id)}
+        else:
+            live[kind].append(object_id)
+    for kind, object_ids in live.items():
+        if not object_ids:
+            continue
+        model, fields, project_lookup = SYNCED_MODELS[kind]
+        objects = model.objects.using(using).filter(
+            pk__in=object_ids, **{f'{project_lookup}__in': visible.values('id')},
+        )
+        for values in objects.order_by().values(*fields):
+            yield kind, values
+
+
+def stream_sync(user, since, until, batch_size=None):
+    """Contenu NDJSON de la synchronisation, écrit par lots de `batch_size` lignes"""
+    batch_size = batch_size or get_batch_size()
+    return batched(to_ndjson(sync_records(user, since, until, batch_size)), batch_size)
@@ -0,0 +1,68 @@
+import datetime
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from authentication.models import User
+from config.urls import build_urlpatterns
+from projects.models import Project, Issue, Contributor
+
+# Routes des tests des vues asynchrones, comme sous ASGI : override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+urlpatterns = build_urlpatterns(async_reads=True)
+ASYNC_URLCONF = __name__
+
+TEST_SETTINGS = {
+    'PASSWORD_HASHERS': ['django.contrib.auth.hashers.MD5PasswordHasher'],
+    # Chaque test relit les listes : pas de réponse mise en cache par un test précédent
+    'RESPONSE_CACHE_TIMEOUT': 0,
+    # Les requêtes sont lues sur la base principale, même si une réplique est configurée
+    'REPLICA_DATABASE_ALIAS': None,
+    # Et sur un seul shard
+    'SHARD_DATABASES': ['default'],
+}
+
+
+def create_user(username, **kwargs):
+    return User.objects.create_user(
+        username=username,
+        password='password',
+        birth_date=datetime.date(1990, 1, 1),
+        can_be_contacted=True,
+        can_data_be_shared=True,
+        **kwargs,
+    )
+
+
+class APITestMixin:
+    """Utilisateur `author` authentifié sur `self.client` et création des objets des tests"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user('author')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_project(self, name='project', author=None, **kwargs):
+        """Projet de type iOS dont l'auteur est contributeur"""
+        author = author or self.user
+        project = Project.objects.create(name=name, type='iOS', author=author, **kwargs)
+        project.add_contributor(author)
+        return project
+
+    def create_issue(self, project, **kwargs):
+        """Issue du projet, créée et assignée par `author` sauf valeurs données"""
+        kwargs = {'name': 'issue', 'priority': 'Low', 'tag': 'BUG', 'author': self.user, **kwargs}
+        if 'contributor' not in kwargs:
+            kwargs['contributor'] = Contributor.objects.get(user=self.user)
+        return Issue.objects.create(project=project, **kwargs)
+
+
+@override_settings(**TEST_SETTINGS)
+class APITestBase(APITestMixin, TestCase):
+    pass
+
+
+@override_settings(**TEST_SETTINGS)
+class APITransactionTestBase(APITestMixin, TransactionTestCase):
+    pass
@@ -0,0 +1,80 @@
+from django.test import AsyncClient, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from projects.models import Project, Issue, Comment
+from projects.tests.base import ASYNC_URLCONF, APITestBase, create_user
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+class AsyncReadTestCase(APITestBase):
+    """Lectures servies par les vues asynchrones (projects.async_views) avec un jeton JWT, comme sous ASGI"""
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project('projet')
+        self.issue = self.create_issue(self.project)
+        self.comment = Comment.objects.create(issue=self.issue, description='commentaire', author=self.user)
+        self.other = create_user('other')
+        self.other_project = Project.objects.create(name='autre', type='iOS', author=self.other)
+        self.staff = create_user('staff', is_staff=True)
+        self.client = AsyncClient()
+
+    def get(self, url, user=None, **headers):
+        """GET authentifié par un jeton d'accès (AsyncClient ignore ses en-têtes par défaut en Django 5.0)"""
+        token = AccessToken.for_user(user or self.user)
+        return self.client.get(url, headers={'Authorization': f'Bearer {token}', **headers})
+
+    async def test_detail_collections(self):
+        """Les collections bornées des détails sont préchargées : aucune requête synchrone pendant le rendu"""
+        for url in (f'/api/project/{self.project.pk}/', f'/api/project/{self.project.pk}/?fields=issues'):
+            response = await self.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(response.json()['issues']['count'], 1)
+            self.assertEqual(len(response.json()['issues']['results']), 1)
+        response = await self.get(f'/api/issue/{self.issue.pk}/')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['comments']['results'][0].rsplit('/', 2)[-2], str(self.comment.pk))
+
+    async def test_authentication(self):
+        response = await self.client.get('/api/project/')
+        self.assertEqual(response.status_code, 401)
+        response = await self.client.get('/api/issue/', headers={'Authorization': 'Bearer invalid'})
+        self.assertEqual(response.status_code, 401)
+        response = await self.get('/api/comment/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+
+    async def test_lists_and_details(self):
+        """Mêmes réponses que les vues synchrones, pour les objets visibles seulement"""
+        urls = ['/api/project/', '/api/issue/?cursor=', '/api/comment/?limit=1', f'/api/project/{self.project.pk}/',
+                f'/api/issue/{self.issue.pk}/', f'/api/comment/{self.comment.pk}/']
+        for url in urls:
+            response = await self.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            with self.settings(ROOT_URLCONF='config.urls'):
+                self.assertEqual((await self.get(url)).content, response.content, url)
+        self.assertEqual((await self.get('/api/project/')).json()['count'], 1)
+        self.assertEqual((await self.get(f'/api/project/{self.other_project.pk}/')).status_code, 404)
+
+    async def test_object_permissions(self):
+        """ahas_permission : 404 pour un objet invisible ou inexistant, 403 pour un admin non contributeur"""
+        for url in (f'/api/issue/{self.issue.pk}/', f'/api/comment/{self.comment.pk}/'):
+            self.assertEqual((await self.get(url, self.other)).status_code, 404, url)
+            self.assertEqual((await self.get(url, self.staff)).status_code, 403, url)
+        for url in ('/api/issue/0/', '/api/issue/abc/', '/api/comment/abc/',
+                    '/api/comment/00000000-0000-0000-0000-000000000000/'):
+            self.assertEqual((await self.get(url)).status_code, 404, url)
+
+    async def test_conditional_get(self):
+        for url in ('/api/project/', '/api/issue/', '/api/comment/', f'/api/project/{self.project.pk}/',
+                    f'/api/issue/{self.issue.pk}/', f'/api/comment/{self.comment.pk}/'):
+            response = await self.get(url)
+            etag = response['ETag']
+            response = await self.get(url, **{'If-None-Match': etag})
+            self.assertEqual((response.status_code, response['ETag']), (304, etag), url)
+            if 'Last-Modified' in response:
+                response = await self.get(url, **{'If-Modified-Since': response['Last-Modified']})
+                self.assertEqual(response.status_code, 304, url)
+        await Issue.objects.filter(pk=self.issue.pk).aupdate(priority='High', version=2)
+        for url in ('/api/issue/', f'/api/issue/{self.issue.pk}/'):
+            self.assertEqual((await self.get(url, **{'If-None-Match': etag})).status_code, 200, url)
@@ -0,0 +1,169 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+from rest_framework.test import APIClient
+from rest_framework.viewsets import ModelViewSet
+
+from projects.mixins import BulkCreateMixin
+from projects.models import Issue
+from projects.serializers import IssueBulkSerializer, IssueListSerializer
+from projects.tests.base import APITestBase, create_user
+
+
+class BulkCreateTestCase(APITestBase):
+    """Créations en lot (BulkCreateMixin) : routes issue/bulk et comment/bulk, et tableau sur la route de création"""
+
+    def setUp(self):
+        super().setUp()
+        self.member = create_user('member')
+        self.outsider = create_user('outsider')
+        self.project = self.create_project()
+        self.other_project = self.create_project('other', author=self.outsider)
+        self.project.add_contributor(self.member)
+        self.issue = self.create_issue(self.project)
+
+    def issue_data(self, name, **data):
+        return {'project': self.project.pk, 'name': name, 'priority': 'Low', 'tag': 'BUG', **data}
+
+    def test_item_errors(self):
+        """Les erreurs de chaque élément sont rapportées à son index, les autres éléments sont créés"""
+        items = [
+            self.issue_data('first', contributor='member'),
+            self.issue_data('other project', project=self.other_project.pk),
+            self.issue_data('bad priority', priority='Urgent'),
+            self.issue_data('not a member', contributor='outsider'),
+            self.issue_data('unknown', contributor='nobody'),
+            self.issue_data('last'),
+        ]
+        response = self.client.post('/api/issue/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 207, response.content)
+        body = response.json()
+        self.assertEqual(body['created'], 2)
+        self.assertEqual([result['index'] for result in body['results']], list(range(len(items))))
+        self.assertEqual([result['data']['name'] for result in body['results'] if 'data' in result],
+                         ['first', 'last'])
+        self.assertEqual([list(result['errors']) for result in body['results'] if 'errors' in result],
+                         [['project'], ['priority'], ['non_field_errors'], ['contributor']])
+        self.assertEqual(Issue.objects.get(name='first').contributor.user, self.member)
+
+        # Tableau envoyé sur la route de création ; aucun élément valide : 400
+        response = self.client.post('/api/comment/', [
+            {'issue': self.issue.pk, 'description': 'comment'}, {'issue': 0, 'description': 'comment'},
+        ], format='json')
+        self.assertEqual(response.status_code, 207, response.content)
+        self.assertEqual(response.json()['results'][1], {'index': 1, 'errors': {'issue': ['Issue does not exist']}})
+        response = self.client.post('/api/comment/bulk/', [{'issue': self.issue.pk}], format='json')
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertEqual(response.json()['created'], 0)
+
+    @override_settings(BULK_MAX_ITEMS=3)
+    def test_max_items(self):
+        items = [self.issue_data(f'issue {index}') for index in range(4)]
+        response = self.client.post('/api/issue/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'At most 3 objects can be created at once'})
+        response = self.client.post('/api/issue/bulk/', self.issue_data('not a list'), format='json')
+        self.assertEqual(response.json(), {'error': 'A list of objects is required'})
+        self.assertEqual(Issue.objects.count(), 1)
+        response = self.client.post('/api/issue/bulk/', items[:3], format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_counters(self):
+        self.client.post('/api/issue/bulk/', [self.issue_data(f'issue {index}') for index in range(3)],
+                         format='json')
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.issue_count, 4)
+        other_issue = Issue.objects.get(name='issue 0')
+        items = [{'issue': issue_id, 'description': 'comment'} for issue_id in (self.issue.pk, self.issue.pk,
+                                                                                 other_issue.pk)]
+        self.client.post('/api/comment/bulk/', items, format='json')
+        self.issue.refresh_from_db()
+        other_issue.refresh_from_db()
+        self.project.refresh_from_db()
+        self.assertEqual((self.issue.comment_count, other_issue.comment_count), (2, 1))
+        self.assertEqual((self.project.issue_count, self.project.comment_count), (4, 3))
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=60)
+    def test_cache_invalidation(self):
+        """Les listes en cache de tous les membres du projet sont invalidées"""
+        member = APIClient()
+        member.force_authenticate(self.member)
+        for client in (self.client, member):
+            self.assertEqual(client.get('/api/issue/').json()['count'], 1)
+            self.assertEqual(client.get('/api/comment/').json()['count'], 0)
+        # L'invalidation a lieu au commit
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.client.post('/api/issue/bulk/', [self.issue_data('new')], format='json')
+            self.client.post('/api/comment/bulk/', [{'issue': self.issue.pk, 'description': 'comment'}],
+                             format='json')
+        self.assertTrue(callbacks)
+        for client in (self.client, member):
+            self.assertEqual(client.get('/api/issue/').json()['count'], 2)
+            self.assertEqual(client.get('/api/comment/').json()['count'], 1)
+
+    def test_required_definitions(self):
+        """Une vue sans build_bulk_instances est refusée dès sa définition"""
+        with self.assertRaisesMessage(ImproperlyConfigured, 'must define build_bulk_instances'):
+            type('IncompleteViewSet', (BulkCreateMixin, ModelViewSet), {
+                'bulk_serializer_class': IssueBulkSerializer, 'bulk_response_serializer_class': IssueListSerializer,
+            })
+
+
+class BulkUpdateTestCase(APITestBase):
+    """Route de triage en lot des issues (PATCH /api/issue/bulk_update/)"""
+    url = '/api/issue/bulk_update/'
+
+    def setUp(self):
+        super().setUp()
+        self.member = create_user('member')
+        self.outsider = create_user('outsider')
+        self.project = self.create_project()
+        self.other_project = self.create_project('other')
+        self.project.add_contributor(self.member)
+        self.issues = [self.create_issue(project, priority=priority)
+                       for project in (self.project, self.other_project) for priority in ('Low', 'Low', 'High')]
+
+    def tags(self):
+        return list(Issue.objects.order_by('id').values_list('tag', flat=True))
+
+    def test_forbidden(self):
+        """Une issue d'un autre auteur dans la sélection refuse tout le lot"""
+        self.create_issue(self.project, author=self.member)
+        client = APIClient()
+        client.force_authenticate(self.member)
+        response = client.patch(f'{self.url}?project={self.project.pk}', {'tag': 'Task'}, format='json')
+        self.assertEqual(response.status_code, 403, response.content)
+        self.assertEqual(response.json(), {'detail': 'You can only edit your own issues.'})
+        response = self.client.patch(f'{self.url}?project={self.project.pk}', {'tag': 'Task'}, format='json')
+        self.assertEqual(response.status_code, 403, response.content)
+        self.assertEqual(self.tags(), ['BUG'] * 7)
+
+    def test_contributor_not_member(self):
+        """Le contributeur assigné doit contribuer à chacun des projets des issues sélectionnées"""
+        versions = list(Issue.objects.order_by('id').values_list('version', flat=True))
+        response = self.client.patch(self.url + '?priority=Low', {'tag': 'Task', 'contributor': 'member'},
+                                     format='json')
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertEqual(response.json(), {'contributor': ['This contributor is not contributing to this project.']})
+        self.assertEqual(self.tags(), ['BUG'] * 6)
+        self.assertEqual(list(Issue.objects.order_by('id').values_list('version', flat=True)), versions)
+
+        response = self.client.patch(f'{self.url}?project={self.project.pk}', {'contributor': 'member'},
+                                     format='json')
+        self.assertEqual(response.json(), {'updated': 3})
+        self.assertEqual(Issue.objects.filter(contributor__user=self.member).count(), 3)
+
+    def test_ids_and_filters(self):
+        """Les ids et les filtres de la liste se combinent ; les issues invisibles ne sont pas modifiées"""
+        ids = [issue.pk for issue in self.issues[1:5]]
+        response = self.client.patch(f'{self.url}?priority=Low', {'ids': ids, 'tag': 'Task'}, format='json')
+        self.assertEqual(response.json(), {'updated': 3})
+        self.assertEqual(self.tags(), ['BUG', 'Task', 'BUG', 'Task', 'Task', 'BUG'])
+        self.assertEqual([issue.version + 1 if tag == 'Task' else issue.version
+                          for issue, tag in zip(self.issues, self.tags())],
+                         list(Issue.objects.order_by('id').values_list('version', flat=True)))
+
+        client = APIClient()
+        client.force_authenticate(self.outsider)
+        response = client.patch(self.url, {'ids': ids, 'tag': 'Feature'}, format='json')
+        self.assertEqual(response.json(), {'updated': 0})
+        self.assertNotIn('Feature', self.tags())
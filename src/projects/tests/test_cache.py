@@ -0,0 +1,64 @@
+from projects import cache as membership_cache
+from projects.models import Project, Comment, Contributor
+from projects.tests.base import APITestBase, create_user
+
+
+class MembershipCacheTestCase(APITestBase):
+    """Cache des appartenances (projects.cache) : invalidé par les changements de contributeurs et d'issues"""
+
+    def setUp(self):
+        super().setUp()
+        self.member = create_user('member')
+        self.project = self.create_project()
+        self.other_project = Project.objects.create(name='other', type='iOS', author=self.user)
+        self.project.add_contributor(self.member)
+        self.contributor = Contributor.objects.get(user=self.member)
+        self.issue = self.create_issue(self.project, contributor=self.contributor)
+        self.client.force_authenticate(self.member)
+
+    def assertProjectIds(self, expected):
+        """Vérifie la valeur calculée puis sa lecture en cache, sans requête"""
+        self.assertEqual(membership_cache.get_user_project_ids(self.member.pk), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(membership_cache.get_user_project_ids(self.member.pk), expected)
+
+    def test_contributor_changes(self):
+        self.assertProjectIds({self.project.pk})
+        self.other_project.contributors.add(self.contributor)
+        self.assertProjectIds({self.project.pk, self.other_project.pk})
+        self.project.contributors.remove(self.contributor)
+        self.assertProjectIds({self.other_project.pk})
+        self.other_project.contributors.clear()
+        self.assertProjectIds(set())
+        # Côté inverse de la relation (Contributor.project_set)
+        self.contributor.project_set.add(self.project, self.other_project)
+        self.assertProjectIds({self.project.pk, self.other_project.pk})
+        self.contributor.project_set.remove(self.other_project)
+        self.assertProjectIds({self.project.pk})
+        self.contributor.project_set.clear()
+        self.assertProjectIds(set())
+
+    def test_project_delete(self):
+        self.assertProjectIds({self.project.pk})
+        self.project.delete()
+        self.assertProjectIds(set())
+
+    def test_issue_move(self):
+        """Une issue déplacée n'est plus visible des membres de son ancien projet"""
+        url = f'/api/issue/{self.issue.pk}/'
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(membership_cache.get_issue_project_id(self.issue.pk), self.project.pk)
+        self.issue.project = self.other_project
+        self.issue.save()
+        self.assertEqual(membership_cache.get_issue_project_id(self.issue.pk), self.other_project.pk)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_issue_and_comment_delete(self):
+        comment = Comment.objects.create(issue=self.issue, description='comment', author=self.user)
+        issue_id, comment_id = self.issue.pk, comment.pk
+        self.assertEqual(membership_cache.get_issue_project_id(issue_id), self.project.pk)
+        self.assertEqual(membership_cache.get_comment_issue_id(comment_id), issue_id)
+        comment.delete()
+        self.assertIsNone(membership_cache.get_comment_issue_id(comment_id))
+        self.issue.delete()
+        self.assertIsNone(membership_cache.get_issue_project_id(issue_id))
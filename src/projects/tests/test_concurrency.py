@@ -0,0 +1,77 @@
+import threading
+
+from django.db import connection, connections
+from rest_framework.test import APIClient
+
+from projects.models import Comment
+from projects.tests.base import APITransactionTestBase
+
+
+class ConcurrentWriteTestCase(APITransactionTestBase):
+    """
+    Écritures simultanées depuis plusieurs threads, chacun avec sa connexion SQLite : aucune ne doit échouer
+    sur le verrou de la base (database is locked) et les compteurs doivent rester exacts.
+    """
+    threads = 8
+    writes = 10
+
+    def setUp(self):
+        if connection.is_in_memory_db():
+            self.skipTest('Les threads ne partagent pas une base de test en mémoire')
+        if connection.settings_dict['ENGINE'] != 'config.sqlite_backend':
+            self.skipTest('Profil SQLite de production requis (DJANGO_SQLITE_PROFILE=production)')
+        super().setUp()
+        self.project = self.create_project()
+        self.contributor = self.project.contributors.get()
+        self.issue = self.create_issue(self.project)
+
+    def hammer(self, write):
+        """Appelle `write(client, thread, index)` `writes` fois depuis chaque thread et retourne les statuts"""
+        barrier = threading.Barrier(self.threads)
+        statuses, errors = [], []
+
+        def run(thread):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                barrier.wait()
+                for index in range(self.writes):
+                    statuses.append(write(client, thread, index).status_code)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=run, args=(thread,)) for thread in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(errors, [])
+        return statuses
+
+    def test_comment_create(self):
+        statuses = self.hammer(lambda client, thread, index: client.post(
+            '/api/comment/', {'issue': self.issue.pk, 'description': f'comment {thread}-{index}'}, format='json'
+        ))
+        total = self.threads * self.writes
+        self.assertEqual(statuses, [201] * total)
+        self.issue.refresh_from_db()
+        self.project.refresh_from_db()
+        self.assertEqual(Comment.objects.count(), total)
+        self.assertEqual((self.issue.comment_count, self.project.comment_count), (total, total))
+
+    def test_issue_create_and_update(self):
+        def write(client, thread, index):
+            if thread % 2:
+                return client.patch(f'/api/issue/{self.issue.pk}/', {'priority': 'High'}, format='json')
+            return client.post('/api/issue/', {
+                'project': self.project.pk, 'name': f'issue {thread}-{index}', 'description': 'issue',
+                'priority': 'Low', 'tag': 'BUG', 'status': 'To Do', 'contributor': self.contributor.pk,
+            }, format='json')
+
+        statuses = self.hammer(write)
+        created = self.threads // 2 * self.writes
+        self.assertEqual(sorted(statuses), [200] * (len(statuses) - created) + [201] * created)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.issue_count, created + 1)
@@ -0,0 +1,75 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+
+from projects.models import Comment
+from projects.tests.base import APITestBase, create_user
+
+
+class ConditionalGetTestCase(APITestBase):
+    """
+    GET conditionnels (ConditionalGetMixin) : 304 sur If-None-Match et If-Modified-Since, validateurs des listes
+    calculés sans requête d'état, nouvel ETag des listes dès qu'une écriture change leur contenu.
+    """
+    LISTS = ('/api/project/', '/api/issue/', '/api/comment/')
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project('projet')
+        self.issue = self.create_issue(self.project)
+        self.comment = Comment.objects.create(issue=self.issue, description='commentaire', author=self.user)
+
+    def get_etags(self):
+        return {url: self.client.get(url)['ETag'] for url in self.LISTS}
+
+    def test_not_modified(self):
+        urls = [*self.LISTS, '/api/issue/?cursor=', '/api/comment/?fields=id,issue', '/api/project/?search=projet',
+                f'/api/project/{self.project.pk}/', f'/api/issue/{self.issue.pk}/', f'/api/comment/{self.comment.pk}/']
+        for url in urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            etag, last_modified = response['ETag'], response['Last-Modified']
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304, url)
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304, url)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"other"').status_code, 200, url)
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(0)).status_code, 200, url)
+
+    def test_list_queries(self):
+        """Pas de requête d'état : la recherche n'est exécutée qu'une fois et le mode curseur ne compte rien"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/comment/?cursor=&search=commentaire')
+        self.assertEqual(response.status_code, 200)
+        sql = [query['sql'] for query in context.captured_queries]
+        self.assertEqual([query for query in sql if 'COUNT(' in query or 'SUM(' in query], [])
+        self.assertEqual(len([query for query in sql if 'MATCH' in query]), 1)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/comment/?cursor=&search=commentaire', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(len(context), len(sql))
+
+    def test_child_writes(self):
+        """Chaque écriture change l'ETag des listes qui affichent l'objet ou ses compteurs, et seulement celles-ci"""
+        writes = [
+            (lambda: self.client.post('/api/comment/', {'issue': self.issue.pk, 'description': 'nouveau'}),
+             self.LISTS),
+            (lambda: self.client.patch(f'/api/comment/{self.comment.pk}/', {'description': 'modifié'}), self.LISTS),
+            (lambda: self.client.delete(f'/api/comment/{self.comment.pk}/'), self.LISTS),
+            (lambda: self.client.post('/api/issue/', {
+                'project': self.project.pk, 'name': 'autre', 'description': 'issue', 'priority': 'High',
+                'tag': 'Task', 'status': 'To Do',
+            }), ('/api/project/', '/api/issue/')),
+            (lambda: self.client.post(f'/api/project/{self.project.pk}/add_contributor/',
+                                      {'username': create_user('member').username}), ('/api/project/',)),
+        ]
+        for write, changed in writes:
+            before = self.get_etags()
+            response = write()
+            self.assertLess(response.status_code, 300, response.content)
+            after = self.get_etags()
+            self.assertEqual({url for url in self.LISTS if after[url] != before[url]}, set(changed), changed)
+
+        # Suppression d'un objet hors de la page : le contenu de la page ne change pas, mais le total oui
+        Comment.objects.create(issue=self.issue, description='dernier', author=self.user)
+        url = '/api/comment/?limit=1'
+        before = self.client.get(url)['ETag']
+        Comment.objects.order_by('created_time').last().delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=before).status_code, 200)
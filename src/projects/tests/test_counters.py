@@ -0,0 +1,92 @@
+import io
+
+from django.core.management import call_command
+
+from projects.models import Project, Issue, Comment
+from projects.tests.base import APITestBase, create_user
+
+
+class CounterTestCase(APITestBase):
+    """Compteurs d'issues et de commentaires des projets et des issues (projects.counters)"""
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+        self.other = self.create_project('other')
+
+    def create_issue(self, project, comments=0):
+        issue = super().create_issue(project)
+        for index in range(comments):
+            Comment.objects.create(issue=issue, description=f'comment {index}', author=self.user)
+        issue.refresh_from_db()
+        return issue
+
+    def counts(self, *objects):
+        counts = []
+        for obj in objects:
+            obj.refresh_from_db()
+            counts.append((obj.issue_count, obj.comment_count) if isinstance(obj, Project) else obj.comment_count)
+        return counts
+
+    def test_create_and_delete(self):
+        issue = self.create_issue(self.project, comments=2)
+        self.create_issue(self.project)
+        self.assertEqual(self.counts(self.project, issue), [(2, 2), 2])
+        issue.comments.first().delete()
+        self.assertEqual(self.counts(self.project, issue), [(2, 1), 1])
+        issue.delete()
+        self.assertEqual(self.counts(self.project), [(1, 0)])
+
+    def test_issue_moved(self):
+        issue = self.create_issue(self.project, comments=3)
+        issue.project = self.other
+        issue.save()
+        self.assertEqual(self.counts(self.project, self.other, issue), [(0, 0), (1, 3), 3])
+
+    def test_cascade_delete(self):
+        """Une cascade partie d'un utilisateur retire ses issues et commentaires des projets et issues restants"""
+        member = create_user('member')
+        self.project.add_contributor(member)
+        kept = self.create_issue(self.project, comments=2)
+        Comment.objects.create(issue=kept, description='member', author=member)
+        deleted = super().create_issue(self.project, author=member)
+        for index in range(3):
+            Comment.objects.create(issue=deleted, description=f'comment {index}', author=self.user)
+        self.create_issue(self.create_project('member', author=member), comments=1)
+        self.assertEqual(self.counts(self.project, kept), [(2, 6), 3])
+        member.delete()
+        self.assertEqual(self.counts(self.project, kept), [(1, 2), 2])
+        self.assertEqual(list(Project.objects.order_by('pk')), [self.project, self.other])
+
+    def test_drifted_counters(self):
+        """Un compteur qui a dérivé reste à 0 au lieu de violer la contrainte des PositiveIntegerField"""
+        issue = self.create_issue(self.project, comments=2)
+        Project.objects.filter(pk=self.project.pk).update(issue_count=0, comment_count=1)
+        issue.project = self.other
+        issue.save()
+        self.assertEqual(self.counts(self.project, self.other), [(0, 0), (1, 2)])
+
+        Project.objects.filter(pk=self.other.pk).update(issue_count=0, comment_count=0)
+        Issue.objects.filter(pk=issue.pk).update(comment_count=0)
+        issue.comments.first().delete()
+        self.assertEqual(self.counts(self.other, issue), [(0, 0), 0])
+        issue.delete()
+        self.assertEqual(self.counts(self.other), [(0, 0)])
+
+    def test_recount_counters(self):
+        issue = self.create_issue(self.project, comments=2)
+        self.create_issue(self.other)
+        Project.objects.filter(pk=self.project.pk).update(issue_count=5)
+        Issue.objects.filter(pk=issue.pk).update(comment_count=0)
+
+        output = io.StringIO()
+        call_command('recount_counters', '--dry-run', stdout=output)
+        self.assertIn('1 project(s) and 1 issue(s) to repair', output.getvalue())
+        self.assertEqual(self.counts(self.project, issue), [(5, 2), 0])
+
+        output = io.StringIO()
+        call_command('recount_counters', stdout=output)
+        self.assertIn('1 project(s) and 1 issue(s) repaired', output.getvalue())
+        self.assertEqual(self.counts(self.project, self.other, issue), [(1, 2), (1, 0), 2])
+        call_command('recount_counters', stdout=output)
+        self.assertIn('0 project(s) and 0 issue(s) repaired', output.getvalue())
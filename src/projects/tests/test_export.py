@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from projects.models import Comment
+from projects.tests.base import APITestBase, create_user
+
+
+# Plusieurs blocs de lecture et d'écriture pour quelques lignes
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTestCase(APITestBase):
+    """Route d'export d'un projet (GET /api/project/<id>/export/, projects.export)"""
+
+    def setUp(self):
+        super().setUp()
+        self.outsider = create_user('outsider')
+        self.project = self.create_project(description='é, "cité"')
+        self.issues = [self.create_issue(self.project, name=f'issue {index}') for index in range(3)]
+        self.comments = [Comment.objects.create(issue=issue, description='ligne 1\nligne 2', author=self.user)
+                         for issue in self.issues[:2]]
+        self.create_issue(self.create_project('other'), name='other')
+        self.url = f'/api/project/{self.project.pk}/export/'
+
+    def export(self, query=''):
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response, content = self.export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="project-{self.project.pk}.ndjson"')
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([(record['record'], record['id']) for record in records], [
+            ('project', self.project.pk),
+            *[('issue', issue.pk) for issue in self.issues],
+            *[('comment', str(comment.pk)) for comment in self.comments],
+        ])
+        self.assertEqual(records[0]['description'], 'é, "cité"')
+        self.assertEqual(records[0]['created_time'], self.project.created_time.isoformat())
+        self.assertEqual(records[-1]['description'], 'ligne 1\nligne 2')
+
+    def test_csv(self):
+        response, content = self.export('?output=csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([(row['record'], row['id']) for row in rows], [
+            ('project', str(self.project.pk)),
+            *[('issue', str(issue.pk)) for issue in self.issues],
+            *[('comment', str(comment.pk)) for comment in self.comments],
+        ])
+        self.assertEqual((rows[0]['description'], rows[0]['issue']), ('é, "cité"', ''))
+        self.assertEqual((rows[-1]['description'], rows[-1]['issue']), ('ligne 1\nligne 2', str(self.issues[1].pk)))
+        self.assertEqual(rows[1]['created_time'], self.issues[0].created_time.isoformat())
+
+    def test_invalid_output(self):
+        response = self.client.get(self.url + '?output=xml')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Output must be one of: ndjson, csv'})
+
+    def test_visibility(self):
+        """Seuls les contributeurs du projet l'exportent"""
+        client = APIClient()
+        client.force_authenticate(self.outsider)
+        self.assertEqual(client.get(self.url).status_code, 404)
+        self.assertEqual(APIClient().get(self.url).status_code, 401)
+        self.assertEqual(self.client.get('/api/project/0/export/').status_code, 404)
@@ -0,0 +1,136 @@
+import io
+import json
+
+from django.db.models import Max
+
+from authentication.models import User
+from projects.importer import STREAMS, SoftDeskImporter
+from projects.models import Project, Issue, Comment, Change
+from projects.tests.base import APITestBase
+
+
+class ImportTestCase(APITestBase):
+    """Import NDJSON par lots (projects.importer) : les lignes invalides sont signalées sans interrompre l'import"""
+
+    def setUp(self):
+        super().setUp()
+        self.importer = SoftDeskImporter('test', batch_size=2)
+
+    def run_import(self, streams, importer=None):
+        """Importe les flux donnés ({flux: lignes}) et retourne les erreurs (flux, numéro de ligne, message)"""
+        importer = importer or self.importer
+        for stream in STREAMS:
+            if stream in streams:
+                lines = ''.join(f'{json.dumps(row)}\n' for row in streams[stream])
+                importer.import_stream(stream, io.StringIO(lines))
+        importer.finish()
+        return importer.errors
+
+    def test_duplicate_project_names(self):
+        """Un nom déjà pris dans la base ou dans le flux rejette la ligne, comme à la création par l'API"""
+        Project.objects.create(name='existant', type='iOS', author=self.user)
+        names = ['même', 'même', 'existant', 'autre', 'même']
+        errors = self.run_import({
+            'users': [{'id': 1, 'username': 'importé', 'birth_date': '1990-01-01'}],
+            'projects': [{'id': index, 'name': name, 'type': 'iOS', 'author': 1}
+                         for index, name in enumerate(names, start=1)],
+        })
+        self.assertEqual(errors, [('projects', 2, 'Duplicate name: même'), ('projects', 3, 'Duplicate name: existant'),
+                                  ('projects', 5, 'Duplicate name: même')])
+        self.assertEqual(sorted(Project.objects.values_list('name', flat=True)), ['autre', 'existant', 'même'])
+
+    def test_resume_from_checkpoint(self):
+        """Un import interrompu reprend après le dernier lot validé, sans recréer ses objets"""
+        users = [{'id': 1, 'username': 'importé', 'birth_date': '1990-01-01'}]
+        lines = [f'{json.dumps({"id": index, "name": f"projet {index}", "type": "iOS", "author": 1})}\n'
+                 for index in range(1, 6)]
+
+        def interrupted(lines, at):
+            for index, line in enumerate(lines):
+                if index == at:
+                    raise RuntimeError('Import interrompu')
+                yield line
+
+        self.run_import({'users': users})
+        with self.assertRaises(RuntimeError):
+            self.importer.import_stream('projects', interrupted(lines, at=3))
+        # Seul le premier lot (lignes 1 et 2) est écrit
+        self.assertEqual(Project.objects.count(), 2)
+        importer = SoftDeskImporter('test', batch_size=2)
+        self.assertEqual(importer.import_stream('projects', iter(lines))[:2], (3, 3))
+        self.assertEqual(importer.import_stream('projects', iter(lines))[:2], (0, 0))
+        self.assertEqual(importer.errors, [])
+        self.assertEqual(sorted(Project.objects.values_list('name', flat=True)),
+                         [f'projet {index}' for index in range(1, 6)])
+
+    def test_duplicate_ids(self):
+        """Un identifiant source déjà importé, dans le même lot ou un lot précédent, rejette la ligne"""
+        errors = self.run_import({
+            'users': [{'id': 1, 'username': 'importé', 'birth_date': '1990-01-01'},
+                      {'id': 1, 'username': 'doublon', 'birth_date': '1990-01-01'}],
+            'projects': [{'id': source_id, 'name': f'projet {index}', 'type': 'iOS', 'author': 1}
+                         for index, source_id in enumerate([1, 1, 2, 1], start=1)],
+        })
+        self.assertEqual(errors, [('users', 2, 'Duplicate id: 1'), ('projects', 2, 'Duplicate id: 1'),
+                                  ('projects', 4, 'Duplicate id: 1')])
+        self.assertFalse(User.objects.filter(username='doublon').exists())
+        self.assertEqual(sorted(Project.objects.values_list('name', flat=True)), ['projet 1', 'projet 3'])
+
+    def test_unknown_foreign_keys(self):
+        """Une référence à un objet absent de l'import rejette la ligne"""
+        comment_id = '7f6c1c1e-3d4a-4b8e-9c59-1f4f8d2a6b10'
+        errors = self.run_import({
+            'users': [{'id': 1, 'username': 'importé', 'birth_date': '1990-01-01'}],
+            'projects': [{'id': 1, 'name': 'projet', 'type': 'iOS', 'author': 1},
+                         {'id': 2, 'name': 'orphelin', 'type': 'iOS', 'author': 9}],
+            'contributors': [{'project': 1, 'user': 9}, {'project': 9, 'user': 1}],
+            'issues': [{'id': 1, 'project': 1, 'name': 'issue', 'priority': 'Low', 'tag': 'BUG', 'author': 1},
+                       {'id': 2, 'project': 9, 'name': 'issue', 'priority': 'Low', 'tag': 'BUG', 'author': 1},
+                       {'id': 3, 'project': 1, 'name': 'issue', 'priority': 'Low', 'tag': 'BUG', 'author': 1,
+                        'contributor': 9}],
+            'comments': [{'id': comment_id, 'issue': 1, 'description': 'comment', 'author': 1},
+                         {'issue': 9, 'description': 'comment', 'author': 1}],
+        })
+        self.assertEqual(errors, [
+            ('projects', 2, 'Unknown author: 9'), ('contributors', 1, 'Unknown user: 9'),
+            ('contributors', 2, 'Unknown project: 9'), ('issues', 2, 'Unknown project: 9'),
+            ('issues', 3, 'Unknown contributor: 9'), ('comments', 2, 'Unknown issue: 9'),
+        ])
+        project = Project.objects.get()
+        self.assertEqual((project.name, project.issue_count, project.comment_count), ('projet', 1, 1))
+        self.assertEqual(str(Comment.objects.get().pk), comment_id)
+
+    def test_source_timestamps(self):
+        """Les dates de la source sont gardées, sans changer auto_now / auto_now_add des modèles"""
+        created, updated = '2020-01-01T10:00:00+00:00', '2021-06-01T10:00:00+00:00'
+        self.run_import({
+            'users': [{'id': 1, 'username': 'importé', 'birth_date': '1990-01-01'}],
+            'projects': [{'id': 1, 'name': 'projet', 'type': 'iOS', 'author': 1, 'created_time': created,
+                          'updated_time': updated}],
+        })
+        project = Project.objects.get()
+        self.assertEqual((project.created_time.isoformat(), project.updated_time.isoformat()), (created, updated))
+        self.run_import({
+            'issues': [{'id': 1, 'project': 1, 'name': 'issue', 'priority': 'Low', 'tag': 'BUG', 'author': 1,
+                        'created_time': created}],
+        })
+        issue = Issue.objects.get()
+        # Sans date de mise à jour, celle de création
+        self.assertEqual((issue.created_time.isoformat(), issue.updated_time.isoformat()), (created, created))
+        later = Project.objects.create(name='plus tard', type='iOS', author=self.user)
+        self.assertGreater(later.created_time, project.updated_time)
+        self.assertGreater(later.updated_time, project.updated_time)
+
+    def test_single_write(self):
+        """Chaque objet importé est écrit une seule fois : une ligne du journal, version initiale"""
+        before = Change.objects.aggregate(last=Max('seq'))['last'] or 0
+        self.run_import({
+            'users': [{'id': 1, 'username': 'importé', 'birth_date': '1990-01-01'}],
+            'projects': [{'id': index, 'name': f'projet {index}', 'type': 'iOS', 'author': 1,
+                          'created_time': '2020-01-01T10:00:00+00:00'} for index in range(1, 4)],
+        })
+        changes = Change.objects.filter(seq__gt=before)
+        self.assertEqual(changes.filter(kind='project').count(), 3)
+        # Une seconde écriture remplacerait la ligne de l'objet par une nouvelle : des `seq` seraient sautés
+        self.assertEqual(changes.aggregate(last=Max('seq'))['last'] - before, changes.count())
+        self.assertEqual(set(Project.objects.values_list('version', flat=True)), {1})
@@ -0,0 +1,83 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from projects.tests.base import ASYNC_URLCONF, APITestBase
+
+
+@override_settings(REQUEST_INSTRUMENTATION=True)
+class InstrumentationTestCase(APITestBase):
+    """Instrumentation des requêtes (config.instrumentation) : en-tête Server-Timing, journal des requêtes lentes"""
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+
+    @staticmethod
+    def timings(response):
+        """Étapes de l'en-tête Server-Timing : {nom: (durée, description)}"""
+        metrics = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, duration, *description = metric.split(';')
+            metrics[name] = (float(duration.removeprefix('dur=')), description[0] if description else None)
+        return metrics
+
+    def test_server_timing(self):
+        response = self.client.get('/api/project/')
+        self.assertEqual(response.status_code, 200)
+        metrics = self.timings(response)
+        self.assertEqual(set(metrics), {'total', 'db', 'permission', 'serializer'})
+        self.assertRegex(metrics['db'][1], r'^desc="\d+ queries"$')
+        self.assertGreaterEqual(metrics['total'][0], metrics['serializer'][0])
+
+        response = self.client.get(f'/api/project/{self.project.pk}/', {'include': 'author'})
+        self.assertIn('serializer', self.timings(response))
+
+    def test_writes(self):
+        """La validation et la représentation des écritures sont mesurées, erreurs de validation comprises"""
+        contributor = self.project.contributors.get()
+        response = self.client.post('/api/issue/', {
+            'project': self.project.pk, 'name': 'issue', 'priority': 'Low', 'tag': 'BUG', 'status': 'To Do',
+            'contributor': contributor.pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertIn('serializer', self.timings(response))
+        issue_id = response.json()['id']
+        response = self.client.patch(f'/api/issue/{issue_id}/', {'priority': 'High'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertIn('serializer', self.timings(response))
+        response = self.client.patch(f'/api/issue/{issue_id}/', {'priority': 'Unknown'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('serializer', self.timings(response))
+        response = self.client.post(f'/api/project/{self.project.pk}/add_contributor/', {'username': 'author'},
+                                    format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertIn('serializer', self.timings(response))
+
+    async def test_async_reads(self):
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        with self.settings(ROOT_URLCONF=ASYNC_URLCONF):
+            response = await AsyncClient().get('/api/issue/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('serializer', self.timings(response))
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_request_log(self):
+        with self.assertLogs('config.instrumentation', 'WARNING') as logs:
+            response = self.client.get('/api/project/', {'limit': 1})
+        [record] = [json.loads(message.split(':', 2)[2]) for message in logs.output]
+        self.assertEqual({key: record[key] for key in ('event', 'method', 'path', 'route', 'action', 'status',
+                                                       'user_id')}, {
+            'event': 'slow_request', 'method': 'GET', 'path': '/api/project/?limit=1', 'route': 'project-list',
+            'action': 'list', 'status': 200, 'user_id': self.user.pk,
+        })
+        self.assertEqual(f'desc="{record["queries"]} queries"', self.timings(response)['db'][1])
+        self.assertIn('serializer_ms', record)
+
+    @override_settings(REQUEST_INSTRUMENTATION=False)
+    def test_disabled(self):
+        response = APIClient().get('/api/project/')
+        self.assertNotIn('Server-Timing', response)
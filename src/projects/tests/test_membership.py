@@ -0,0 +1,56 @@
+from projects.models import Project, Contributor, Membership
+from projects.tests.base import APITestBase, create_user
+
+
+class MembershipTestCase(APITestBase):
+    """La table Membership reste le miroir de Project.contributors (signal m2m_changed)"""
+
+    def setUp(self):
+        super().setUp()
+        self.users = [create_user(f'user {index}') for index in range(3)]
+        self.contributors = [Contributor.objects.create(user=user) for user in self.users]
+        self.projects = [Project.objects.create(name=f'project {index}', type='iOS', author=self.users[0])
+                         for index in range(3)]
+
+    def assertMirrored(self, expected):
+        """Vérifie que contributeurs et appartenances donnent les mêmes couples (projet, utilisateur)"""
+        contributors = set(Project.contributors.through.objects.values_list('project_id', 'contributor__user_id'))
+        memberships = set(Membership.objects.values_list('project_id', 'user_id'))
+        self.assertEqual(contributors, memberships)
+        self.assertEqual(memberships, {(project.pk, user.pk) for project, user in expected})
+
+    def test_add_and_remove(self):
+        project = self.projects[0]
+        project.contributors.add(*self.contributors[:2])
+        project.contributors.add(self.contributors[0])
+        self.assertMirrored([(project, self.users[0]), (project, self.users[1])])
+        project.contributors.remove(self.contributors[0])
+        self.assertMirrored([(project, self.users[1])])
+        project.contributors.set([self.contributors[0], self.contributors[2]])
+        self.assertMirrored([(project, self.users[0]), (project, self.users[2])])
+
+    def test_clear(self):
+        for project in self.projects[:2]:
+            project.contributors.add(*self.contributors)
+        self.projects[0].contributors.clear()
+        self.assertMirrored([(self.projects[1], user) for user in self.users])
+
+    def test_reverse_changes(self):
+        """Les modifications faites depuis le contributeur (contributor.project_set) sont aussi répercutées"""
+        contributor, user = self.contributors[0], self.users[0]
+        self.projects[0].contributors.add(self.contributors[1])
+        contributor.project_set.add(*self.projects)
+        self.assertMirrored([(self.projects[0], self.users[1]), *[(project, user) for project in self.projects]])
+        contributor.project_set.remove(self.projects[1])
+        self.assertMirrored([(self.projects[0], self.users[1]), (self.projects[0], user), (self.projects[2], user)])
+        contributor.project_set.clear()
+        self.assertMirrored([(self.projects[0], self.users[1])])
+
+    def test_deletes(self):
+        """La suppression d'un utilisateur ou d'un projet supprime ses appartenances en cascade"""
+        for project in self.projects[:2]:
+            project.contributors.add(*self.contributors[:2])
+        self.users[1].delete()
+        self.assertMirrored([(project, self.users[0]) for project in self.projects[:2]])
+        self.projects[0].delete()
+        self.assertMirrored([(self.projects[1], self.users[0])])
@@ -0,0 +1,68 @@
+from projects.models import Project
+from projects.tests.base import APITestBase
+
+
+class KeysetPaginationTestCase(APITestBase):
+    """Pagination par curseur des listes (config.pagination.KeysetPagination)"""
+
+    def setUp(self):
+        super().setUp()
+        self.projects = [self.create_project(f'project {index}').pk for index in range(7)]
+        # Dates identiques pour une partie des projets : l'id départage
+        Project.objects.filter(pk__in=self.projects[1:5]).update(
+            created_time=Project.objects.get(pk=self.projects[1]).created_time
+        )
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        return body, [project['id'] for project in body['results']]
+
+    def test_round_trip(self):
+        """Les liens suivants parcourent toute la liste sans doublon malgré les dates égales"""
+        body, ids = self.get('/api/project/?cursor=&limit=2')
+        self.assertIsNone(body['previous'])
+        pages = [ids]
+        while body['next']:
+            body, ids = self.get(body['next'])
+            pages.append(ids)
+        self.assertEqual(pages, [self.projects[0:2], self.projects[2:4], self.projects[4:6], self.projects[6:]])
+
+    def test_previous_links(self):
+        """Les liens précédents remontent page par page jusqu'à la première, qui n'en a pas"""
+        body, ids = self.get('/api/project/?cursor=&limit=3')
+        body, ids = self.get(body['next'])
+        body, ids = self.get(body['next'])
+        self.assertEqual(ids, self.projects[6:])
+        self.assertIsNone(body['next'])
+        body, ids = self.get(body['previous'])
+        self.assertEqual(ids, self.projects[3:6])
+        self.assertIsNotNone(body['next'])
+        body, ids = self.get(body['previous'])
+        self.assertEqual(ids, self.projects[0:3])
+        self.assertIsNone(body['previous'])
+        body, ids = self.get(body['next'])
+        self.assertEqual(ids, self.projects[3:6])
+
+    def test_count(self):
+        """Le total n'est calculé en mode curseur que sur demande, et peut être omis en mode limit/offset"""
+        body, ids = self.get('/api/project/?cursor=&limit=2')
+        self.assertNotIn('count', body)
+        body, ids = self.get('/api/project/?cursor=&limit=2&count=true')
+        self.assertEqual(body['count'], 7)
+        self.assertIn('count=true', body['next'])
+        body, ids = self.get('/api/project/?limit=2&offset=6')
+        self.assertEqual((body['count'], ids), (7, self.projects[6:]))
+        body, ids = self.get('/api/project/?limit=2&offset=4&count=false')
+        self.assertNotIn('count', body)
+        self.assertEqual(ids, self.projects[4:6])
+        self.assertIsNotNone(body['next'])
+        body, ids = self.get('/api/project/?limit=2&offset=6&count=false')
+        self.assertIsNone(body['next'])
+
+    def test_invalid_cursor(self):
+        for cursor in ('invalid', 'eyJwIjpbIjEiXX0=', 'eyJwIjpbIngiLCIxIl19'):
+            response = self.client.get(f'/api/project/?cursor={cursor}')
+            self.assertEqual(response.status_code, 404, cursor)
+            self.assertEqual(response.json(), {'detail': 'Invalid cursor'})
@@ -0,0 +1,75 @@
+import tempfile
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import User
+from projects.tests.base import ASYNC_URLCONF, APITestBase, create_user
+
+
+@override_settings(REQUEST_PROFILING=True, REQUEST_PROFILING_MAX=3)
+class RequestProfilingTestCase(APITestBase):
+    """Profilage à la demande (config.profiling) : captures des admins seulement, rotation et routes de lecture"""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        profiling_dir = self.settings(REQUEST_PROFILING_DIR=self.directory)
+        profiling_dir.enable()
+        self.addCleanup(profiling_dir.disable)
+        self.staff = self.client_for(create_user('staff', is_staff=True))
+        self.author = self.client_for(self.user)
+
+    @staticmethod
+    def client_for(user):
+        """Client authentifié par jeton : le middleware identifie l'admin avant la vue"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+    def test_staff_capture(self):
+        response = self.staff.get('/api/project/', HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        capture_id = response['X-Profile-Id']
+        captures = self.staff.get('/api/profiles/').json()
+        self.assertEqual([(capture['id'], capture['route'], capture['action'], capture['status'])
+                          for capture in captures], [(capture_id, 'project-list', 'list', 200)])
+
+        response = self.staff.get(f'/api/profiles/{capture_id}/', {'sort': 'tottime', 'limit': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(0 < len(response.json()['hotspots']) <= 5)
+        response = self.staff.get(f'/api/profiles/{capture_id}/', {'download': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content))
+        self.assertEqual(self.staff.get(f'/api/profiles/{capture_id}/', {'sort': 'name'}).status_code, 400)
+        self.assertEqual(self.staff.get('/api/profiles/20000101T000000000000-unknown/').status_code, 404)
+
+    def test_non_staff_ignored(self):
+        response = self.author.get('/api/project/', {'profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(list(self.directory.glob('*')), [])
+        # Sans en-tête ni paramètre, les requêtes des admins ne sont pas profilées
+        self.assertNotIn('X-Profile-Id', self.staff.get('/api/project/'))
+        capture_id = self.staff.get('/api/project/', {'profile': '1'})['X-Profile-Id']
+        self.assertEqual(self.author.get('/api/profiles/').status_code, 403)
+        self.assertEqual(self.author.get(f'/api/profiles/{capture_id}/').status_code, 403)
+
+    def test_rotation(self):
+        capture_ids = [self.staff.get('/api/project/', {'profile': '1'})['X-Profile-Id'] for index in range(5)]
+        self.assertEqual([capture['id'] for capture in self.staff.get('/api/profiles/').json()],
+                         capture_ids[:-4:-1])
+        self.assertEqual(sorted(path.stem for path in self.directory.glob('*.prof')), capture_ids[-3:])
+
+    async def test_async_views(self):
+        """Sous ASGI, les lectures asynchrones des admins sont profilées avec la vue synchrone équivalente"""
+        token = await sync_to_async(AccessToken.for_user)(await User.objects.aget(username='staff'))
+        with self.settings(ROOT_URLCONF=ASYNC_URLCONF):
+            response = await AsyncClient().get('/api/project/?profile=1', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue((self.directory / f"{response['X-Profile-Id']}.prof").is_file())
@@ -0,0 +1,197 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from projects.models import Project, Comment
+from projects.tests.base import APITestBase, create_user
+
+
+class QueryBudgetTestCase(APITestBase):
+    """
+    Vérifie que le nombre de requêtes de chaque endpoint ne dépend pas du nombre d'objets affichés.
+    Chaque endpoint est appelé après un premier jeu de données, puis après l'avoir agrandi :
+    le nombre de requêtes doit rester identique. Le cache des listes est désactivé pour mesurer les requêtes.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+        self.issue = self.create_issue(self.project)
+
+    def seed(self, count):
+        """Ajoute `count` projets, issues, commentaires et contributeurs"""
+        start = Project.objects.count()
+        for index in range(start, start + count):
+            self.create_project(f'project {index}')
+            member = create_user(f'member {index}')
+            self.project.add_contributor(member)
+            self.create_issue(self.project)
+            author = create_user(f'commenter {index}')
+            Comment.objects.create(issue=self.issue, description='comment', author=author)
+
+    def count_queries(self, url):
+        """Nombre de requêtes d'un appel, cache d'appartenance chaud"""
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(context)
+
+    def assertConstantQueries(self, url):
+        self.seed(2)
+        before = self.count_queries(url)
+        self.seed(8)
+        self.assertEqual(self.count_queries(url), before)
+
+    def test_project_list(self):
+        self.assertConstantQueries('/api/project/')
+
+    def test_project_detail(self):
+        self.assertConstantQueries(f'/api/project/{self.project.pk}/')
+
+    def test_issue_list(self):
+        self.assertConstantQueries('/api/issue/')
+
+    def test_issue_detail(self):
+        self.assertConstantQueries(f'/api/issue/{self.issue.pk}/')
+
+    def test_comment_list(self):
+        self.assertConstantQueries('/api/comment/')
+
+    def test_comment_detail(self):
+        comment = Comment.objects.create(issue=self.issue, description='comment', author=self.user)
+        self.assertConstantQueries(f'/api/comment/{comment.pk}/')
+
+    def test_user_list(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.assertConstantQueries('/api/user/')
+
+    def test_sparse_detail(self):
+        """Les relations non demandées ne sont pas lues"""
+        full = self.count_queries(f'/api/project/{self.project.pk}/')
+        self.assertEqual(self.count_queries(f'/api/project/{self.project.pk}/?omit=contributors,issues'), full - 2)
+        full = self.count_queries(f'/api/issue/{self.issue.pk}/')
+        self.assertEqual(self.count_queries(f'/api/issue/{self.issue.pk}/?fields=id,name'), full - 1)
+
+    def test_includes(self):
+        """Chaque relation incluse coûte une requête, quel que soit le nombre d'objets"""
+        urls = {
+            f'/api/project/{self.project.pk}/': ('issues', 'contributors', 'author'),
+            '/api/project/': ('issues', 'contributors', 'author'),
+            f'/api/issue/{self.issue.pk}/': ('comments', 'project', 'contributor', 'author'),
+            '/api/issue/': ('comments', 'project', 'contributor', 'author'),
+            '/api/comment/': ('issue', 'author'),
+        }
+        for url, names in urls.items():
+            self.assertConstantQueries(f'{url}?include={",".join(names)}')
+            first = self.count_queries(f'{url}?include={names[0]}')
+            for count in range(2, len(names) + 1):
+                self.assertEqual(self.count_queries(f'{url}?include={",".join(names[:count])}'),
+                                 first + count - 1, f'{url} {names[:count]}')
+
+    def count_delete_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, 204, response.content)
+        return len(context)
+
+    def create_thread(self, project, comments):
+        issue = self.create_issue(project)
+        for index in range(comments):
+            Comment.objects.create(issue=issue, description='comment', author=create_user(f'{issue.pk} {index}'))
+        return issue
+
+    def test_project_delete(self):
+        """Les issues et commentaires supprimés en cascade ne coûtent pas de requête chacun"""
+        counts = []
+        for size in (1, 5):
+            project = self.create_project(f'deleted {size}')
+            for index in range(size):
+                self.create_thread(project, comments=size)
+            counts.append(self.count_delete_queries(f'/api/project/{project.pk}/'))
+        self.assertEqual(counts[1], counts[0])
+
+    def test_issue_delete(self):
+        counts = [self.count_delete_queries(f'/api/issue/{self.create_thread(self.project, size).pk}/')
+                  for size in (1, 10)]
+        self.assertEqual(counts[1], counts[0])
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.issue_count, self.project.comment_count), (1, 0))
+
+    def test_bounded_collections(self):
+        self.seed(2 * settings.EMBEDDED_COLLECTION_SIZE)
+        issues = self.client.get(f'/api/project/{self.project.pk}/').json()['issues']
+        self.assertEqual(issues['count'], self.project.issues.count())
+        self.assertEqual(len(issues['results']), settings.EMBEDDED_COLLECTION_SIZE)
+        self.assertEqual(self.client.get(issues['url']).json()['count'], issues['count'])
+        comments = self.client.get(f'/api/issue/{self.issue.pk}/').json()['comments']
+        self.assertEqual(comments['count'], self.issue.comments.count())
+        self.assertEqual(len(comments['results']), settings.EMBEDDED_COLLECTION_SIZE)
+        self.assertEqual(self.client.get(comments['url']).json()['count'], comments['count'])
+
+
+class QueryPlanTestCase(APITestBase):
+    """
+    Vérifie avec EXPLAIN QUERY PLAN (SQLite) que les lectures d'un contributeur (visibilité par Membership,
+    filtres des listes, pagination, état de l'ETag, unicité du nom d'un projet) passent toutes par un index :
+    aucune ne doit parcourir une table entière.
+    """
+    FULL_SCAN_RE = re.compile(r'^SCAN (TABLE )?(?P<table>\w+)( AS \w+)?$')
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN est propre à SQLite')
+        super().setUp()
+        self.project = self.create_project()
+        self.issue = self.create_issue(self.project)
+        self.comment = Comment.objects.create(issue=self.issue, description='comment', author=self.user)
+
+    def get_full_scans(self, method, url, data=None):
+        """Appelle l'URL et retourne les SELECT exécutés dont le plan parcourt une table entière"""
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 300, response.content)
+        full_scans = []
+        for query in context.captured_queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                plan = [row[-1] for row in cursor.fetchall()]
+            # Le parcours du résultat d'une sous-requête (prefetch fenêtré...) n'est pas celui d'une table
+            coroutines = {step.split(' ', 1)[1] for step in plan if step.startswith('CO-ROUTINE ')}
+            if any(match and match['table'] not in coroutines for match in map(self.FULL_SCAN_RE.match, plan)):
+                full_scans.append((query['sql'], plan))
+        return full_scans
+
+    def assertIndexedReads(self, url, method='get', data=None):
+        self.assertEqual(self.get_full_scans(method, url, data), [], f'{method.upper()} {url}')
+
+    def test_project_list(self):
+        for query in ('', '?type=iOS', '?name=project', '?cursor='):
+            self.assertIndexedReads(f'/api/project/{query}')
+
+    def test_project_detail(self):
+        self.assertIndexedReads(f'/api/project/{self.project.pk}/')
+
+    def test_project_create(self):
+        self.assertIndexedReads('/api/project/', 'post', {'name': 'other', 'type': 'iOS', 'description': ''})
+
+    def test_issue_list(self):
+        for query in ('', '?tag=BUG', '?priority=Low', '?name=issue', f'?project={self.project.pk}',
+                      f'?project={self.project.pk}&priority=Low&tag=BUG', '?cursor=',
+                      f'?project={self.project.pk}&cursor='):
+            self.assertIndexedReads(f'/api/issue/{query}')
+
+    def test_issue_detail(self):
+        self.assertIndexedReads(f'/api/issue/{self.issue.pk}/')
+
+    def test_comment_list(self):
+        for query in ('', '?cursor=', f'?issue={self.issue.pk}', f'?issue={self.issue.pk}&cursor='):
+            self.assertIndexedReads(f'/api/comment/{query}')
+
+    def test_comment_detail(self):
+        self.assertIndexedReads(f'/api/comment/{self.comment.pk}/')
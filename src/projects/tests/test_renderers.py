@@ -0,0 +1,47 @@
+import json
+from unittest import skipUnless
+
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from config.renderers import msgpack
+from projects.models import Comment
+from projects.tests.base import APITestBase
+
+
+class RendererTestCase(APITestBase):
+    """JSON rendu par orjson identique à celui de DRF, réponses et corps de requête MessagePack"""
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project('projet', description='café \u2028')
+        self.issue = self.create_issue(self.project)
+        Comment.objects.create(issue=self.issue, description='commentaire', author=self.user)
+
+    def test_fast_json(self):
+        for route in ('project', 'issue', 'comment'):
+            response = self.client.get(f'/api/{route}/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, JSONRenderer().render(response.data), route)
+
+    @skipUnless(msgpack, 'msgpack is not installed')
+    @override_settings(RESPONSE_CACHE_TIMEOUT=60)
+    def test_msgpack(self):
+        json_response = self.client.get('/api/issue/')
+        response = self.client.get('/api/issue/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), json.loads(json_response.content))
+        # Une représentation par format : les ETags diffèrent et le cache ne mélange pas les formats
+        self.assertNotEqual(response['ETag'], json_response['ETag'])
+        self.assertIn('Accept', response['Vary'])
+        response = self.client.get('/api/issue/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual((response['X-Cache'], response['Content-Type']), ('HIT', 'application/msgpack'))
+
+        items = [{'issue': self.issue.pk, 'description': f'lot {index}'} for index in range(3)]
+        response = self.client.post('/api/comment/bulk/', msgpack.packb(items), content_type='application/msgpack',
+                                    HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Comment.objects.filter(description__startswith='lot').count(), 3)
+        response = self.client.post('/api/comment/', b'\xc1', content_type='application/msgpack')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,60 @@
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from authentication.models import User
+from config import db_routers
+from projects.models import Project, Issue, Contributor, Membership
+from projects.tests.base import APITestBase, create_user
+
+
+@override_settings(REPLICA_DATABASE_ALIAS='test_replica')
+class ReplicaRoutingTestCase(APITestBase):
+    """
+    Lectures sur une réplique distincte de la base principale (config.db_routers, ReplicaReadMixin).
+    La réplique est remplie par recopie des tables puis laissée en retard d'une modification.
+    """
+    databases = {'default', 'test_replica'}
+    replica = 'test_replica'
+
+    def setUp(self):
+        super().setUp()
+        self.member = create_user('member')
+        self.project = self.create_project()
+        self.project.add_contributor(self.member)
+        self.issue = self.create_issue(self.project)
+        for model in (User, Contributor, Project, Project.contributors.through, Membership, Issue):
+            model.objects.using(self.replica).bulk_create(model.objects.all())
+        Project.objects.using(self.replica).update(name='replica')
+        Issue.objects.using(self.replica).update(name='replica')
+        self.member_client = APIClient()
+        self.member_client.force_authenticate(self.member)
+        self.detail_url = f'/api/project/{self.project.pk}/'
+
+    def names(self, client):
+        """Noms du projet et de l'issue lus dans les listes et le détail"""
+        return (client.get('/api/project/').json()['results'][0]['name'], client.get(self.detail_url).json()['name'],
+                client.get('/api/issue/').json()['results'][0]['name'])
+
+    def test_read_routing(self):
+        self.assertEqual(self.names(self.client), ('replica', 'replica', 'replica'))
+        # Les autres actions lisent la base principale
+        response = self.client.get(f'/api/project/{self.project.pk}/export/')
+        self.assertIn(b'"project"', b''.join(response.streaming_content))
+
+    def test_write_routing_and_sticky_reads(self):
+        response = self.client.patch(self.detail_url, {'description': 'modifiée'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(Project.objects.using('default').get().description, 'modifiée')
+        self.assertEqual(Project.objects.using(self.replica).get().description, '')
+        # L'auteur de l'écriture relit la base principale pendant REPLICA_STICKY_SECONDS, les autres la réplique
+        self.assertEqual(self.names(self.client), ('project', 'project', 'issue'))
+        self.assertEqual(self.names(self.member_client), ('replica', 'replica', 'replica'))
+        db_routers.get_cache().delete(db_routers.STICKY_KEY.format(self.user.pk))
+        self.assertEqual(self.names(self.client), ('replica', 'replica', 'replica'))
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=60, REPLICA_RESPONSE_CACHE_TIMEOUT=0)
+    def test_response_cache(self):
+        """Les listes lues sur la réplique ne sont gardées en cache que REPLICA_RESPONSE_CACHE_TIMEOUT secondes"""
+        self.assertEqual([self.member_client.get('/api/project/')['X-Cache'] for _ in range(2)], ['MISS', 'MISS'])
+        db_routers.stick_to_primary(self.member)
+        self.assertEqual([self.member_client.get('/api/project/')['X-Cache'] for _ in range(2)], ['MISS', 'HIT'])
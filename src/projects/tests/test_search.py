@@ -0,0 +1,82 @@
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from projects.models import Comment
+from projects.tests.base import APITestBase, create_user
+
+
+class SearchTestCase(APITestBase):
+    """Recherche plein texte des listes (?search=, projects.search)"""
+
+    def setUp(self):
+        super().setUp()
+        self.outsider = create_user('outsider')
+        self.project = self.create_project('Application mobile', description='Refonte du paiement en ligne')
+        self.hidden = self.create_project('Application web', author=self.outsider, description='Paiement par carte')
+
+    def search(self, query, basename='project'):
+        response = self.client.get(f'/api/{basename}/', {'search': query})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def found(self, query, basename='project'):
+        return [result['id'] for result in self.search(query, basename)['results']]
+
+    def test_matching(self):
+        """Tous les mots sont requis, le dernier en préfixe ; les opérateurs FTS5 sont ignorés"""
+        self.assertEqual(self.found('paiement'), [self.project.pk])
+        self.assertEqual(self.found('refonte paie'), [self.project.pk])
+        self.assertEqual(self.found('refonte carte'), [])
+        self.assertEqual(self.found('paiement OR carte'), [])
+        self.assertEqual(self.found('"*'), [])
+
+    def test_ranking(self):
+        """Le titre pèse plus que le texte dans le tri par pertinence"""
+        titled = self.create_project('Paiement')
+        self.assertEqual(self.found('paiement'), [titled.pk, self.project.pk])
+
+    def test_visibility(self):
+        """Seuls les objets visibles par l'utilisateur sont trouvés"""
+        self.assertEqual(self.found('application'), [self.project.pk])
+        client = APIClient()
+        client.force_authenticate(self.outsider)
+        response = client.get('/api/project/', {'search': 'application'})
+        self.assertEqual([result['id'] for result in response.json()['results']], [self.hidden.pk])
+
+    def test_snippets(self):
+        """Chaque objet trouvé reçoit un extrait où les mots cherchés sont marqués"""
+        issue = self.create_issue(self.project, name='Bouton', description='Le bouton de paiement ne répond pas')
+        [result] = self.search('paiement', 'issue')['results']
+        self.assertEqual(result['id'], issue.pk)
+        self.assertEqual(result['search_snippet'], 'Le bouton de <mark>paiement</mark> ne répond pas')
+        self.assertNotIn('search_snippet', self.client.get(f'/api/issue/{issue.pk}/').json())
+
+    def test_trigger_upkeep(self):
+        """Les triggers tiennent l'index à jour à la création, la modification et la suppression"""
+        self.project.description = 'Nouvelle messagerie'
+        self.project.save()
+        self.assertEqual(self.found('paiement'), [])
+        self.assertEqual(self.found('messagerie'), [self.project.pk])
+        issue = self.create_issue(self.project, name='Notifications')
+        comment = Comment.objects.create(issue=issue, description='Notifications en double', author=self.user)
+        self.assertEqual(self.found('notif', 'issue'), [issue.pk])
+        self.assertEqual(self.found('double', 'comment'), [str(comment.pk)])
+        issue.delete()
+        self.assertEqual(self.found('notif', 'issue'), [])
+        self.assertEqual(self.found('double', 'comment'), [])
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM projects_search WHERE projects_search MATCH 'notifications'")
+            self.assertEqual(cursor.fetchone(), (0,))
+
+    @override_settings(SEARCH_MAX_RESULTS=2)
+    def test_max_results(self):
+        """Au-delà de SEARCH_MAX_RESULTS, les résultats sont tronqués et la réponse l'indique"""
+        for index in range(2):
+            self.create_project(f'Application {index}')
+        body = self.search('application')
+        self.assertEqual(len(body['results']), 2)
+        self.assertIs(body['search_truncated'], True)
+        body = self.search('refonte')
+        self.assertEqual(len(body['results']), 1)
+        self.assertNotIn('search_truncated', body)
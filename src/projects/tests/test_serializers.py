@@ -0,0 +1,60 @@
+from django.core.exceptions import ImproperlyConfigured
+
+from projects.models import Project, Issue, Comment
+from projects.serializers import RowSerializer
+from projects.tests.base import APITestBase
+
+
+class RowSerializerTestCase(APITestBase):
+    """Les listes en lignes (LIST_ROW_SERIALIZERS) produisent le même JSON que les sérialiseurs de modèle"""
+
+    def setUp(self):
+        super().setUp()
+        for index in range(3):
+            project = self.create_project(f'projet {index}', description='café')
+            issue = self.create_issue(project, name=f'issue {index}')
+            Comment.objects.create(issue=issue, description=f'commentaire {index}', author=self.user)
+
+    def assertSameContent(self, url):
+        responses = []
+        for rows in (False, True):
+            with self.settings(LIST_ROW_SERIALIZERS=rows):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            responses.append(response.content)
+        self.assertEqual(responses[1], responses[0], url)
+
+    def test_lists(self):
+        for route in ('project', 'issue', 'comment'):
+            for query in ('', '?limit=2&offset=1', '?cursor=&limit=2', '?search=commentaire', '?search=projet',
+                          '?search=issue', '?count=false'):
+                self.assertSameContent(f'/api/{route}/{query}')
+        self.assertSameContent('/api/issue/?priority=Low&tag=BUG')
+
+    def test_sparse_lists(self):
+        for url in ('/api/project/?fields=name,type', '/api/issue/?fields=id,url&search=issue',
+                    '/api/issue/?omit=project,url', '/api/comment/?fields=author,issue', '/api/comment/?omit=author'):
+            self.assertSameContent(url)
+        results = self.client.get('/api/comment/?fields=author,issue').json()['results']
+        self.assertEqual(set(results[0]), {'author', 'issue'})
+        response = self.client.get('/api/comment/?omit=unknown')
+        self.assertEqual(response.status_code, 400)
+
+    def test_includes(self):
+        response = self.client.get('/api/issue/?include=project,author,comments')
+        self.assertEqual(response.status_code, 200)
+        included = response.json()['included']
+        self.assertEqual([project['id'] for project in included['project']],
+                         list(Project.objects.order_by('created_time').values_list('id', flat=True)))
+        self.assertEqual(included['author'], [{'id': self.user.pk, 'username': 'author'}])
+        self.assertEqual(len(included['comments']), Comment.objects.count())
+        response = self.client.get(f'/api/issue/{Issue.objects.first().pk}/?include=project')
+        self.assertEqual(response.json()['included']['project'][0]['name'], 'projet 0')
+        self.assertEqual(self.client.get('/api/comment/?include=project').status_code, 400)
+
+    def test_required_definitions(self):
+        """Un sérialiseur en lignes sans colonnes ou sans to_representation est refusé dès sa définition"""
+        with self.assertRaisesMessage(ImproperlyConfigured, 'must define to_representation'):
+            type('IncompleteRowSerializer', (RowSerializer,), {'columns': ('id',)})
+        with self.assertRaisesMessage(ImproperlyConfigured, 'must define columns'):
+            type('IncompleteRowSerializer', (RowSerializer,), {'to_representation': lambda self, row: {}})
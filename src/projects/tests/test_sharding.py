@@ -0,0 +1,142 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import override_settings
+
+from authentication.models import User
+from config import sharding
+from projects import cache as membership_cache
+from projects.models import Project, Issue, Comment, Membership
+from projects.tests.base import APITransactionTestBase, create_user
+
+
+@override_settings(SHARD_DATABASES=['default', 'test_shard'])
+class ShardingTestCase(APITransactionTestBase):
+    """
+    Projets répartis sur deux shards (config.sharding) : placement des objets, listes fusionnées
+    et écritures sur le shard de chaque objet.
+    """
+    databases = '__all__'
+    shards = ['default', 'test_shard']
+
+    def create_projects(self, count):
+        """Crée `count` projets par l'API et les retourne, lus sur leur shard"""
+        projects = []
+        for index in range(count):
+            response = self.client.post('/api/project/', {'name': f'project {index}', 'type': 'iOS'}, format='json')
+            self.assertEqual(response.status_code, 201, response.content)
+            project_id = response.json()['id']
+            projects.append(Project.objects.using(sharding.shard_for_id(project_id)).get(pk=project_id))
+        return projects
+
+    def post_issue(self, project):
+        response = self.client.post('/api/issue/', {
+            'project': project.pk, 'name': 'issue', 'priority': 'Low', 'tag': 'BUG', 'status': 'To Do',
+            'contributor': project.contributors.get().pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['id']
+
+    def post_comment(self, issue_id):
+        response = self.client.post('/api/comment/', {'issue': issue_id, 'description': 'comment'}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['id']
+
+    def test_placement(self):
+        """Chaque projet est placé sur le shard de son id, avec ses appartenances, issues et commentaires"""
+        self.assertTrue(User.objects.using('test_shard').filter(pk=self.user.pk).exists())
+        projects = self.create_projects(4)
+        self.assertEqual({project._state.db for project in projects}, set(self.shards))
+        for project in projects:
+            shard = project._state.db
+            self.assertEqual(sharding.shard_for_id(project.pk), shard)
+            self.assertTrue(Membership.objects.using(shard).filter(project=project, user=self.user).exists())
+            issue_id = self.post_issue(project)
+            self.assertEqual(sharding.shard_for_id(issue_id), shard)
+            self.assertEqual(Issue.objects.using(shard).get(pk=issue_id).project_id, project.pk)
+            self.assertTrue(Comment.objects.using(shard).filter(pk=self.post_comment(issue_id)).exists())
+            project.refresh_from_db()
+            self.assertEqual((project.issue_count, project.comment_count), (1, 1))
+            other = next(alias for alias in self.shards if alias != shard)
+            self.assertFalse(Project.objects.using(other).filter(pk=project.pk).exists())
+        # L'unicité des noms vaut pour tous les shards
+        response = self.client.post('/api/project/', {'name': 'project 1', 'type': 'iOS'}, format='json')
+        self.assertEqual(response.status_code, 400, response.content)
+
+    def test_allocate_ids(self):
+        """Les ids sont uniques sur tous les shards ; ceux alloués pour un shard y sont retrouvés"""
+        project_ids = sharding.allocate_ids(Project, 4)
+        self.assertEqual(project_ids, list(range(project_ids[0], project_ids[0] + 4)))
+        self.assertEqual(sharding.allocate_ids(Project), [project_ids[-1] + 1])
+        for shard in self.shards:
+            issue_ids = sharding.allocate_ids(Issue, 3, shard=shard)
+            self.assertEqual(len(set(issue_ids)), 3)
+            self.assertEqual({sharding.shard_for_id(issue_id) for issue_id in issue_ids}, {shard})
+            self.assertFalse(set(issue_ids) & set(sharding.allocate_ids(Issue, 3, shard=shard)))
+
+    async def test_async_memberships(self):
+        """Les appartenances lues par les vues asynchrones couvrent tous les shards"""
+        projects = await sync_to_async(self.create_projects)(4)
+        cache.clear()
+        self.assertEqual(await membership_cache.aget_user_project_ids(self.user.pk),
+                         {project.pk for project in projects})
+
+    def test_offset_pages(self):
+        """Les pages limit/offset fusionnent les projets des deux shards dans l'ordre de la liste"""
+        ids = [project.pk for project in self.create_projects(5)]
+        seen = []
+        for offset in (0, 2, 4):
+            body = self.client.get(f'/api/project/?limit=2&offset={offset}').json()
+            self.assertEqual(body['count'], 5)
+            seen += [project['id'] for project in body['results']]
+        self.assertEqual(seen, ids)
+        body = self.client.get('/api/project/?limit=2&offset=2&count=false').json()
+        self.assertNotIn('count', body)
+        self.assertEqual([project['id'] for project in body['results']], ids[2:4])
+        self.assertIsNotNone(body['next'])
+
+    def test_cursor_pages(self):
+        """Les pages par curseur parcourent les deux shards sans doublon, dans les deux sens"""
+        ids = [project.pk for project in self.create_projects(5)]
+        body = self.client.get('/api/project/?cursor=&limit=2&count=true').json()
+        self.assertEqual(body['count'], 5)
+        pages = [[project['id'] for project in body['results']]]
+        while body['next']:
+            body = self.client.get(body['next']).json()
+            pages.append([project['id'] for project in body['results']])
+        self.assertEqual(pages, [ids[0:2], ids[2:4], ids[4:]])
+        body = self.client.get(body['previous']).json()
+        self.assertEqual([project['id'] for project in body['results']], ids[2:4])
+
+    def test_comment_lookup(self):
+        """Un commentaire désigné par son uuid est lu et modifié sur le shard de son issue"""
+        for project in self.create_projects(2):
+            issue_id = self.post_issue(project)
+            comment_id = self.post_comment(issue_id)
+            response = self.client.get(f'/api/comment/{comment_id}/')
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(response.json()['issue'], issue_id)
+            response = self.client.patch(f'/api/comment/{comment_id}/', {'description': 'edited'}, format='json')
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(Comment.objects.using(project._state.db).get(pk=comment_id).description, 'edited')
+        self.assertEqual(self.client.get('/api/comment/00000000-0000-0000-0000-000000000000/').status_code, 404)
+
+    def test_bulk_update(self):
+        """Le triage en lot modifie chaque shard ; un refus sur l'un annule les modifications de l'autre"""
+        projects = sorted(self.create_projects(2), key=lambda project: self.shards.index(project._state.db))
+        ids = [self.post_issue(project) for project in projects]
+        response = self.client.patch('/api/issue/bulk_update/', {'ids': ids, 'priority': 'High'}, format='json')
+        self.assertEqual(response.json(), {'updated': 2})
+        for project, issue_id in zip(projects, ids):
+            self.assertEqual(Issue.objects.using(project._state.db).get(pk=issue_id).priority, 'High')
+
+        # Une issue d'un autre auteur sur le second shard, traité alors que la transaction du premier est ouverte
+        last = projects[-1]
+        other = Issue.objects.using(last._state.db).create(
+            project=last, name='issue', priority='Low', tag='BUG', contributor=last.contributors.get(),
+            author=create_user('member'),
+        )
+        response = self.client.patch('/api/issue/bulk_update/', {'ids': [*ids, other.pk], 'tag': 'Task'},
+                                     format='json')
+        self.assertEqual(response.status_code, 403, response.content)
+        for project, issue_id in zip(projects, ids):
+            self.assertEqual(Issue.objects.using(project._state.db).get(pk=issue_id).tag, 'BUG')
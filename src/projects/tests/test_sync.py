@@ -0,0 +1,76 @@
+import json
+
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from projects.models import Project, Issue, Comment
+from projects.tests.base import APITestBase, create_user
+
+
+@override_settings(SYNC_BATCH_SIZE=2)
+class SyncTestCase(APITestBase):
+    """Synchronisation incrémentale (route sync) : seuls les changements visibles depuis le jeton sont envoyés"""
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project('projet')
+        self.issue = self.create_issue(self.project)
+        self.comments = [
+            Comment.objects.create(issue=self.issue, description=f'commentaire {index}', author=self.user)
+            for index in range(3)
+        ]
+        self.other = create_user('other')
+        self.other_project = self.create_project('autre', author=self.other)
+
+    def sync(self, token=None, client=None):
+        """Lignes de la synchronisation (sans la dernière) et jeton suivant, None si rien n'a changé"""
+        response = (client or self.client).get('/api/sync/', {'since': token} if token else {})
+        if response.status_code == 204:
+            return None, token
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(lines[-1]['record'], 'sync')
+        return [(line['record'], line.get('kind'), line['id']) for line in lines[:-1]], lines[-1]['token']
+
+    def test_full_and_delta(self):
+        records, token = self.sync()
+        self.assertEqual(sorted(records, key=str), sorted([
+            ('project', None, self.project.pk), ('issue', None, self.issue.pk),
+            *[('comment', None, str(comment.pk)) for comment in self.comments],
+        ], key=str))
+        self.assertEqual(self.sync(token), (None, token))
+
+        # Modifications d'un autre projet : nouveau jeton mais aucune ligne
+        Project.objects.filter(pk=self.other_project.pk).update(description='modifié')
+        records, token = self.sync(token)
+        self.assertEqual(records, [])
+
+        Issue.objects.filter(pk=self.issue.pk).update(priority='High')
+        self.client.delete(f'/api/comment/{self.comments[0].pk}/')
+        records, token = self.sync(token)
+        self.assertEqual(sorted(records, key=str), sorted([
+            ('deleted', 'comment', str(self.comments[0].pk)), ('issue', None, self.issue.pk),
+            # Le compteur de commentaires du projet a changé
+            ('project', None, self.project.pk),
+        ], key=str))
+        self.assertEqual(self.sync(token), (None, token))
+
+    def test_membership(self):
+        client = APIClient()
+        client.force_authenticate(self.other)
+        records, token = self.sync(client=client)
+        self.assertEqual(records, [('project', None, self.other_project.pk)])
+
+        # Un projet rejoint est envoyé en entier, un projet supprimé par une tombstone
+        self.project.add_contributor(self.other)
+        records, token = self.sync(token, client)
+        self.assertEqual({record for record, kind, object_id in records}, {'project', 'issue', 'comment'})
+        self.assertEqual(len(records), 5)
+        project_id = self.project.pk
+        self.project.delete()
+        records, token = self.sync(token, client)
+        self.assertEqual(records, [('deleted', 'project', project_id)])
+
+    def test_invalid_token(self):
+        for token in ('garbage', 'WzEsMl0=', 'WyJhIl0='):
+            self.assertEqual(self.client.get('/api/sync/', {'since': token}).status_code, 400)
@@ -0,0 +1,24 @@
+from django.db.models import F
+from django.utils import timezone
+
+from projects.models import Project, Issue
+
+
+def bump():
+    """Champs d'un UPDATE signalant une modification : version incrémentée et date de mise à jour"""
+    return {'version': F('version') + 1, 'updated_time': timezone.now()}
+
+
+def touch(queryset):
+    """Marque comme modifiés les objets du queryset"""
+    return queryset.update(**bump())
+
+
+def touch_project(project_id):
+    touch(Project.objects.filter(pk=project_id))
+
+
+def touch_issue(issue_id):
+    """Marque comme modifiées l'issue et son projet (un commentaire a changé)"""
+    touch(Issue.objects.filter(pk=issue_id))
+    touch(Project.objects.filter(issues=issue_id))
@@ -1,24 +1,46 @@
-from django.db.models import Q
-from rest_framework import status
+from django.core.exceptions import ValidationError
+from django.db.models import Q, Prefetch
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext as _
+from rest_framework import exceptions, status
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ReadOnlyModelViewSet, ModelViewSet
 
 from authentication.models import User
 from authentication.serializers import UserSerializer
 from authentication.permissions import UserPermission
-from projects.models import Project, Issue, Comment
+from config import sharding, transactions
+from config.instrumentation import InstrumentedViewMixin
+from projects import cache, counters, export, response_cache, sync, versions
+from projects.mixins import BulkCreateMixin, ConditionalGetMixin, FieldSelectionMixin, IncludeMixin, \
+    ReplicaReadMixin, ResponseCacheMixin, RowListMixin, ShardMixin, WriteRetryMixin
+from projects.models import Project, Issue, Comment, Contributor, Membership
 from projects.permissions import IsProjectContributor, CanEditObject
 from projects.serializers import ProjectListSerializer, ProjectDetailSerializer, IssueListSerializer, \
-    IssueDetailSerializer, CommentSerializer
+    IssueDetailSerializer, CommentSerializer, IssueBulkSerializer, CommentBulkSerializer, IssueBulkUpdateSerializer, \
+    ProjectListRowSerializer, IssueListRowSerializer, CommentRowSerializer, ContributorSerializer, \
+    UserSummarySerializer, bounded_prefetch
 
 
-class ProjectViewSet(ModelViewSet):
+class ProjectViewSet(ShardMixin, FieldSelectionMixin, IncludeMixin, RowListMixin, ReplicaReadMixin, ResponseCacheMixin,
+                     ConditionalGetMixin, WriteRetryMixin, InstrumentedViewMixin, ModelViewSet):
 
     permission_classes = [IsAuthenticated, CanEditObject]
     filterset_fields = ('type', 'name')
+    search_kind = 'project'
+    search_fields = ('name', 'description')
+    row_serializer_class = ProjectListRowSerializer
+    # Documents composés (?include=) : relation, objets chargés et sérialiseur (voir IncludeMixin)
+    includes = {
+        'issues': ('issues', Issue.objects.order_by('created_time', 'id'), IssueListSerializer),
+        'contributors': ('contributors', Contributor.objects.select_related('user').order_by('id'),
+                         ContributorSerializer),
+        'author': ('author', User.objects.only('id', 'username'), UserSummarySerializer),
+    }
 
     def get_queryset(self):
         """
@@ -28,8 +50,21 @@ class ProjectViewSet(ModelViewSet):
             projects = Project.objects.all()
         else:
             user = self.request.user
-            projects = Project.objects.filter(Q(author=user) | Q(contributors__user=user)).distinct()
-        return projects.prefetch_related('contributors__user', 'author', 'issues')
+            member_of = Membership.objects.filter(user=user).values('project_id')
+            projects = Project.objects.filter(Q(author=user) | Q(id__in=member_of))
+        if self.action in ('list', 'export'):
+            # ProjectListSerializer n'affiche aucune relation, l'export lit ses propres lignes
+            return projects
+        # Seules les relations des champs demandés sont chargées ; les issues sont bornées
+        if self.wants_field('author'):
+            projects = projects.select_related('author')
+        if self.wants_field('contributors'):
+            projects = projects.prefetch_related(
+                Prefetch('contributors', queryset=Contributor.objects.select_related('user')),
+            )
+        if self.wants_field('issues'):
+            projects = projects.prefetch_related(bounded_prefetch('issues', Issue.objects.only('id', 'project_id')))
+        return projects
 
     def get_serializer_class(self):
         """Retourne le serializer en fonction de l'action"""
@@ -39,7 +74,10 @@ class ProjectViewSet(ModelViewSet):
 
     def perform_create(self, serializer):
         """Permet d'ajouter le user connecté comme auteur lors de la création"""
-        serializer.save(author=self.request.user)
+        # Avec plusieurs shards, l'id du projet choisit celui où sont aussi créés ses contributeurs
+        project_id = sharding.allocate_ids(Project)[0] if sharding.is_sharded() else None
+        with sharding.use_shard(sharding.shard_for_id(project_id)):
+            serializer.save(author=self.request.user, id=project_id)
 
     @action(methods=['post'], detail=True)
     def add_contributor(self, request, pk=None):
@@ -49,21 +87,206 @@ class ProjectViewSet(ModelViewSet):
 
         if username:
             user = get_object_or_404(User, username=username)
-            project.add_contributor(user)
-            serializer = self.get_serializer(project)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            transactions.run_atomic(project.add_contributor, user, using=project._state.db)
+            # Recharge le projet pour que les contributeurs préchargés incluent le nouveau
+            serializer = self.get_serializer(self.get_object())
+            return Response(self.serializer_data(serializer), status=status.HTTP_200_OK)
         else:
             return Response({'error': 'Username is required'}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=['get'], detail=True)
+    def export(self, request, pk=None):
+        """
+        Route d'export complet du projet (projet, issues puis commentaires), en NDJSON par défaut
+        ou en CSV avec `?output=csv`. La réponse est produite au fil de la lecture, en mémoire constante.
+        """
+        output = request.query_params.get('output', 'ndjson')
+        if output not in export.CONTENT_TYPES:
+            return Response({'error': 'Output must be one of: ndjson, csv'}, status=status.HTTP_400_BAD_REQUEST)
+        project = self.get_object()
+        response = StreamingHttpResponse(
+            export.stream_export(project.pk, output, using=project._state.db),
+            content_type=export.CONTENT_TYPES[output],
+        )
+        response['Content-Disposition'] = f'attachment; filename="project-{project.pk}.{output}"'
+        return response
+
 
-class IssueViewSet(ModelViewSet):
+class IssueViewSet(ShardMixin, FieldSelectionMixin, IncludeMixin, RowListMixin, ReplicaReadMixin, ResponseCacheMixin,
+                   ConditionalGetMixin, BulkCreateMixin, WriteRetryMixin, InstrumentedViewMixin, ModelViewSet):
     permission_classes = [IsAuthenticated, IsProjectContributor, CanEditObject]
     filterset_fields = ('tag', 'name', 'priority', 'project')
+    search_kind = 'issue'
+    search_fields = ('name', 'description')
+    bulk_serializer_class = IssueBulkSerializer
+    bulk_response_serializer_class = IssueListSerializer
+    bulk_shard_field = 'project'
+    row_serializer_class = IssueListRowSerializer
+    includes = {
+        'comments': ('comments', Comment.objects.select_related('author').order_by('created_time', 'id'),
+                     CommentSerializer),
+        'project': ('project', Project.objects.all(), ProjectListSerializer),
+        'contributor': ('contributor', Contributor.objects.select_related('user'), ContributorSerializer),
+        'author': ('author', User.objects.only('id', 'username'), UserSummarySerializer),
+    }
 
     def perform_create(self, serializer):
         """Permet d'ajouter le user connecté comme auteur lors de la création"""
         serializer.save(author=self.request.user)
 
+    def get_request_shard(self, request):
+        """Shard de l'issue de l'URL, sinon du projet désigné par le corps (création) ou par le filtre `project`"""
+        shard = super().get_request_shard(request)
+        if shard is None and self.action == 'create' and isinstance(request.data, dict):
+            shard = sharding.shard_for_id(request.data.get('project'))
+        if shard is None and self.action == 'list':
+            shard = sharding.shard_for_id(request.query_params.get('project'))
+        return shard
+
+    def build_bulk_instances(self, valid):
+        """
+        Résout projets et contributeurs pour tout le lot : appartenance de l'auteur via le cache,
+        puis une requête par type de désignation du contributeur et une pour les appartenances.
+        """
+        user = self.request.user
+        member_of = cache.get_user_project_ids(user.id)
+        designations = [data.get('contributor') for index, data in valid]
+        user_ids_by_username = dict(
+            User.objects.filter(username__in={value for value in designations if isinstance(value, str)})
+            .values_list('username', 'id')
+        )
+        user_ids_by_contributor = dict(
+            Contributor.objects.filter(id__in={value for value in designations if isinstance(value, int)})
+            .values_list('id', 'user_id')
+        )
+        members = set(
+            Membership.objects.filter(project_id__in={data['project'] for index, data in valid})
+            .values_list('project_id', 'user_id')
+        )
+
+        resolved = []
+        for index, data in valid:
+            designation = data.pop('contributor', None)
+            if data['project'] not in member_of:
+                yield index, {'project': [_('You are not a contributor of this project.')]}
+                continue
+            if designation is None:
+                contributor_user_id = user.id
+            elif isinstance(designation, str):
+                contributor_user_id = user_ids_by_username.get(designation)
+                if contributor_user_id is None:
+                    yield index, {'contributor': [_('Contributor does not exist with this username')]}
+                    continue
+            else:
+                contributor_user_id = user_ids_by_contributor.get(designation)
+                if contributor_user_id is None:
+                    yield index, {'contributor': [_('Contributor does not exist')]}
+                    continue
+            if (data['project'], contributor_user_id) not in members:
+                yield index, {'non_field_errors': [_('This contributor is not contributing to this project.')]}
+                continue
+            resolved.append((index, data, contributor_user_id))
+
+        needed = {contributor_user_id for index, data, contributor_user_id in resolved}
+        contributors = dict(Contributor.objects.filter(user_id__in=needed).values_list('user_id', 'id'))
+        missing = needed - contributors.keys()
+        if missing:
+            Contributor.objects.bulk_create([Contributor(user_id=user_id) for user_id in missing])
+            contributors.update(Contributor.objects.filter(user_id__in=missing).values_list('user_id', 'id'))
+
+        for index, data, contributor_user_id in resolved:
+            project_id = data.pop('project')
+            yield index, Issue(
+                project_id=project_id, contributor_id=contributors[contributor_user_id], author=user, **data
+            )
+
+    @action(methods=['patch'], detail=False)
+    def bulk_update(self, request):
+        """
+        Route de triage en lot : modifie priorité, tag ou contributeur des issues sélectionnées
+        par les filtres de la liste (`filterset_fields`) et/ou par une liste d'ids.
+        Les droits de CanEditObject sont vérifiés sur tout l'ensemble, puis une requête UPDATE
+        est exécutée par projet, dans la même transaction. Avec plusieurs shards, voir update_shards.
+        """
+        serializer = IssueBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if 'ids' not in data and not any(field in request.query_params for field in self.filterset_fields):
+            return Response({'error': 'A filter or a list of ids is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        updated, touched = self.update_shards(request, data, self.get_bulk_update_shards(request, data))
+        for shard, project_ids in touched.items():
+            with sharding.use_shard(shard):
+                response_cache.invalidate_projects(project_ids, response_cache.ISSUE_LISTS)
+        return Response({'updated': updated}, status=status.HTTP_200_OK)
+
+    def update_shards(self, request, data, shards):
+        """
+        Trie les issues du premier shard dans sa transaction, qui reste ouverte pendant le traitement des shards
+        suivants : un refus sur l'un d'eux annule les modifications de tous.
+        Retourne le nombre d'issues modifiées et les ids de leurs projets par shard.
+        """
+        shard, *others = shards
+        with sharding.use_shard(shard):
+            return transactions.run_atomic(self.update_shard, request, data, shard, others, using=shard)
+
+    def update_shard(self, request, data, shard, others):
+        issues = self.filter_queryset(self.get_queryset())
+        if 'ids' in data:
+            issues = issues.filter(id__in=data['ids'])
+
+        if not request.user.is_staff and issues.exclude(author=request.user).exists():
+            raise exceptions.PermissionDenied(_('You can only edit your own issues.'))
+
+        changes = {field: data[field] for field in ('priority', 'tag') if field in data}
+        contributor = data.get('contributor')
+        project_ids = list(issues.values_list('project_id', flat=True).distinct())
+        if contributor:
+            if sharding.is_sharded():
+                # Chaque shard a ses propres contributeurs
+                contributor = Contributor.objects.get_or_create(user_id=contributor.user_id)[0]
+            changes['contributor'] = contributor
+            members_of = set(
+                Membership.objects.filter(project_id__in=project_ids, user_id=contributor.user_id)
+                .values_list('project_id', flat=True)
+            )
+            if members_of != set(project_ids):
+                raise exceptions.ValidationError(
+                    {'contributor': [_('This contributor is not contributing to this project.')]}
+                )
+
+        updated = self.update_issues(issues, changes, project_ids)
+        if not others:
+            return updated, {shard: project_ids}
+        others_updated, touched = self.update_shards(request, data, others)
+        return updated + others_updated, {shard: project_ids, **touched}
+
+    @staticmethod
+    def update_issues(issues, changes, project_ids):
+        """Une requête UPDATE par projet, qui change aussi la version du projet"""
+        updated = 0
+        for project_id in project_ids:
+            updated += issues.filter(project_id=project_id).update(**changes, **versions.bump())
+            versions.touch_project(project_id)
+        return updated
+
+    def get_bulk_update_shards(self, request, data):
+        """Shards des issues à trier : celui du filtre `project`, ceux des ids, sinon tous"""
+        if not sharding.is_sharded():
+            return [None]
+        if 'project' in request.query_params:
+            return [sharding.shard_for_id(request.query_params['project'])]
+        if 'ids' in data:
+            return list(dict.fromkeys(sharding.shard_for_id(issue_id) for issue_id in data['ids']))
+        return sharding.get_shards()
+
+    def perform_bulk_create(self, instances):
+        sharding.assign_ids(instances, sharding.get_current_shard())
+        super().perform_bulk_create(instances)
+        counters.bulk_issues_added(instances)
+        response_cache.invalidate_projects({issue.project_id for issue in instances}, response_cache.ISSUE_LISTS)
+
     def get_serializer_class(self):
         """Retourne le serializer en fonction de l'action"""
         if self.action == 'list':
@@ -75,22 +298,118 @@ class IssueViewSet(ModelViewSet):
             issues = Issue.objects.all()
         else:
             user = self.request.user
-            issues = Issue.objects.filter(project__contributors__user=user)
+            member_of = Membership.objects.filter(user=user).values('project_id')
+            issues = Issue.objects.filter(project_id__in=member_of)
+        if self.action == 'list':
+            # IssueListSerializer n'affiche que des colonnes de l'issue
+            return issues
+        # Seules les relations des champs demandés sont chargées ; les commentaires sont bornés
+        if self.wants_field('author'):
+            issues = issues.select_related('author')
+        if self.wants_field('contributor'):
+            issues = issues.select_related('contributor__user')
+        if self.wants_field('comments'):
+            issues = issues.prefetch_related(bounded_prefetch('comments', Comment.objects.only('id', 'issue_id')))
         return issues
 
 
-class CommentViewSet(ModelViewSet):
+class CommentViewSet(ShardMixin, FieldSelectionMixin, IncludeMixin, RowListMixin, ReplicaReadMixin, ResponseCacheMixin,
+                     ConditionalGetMixin, BulkCreateMixin, WriteRetryMixin, InstrumentedViewMixin, ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated, IsProjectContributor, CanEditObject]
+    bulk_serializer_class = CommentBulkSerializer
+    search_kind = 'comment'
+    search_fields = ('description',)
+    filterset_fields = ('issue',)
+    bulk_response_serializer_class = CommentSerializer
+    bulk_shard_field = 'issue'
+    row_serializer_class = CommentRowSerializer
+    includes = {
+        'issue': ('issue', Issue.objects.all(), IssueListSerializer),
+        'author': ('author', User.objects.only('id', 'username'), UserSummarySerializer),
+    }
 
     def perform_create(self, serializer):
         """Permet d'ajouter le user connecté comme auteur lors de la création"""
         serializer.save(author=self.request.user)
 
+    def get_request_shard(self, request):
+        """
+        Shard du commentaire de l'URL, cherché sur chaque shard (l'issue du commentaire est mise en cache),
+        sinon de l'issue désignée par le corps à la création ou par le filtre `issue` de la liste
+        """
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        if lookup is not None:
+            for shard in sharding.get_shards():
+                with sharding.use_shard(shard):
+                    try:
+                        issue_id = cache.get_comment_issue_id(lookup)
+                    except (TypeError, ValueError, ValidationError):
+                        return None
+                if issue_id is not None:
+                    return sharding.shard_for_id(issue_id)
+            return None
+        if self.action == 'create' and isinstance(request.data, dict):
+            return sharding.shard_for_id(request.data.get('issue'))
+        if self.action == 'list':
+            return sharding.shard_for_id(request.query_params.get('issue'))
+        return None
+
     def get_queryset(self):
         if self.request.user.is_staff:
             comments = Comment.objects.all()
         else:
             user = self.request.user
-            comments = Comment.objects.filter(issue__project__contributors__user=user)
-        return comments
+            member_of = Membership.objects.filter(user=user).values('project_id')
+            comments = Comment.objects.filter(issue__project_id__in=member_of)
+        return comments.select_related('author') if self.wants_field('author') else comments
+
+    def perform_bulk_create(self, instances):
+        super().perform_bulk_create(instances)
+        counters.bulk_comments_added(instances)
+        project_ids = Issue.objects.filter(id__in={comment.issue_id for comment in instances}).values('project_id')
+        response_cache.invalidate_projects(project_ids, response_cache.COMMENT_LISTS)
+
+    def build_bulk_instances(self, valid):
+        """Résout le projet de chaque issue du lot en une requête et vérifie l'appartenance via le cache"""
+        user = self.request.user
+        member_of = cache.get_user_project_ids(user.id)
+        projects_by_issue = dict(
+            Issue.objects.filter(id__in={data['issue'] for index, data in valid}).values_list('id', 'project_id')
+        )
+        for index, data in valid:
+            issue_id = data.pop('issue')
+            if issue_id not in projects_by_issue:
+                yield index, {'issue': [_('Issue does not exist')]}
+            elif projects_by_issue[issue_id] not in member_of:
+                yield index, {'issue': [_('You are not a contributor of this project.')]}
+            else:
+                yield index, Comment(issue_id=issue_id, author=user, **data)
+
+
+class ResponseCacheStatsView(APIView):
+    """Statistiques du cache des listes (succès / échecs), réservées aux admins"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(response_cache.get_stats())
+
+
+class SyncView(APIView):
+    """
+    Synchronisation incrémentale des clients : `?since=<jeton>` retourne en NDJSON, produit par lots, les projets,
+    issues et commentaires visibles créés ou modifiés depuis le jeton, les tombstones des objets supprimés (ou des
+    projets quittés) puis une dernière ligne `sync` portant le jeton suivant. Sans jeton, tout est envoyé.
+    Si rien n'a changé depuis le jeton, la réponse est un 204 vide (une requête par shard).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            since = sync.decode_token(request.query_params.get('since'))
+        except ValueError:
+            return Response({'error': 'Invalid sync token'}, status=status.HTTP_400_BAD_REQUEST)
+        until = sync.get_positions()
+        if all(last <= first for first, last in zip(since, until)):
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return StreamingHttpResponse(sync.stream_sync(request.user, since, until), content_type=sync.CONTENT_TYPE)